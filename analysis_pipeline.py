@@ -0,0 +1,180 @@
+import json
+from create_embeddings import generate_embeddings
+from emails_connection_messages import generate_connection_messages_email
+from find_optimal_resume import rank_resumes, find_rag_data_match_percentage, suggest_resume_improvements, prepare_cover_letter, extract_tags_content
+from llm_cache import is_error_response
+from pipeline_graph import Stage, run_stage_graph
+from prompt_anthropic import run_anthropic_chat_completion
+from prompt_llm_for_resume import parse_response_to_df, save_job_dict_response
+from prompt_openai import run_openai_chat_completion
+from supabase_backend import insert_data_into_table
+from supabase_helper_functions import prepare_data_job_description
+from tracing import profiled
+from vector_search import search_similar_rows
+from configuration import (
+    SUMMARY_PROMPT, SUMMARIZE_JOB_DESCRIPTION_MODEL, RESUME_SUMMARY_PROMPT, RESUME_SUMMARY_MODEL, EMBEDDING_MODEL,
+    SUGGESTIONS_JOB_BASED_ON_RESUME, PROVIDING_SUGGESTIONS_MODEL, COVER_LETTER_GENERATION_PROMPT, COVER_LETTER_GENERATION_MODEL,
+    COLD_EMAILS_MESSAGES_PROMPT, COLD_EMAILS_MESSAGES_MODEL, RAG_MATCH_THRESHOLD, VECTOR_SEARCH_BACKEND,
+)
+
+# Sections of the reach out messages, in the order they are shown
+REACH_OUT_TAGS = {
+    "linkedin_recruiter_message": "linkedin_message_recruiter",
+    "recruiter_email": "cold_email_recruiter",
+    "linkedin_connection_message": "linkedin_message_hiring_manager",
+    "hiring_manager_email": "cold_email_hiring_manager",
+}
+
+
+class AnalysisView:
+    """
+    Where the Analyze stages show their results. This one shows nothing, the Streamlit UI overrides
+    the methods to draw each result in its own section of the page.
+    """
+
+    def summary(self, summary):
+        pass
+
+    def resume_summary(self, resume_summary):
+        pass
+
+    def resume_matches(self, resume_matches):
+        pass
+
+    def rag_matches(self, rag_matches):
+        pass
+
+    def suggestions(self, suggestions):
+        pass
+
+    def stream(self, section):
+        # Callback receiving the text streamed so far for `section`
+        return lambda text: None
+
+    def failed(self, section, error):
+        pass
+
+    def cover_letter(self, cover_letter):
+        pass
+
+    def reach_out(self, messages):
+        pass
+
+
+async def summarize_job_posting(state, view):
+    state["summary_response"] = await run_openai_chat_completion(state["openai_client"], state["llama_response"], SUMMARY_PROMPT, SUMMARIZE_JOB_DESCRIPTION_MODEL)
+    view.summary(state["summary_response"])
+
+async def generate_resume_summary(state, view):
+    combined = json.dumps({
+        "job_description": state["llama_response"],
+        "resume": state["master_resume"]["resume_text"],
+    })
+    response = await run_anthropic_chat_completion(state["anthropic_client"], combined, RESUME_SUMMARY_PROMPT, RESUME_SUMMARY_MODEL)
+    state["resume_summary"] = extract_tags_content(response["content"], ["resume_summary"])
+    view.resume_summary(state["resume_summary"])
+
+async def embed_job_description(state, view):
+    with profiled("dataframe_prep"):
+        parsed_job = parse_response_to_df(state["llama_response"])
+        parsed_job["job_description"] = json.dumps(state["job_description"])
+        parsed_job["job_link"] = state["job_link"]
+    state["parsed_job_df"] = parsed_job
+    state["job_emb"] = await generate_embeddings(parsed_job, EMBEDDING_MODEL, "job")
+
+async def save_job_description(state, view):
+    with profiled("dataframe_prep"):
+        job_prepared_data = prepare_data_job_description(state["job_emb"])
+    await insert_data_into_table(state["supabase_client"], "job_info", job_prepared_data, batch_size=100)
+
+async def match_resume_and_rag_data(state, view):
+    state["best_resume_text"], state["updated_emb_df"] = await rank_resumes(state["supabase_client"], state["resume"], state["job_emb"])
+    view.resume_matches(state["updated_emb_df"][['resume_name', 'percentage_match']])
+
+    rag_df = state.get("rag_df")
+    use_pgvector_search = state.get("include_rag_data_checkbox") and VECTOR_SEARCH_BACKEND == "pgvector"
+    if not use_pgvector_search and (rag_df is None or rag_df.empty):
+        state["rag_data_prompt"] = ""
+        return
+
+    if use_pgvector_search:
+        # Only the top matches (ids, scores and text) come back from the database
+        job_vector = state["job_emb"]['job_description_embeddings'].iloc[0]
+        best_rag_data = await search_similar_rows(state["supabase_client"], 'extra_info', job_vector, match_threshold=RAG_MATCH_THRESHOLD / 100)
+    else:
+        with profiled("similarity"):
+            best_rag_data, _ = find_rag_data_match_percentage(rag_df, state["job_emb"], matcher=state.get("rag_matcher"), ann_index=state.get("rag_ann_index"))
+    best_rag_data = best_rag_data.sort_values(by='percentage_match', ascending=False)
+    view.rag_matches(best_rag_data)
+    state["best_rag_data"] = best_rag_data[['category', 'title', 'text']]
+    state["rag_data_prompt"] = state["best_rag_data"].to_json(orient="records")
+
+async def generate_suggestions(state, view):
+    state["suggestions"] = await suggest_resume_improvements(state["openai_client"], SUGGESTIONS_JOB_BASED_ON_RESUME, state["llama_response"], state["best_resume_text"], state["rag_data_prompt"], PROVIDING_SUGGESTIONS_MODEL, model_temp=0.2)
+    view.suggestions(state["suggestions"])
+    save_job_dict_response(state["suggestions"], "suggestions")
+
+async def generate_cover_letter(state, view):
+    cover_letter = await prepare_cover_letter(state["openai_client"], COVER_LETTER_GENERATION_PROMPT, state["llama_response"], state["best_resume_text"], COVER_LETTER_GENERATION_MODEL, model_temp=0.2, on_text=view.stream("cover_letter"), anthropic_client=state.get("anthropic_client"))
+    # A failed stream is reported in place of the partial letter, and never saved as the letter
+    if is_error_response(cover_letter):
+        view.failed("cover_letter", cover_letter)
+        return
+    state["cover_letter"] = cover_letter
+    view.cover_letter(cover_letter)
+    save_job_dict_response(cover_letter, "cover_letter")
+
+async def generate_reach_out_messages(state, view):
+    cold_email_messages = await generate_connection_messages_email(COLD_EMAILS_MESSAGES_PROMPT, state["summary_response"], state["best_resume_text"], COLD_EMAILS_MESSAGES_MODEL, model_temp=0.2, on_text=view.stream("reach_out"), openai_client=state.get("openai_client"), anthropic_client=state.get("anthropic_client"))
+    if is_error_response(cold_email_messages):
+        view.failed("reach_out", cold_email_messages)
+        return
+    state["cold_email_messages"] = cold_email_messages
+
+    messages = {}
+    for key, tag in REACH_OUT_TAGS.items():
+        state[key] = messages[key] = extract_tags_content(cold_email_messages, [tag])
+    view.reach_out(messages)
+
+def analysis_stages(state, view, include_suggestions=True, include_reach_out=True):
+    """
+    The Analyze flow after the job details are parsed, as a dependency graph.
+
+    Args:
+    - state: Mapping the stages read their inputs from and write their results to, the Streamlit
+      session state in the UI. Needs the clients, "llama_response", "job_description", "job_link",
+      "resume" and "master_resume", RAG data is optional.
+    - view (AnalysisView): Where the results are shown.
+    - include_suggestions (bool): Match the resumes and write suggestions and a cover letter.
+    - include_reach_out (bool): Write the recruiter and hiring manager messages.
+
+    Returns:
+    - list: Stage objects for run_stage_graph.
+    """
+    def stage(name, func, depends_on=()):
+        return Stage(name, lambda: func(state, view), depends_on=depends_on)
+
+    stages = [
+        stage("summary", summarize_job_posting),
+        stage("resume_summary", generate_resume_summary),
+    ]
+    if include_suggestions:
+        stages += [
+            stage("job_embedding", embed_job_description),
+            stage("save_job", save_job_description, depends_on=("job_embedding",)),
+            stage("match", match_resume_and_rag_data, depends_on=("job_embedding",)),
+            stage("suggestions", generate_suggestions, depends_on=("match",)),
+            stage("cover_letter", generate_cover_letter, depends_on=("match",)),
+        ]
+    if include_reach_out:
+        # Outreach uses the best matching resume when matching is part of this run
+        reach_out_dependencies = ("summary", "match") if include_suggestions else ("summary",)
+        stages.append(stage("reach_out", generate_reach_out_messages, depends_on=reach_out_dependencies))
+    return stages
+
+async def run_analysis_pipeline(state, view=None, include_suggestions=True, include_reach_out=True):
+    """
+    Run the Analyze stages, each one starting as soon as the stages it needs have finished.
+    See analysis_stages for the arguments.
+    """
+    await run_stage_graph(analysis_stages(state, view or AnalysisView(), include_suggestions, include_reach_out))
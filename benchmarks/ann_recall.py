@@ -0,0 +1,78 @@
+"""
+Recall and latency of the approximate RAG index against exact brute-force search.
+
+Run from the repository root:
+    python -m benchmarks.ann_recall --rows 100000 --dimensions 1536
+"""
+import argparse
+import json
+import time
+import numpy as np
+from embedding_matcher import EmbeddingMatcher
+from rag_ann_index import RagAnnIndex
+
+
+def make_clustered_embeddings(rows, dimensions, clusters, seed=0):
+    # Real text embeddings are clustered by topic, uniform noise would make any ANN index look bad
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    members = rng.integers(0, clusters, size=rows)
+    return centers[members] + 0.5 * rng.normal(size=(rows, dimensions)).astype(np.float32)
+
+def run_benchmark(rows, dimensions, queries, k, backend=None, seed=0):
+    embeddings = make_clustered_embeddings(rows + queries, dimensions, clusters=max(8, rows // 500), seed=seed)
+    corpus, query_vectors = embeddings[:rows], embeddings[rows:]
+    ids = list(range(rows))
+
+    start = time.perf_counter()
+    exact = EmbeddingMatcher(corpus)
+    exact_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = RagAnnIndex.build(ids, corpus, backend=backend)
+    ann_build = time.perf_counter() - start
+
+    exact_times, ann_times, recalls = [], [], []
+    for query in query_vectors:
+        start = time.perf_counter()
+        exact_positions, _ = exact.top_k(query, k)
+        exact_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ann_ids, _ = index.search(query, k)
+        ann_times.append(time.perf_counter() - start)
+
+        recalls.append(len(set(exact_positions.tolist()) & set(ann_ids)) / k)
+
+    return {
+        "backend": index.backend.name,
+        "rows": rows,
+        "dimensions": dimensions,
+        "k": k,
+        "queries": queries,
+        "exact_build_s": exact_build,
+        "ann_build_s": ann_build,
+        "exact_query_ms_p50": 1000 * float(np.median(exact_times)),
+        "ann_query_ms_p50": 1000 * float(np.median(ann_times)),
+        "ann_query_ms_p95": 1000 * float(np.percentile(ann_times, 95)),
+        f"recall_at_{k}": float(np.mean(recalls)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backend", choices=["ivf", "hnsw"], default=None)
+    parser.add_argument("--output", help="Optional path of a JSON file to write the results to")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.dimensions, args.queries, args.k, backend=args.backend)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Latency of crawling with a freshly launched browser per page against the warm crawler pool.
+
+Needs crawl4ai with its browser installed and network access to the URL. Run from the repository root:
+    python -m benchmarks.crawler_pool --url https://example.com --runs 5
+"""
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+from crawl4ai import AsyncWebCrawler
+from crawler_pool import CrawlerPool
+
+
+async def crawl_cold(url):
+    # What every scrape used to pay: launch a browser, load the page, tear the browser down
+    async with AsyncWebCrawler(verbose=False) as crawler:
+        return await crawler.arun(url=url, bypass_cache=True)
+
+async def run_benchmark(url, runs, pool_size):
+    cold_times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await crawl_cold(url)
+        cold_times.append(time.perf_counter() - start)
+
+    pool = CrawlerPool(size=pool_size, crawler_factory=lambda: AsyncWebCrawler(verbose=False))
+    try:
+        # The first pooled crawl launches the browser, it is reported separately from the warm runs
+        start = time.perf_counter()
+        await pool.arun(url, bypass_cache=True)
+        first_pooled = time.perf_counter() - start
+
+        warm_times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            await pool.arun(url, bypass_cache=True)
+            warm_times.append(time.perf_counter() - start)
+        pool_stats = pool.stats()
+    finally:
+        pool.close()
+
+    return {
+        "url": url,
+        "runs": runs,
+        "cold_s_p50": float(np.median(cold_times)),
+        "cold_s_mean": float(np.mean(cold_times)),
+        "pool_first_s": first_pooled,
+        "warm_s_p50": float(np.median(warm_times)),
+        "warm_s_mean": float(np.mean(warm_times)),
+        "speedup_p50": float(np.median(cold_times) / np.median(warm_times)),
+        "pool": pool_stats,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--output", help="Optional path of a JSON file to write the results to")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.url, args.runs, args.pool_size))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Offline stand-ins for OpenAI, Anthropic, Supabase and crawl4ai, used by the benchmark suite.
+
+They replay the responses recorded in benchmarks/fixtures/recorded_responses.json and the saved
+job pages in fixtures/job_pages, after a configurable latency, so the pipeline can be measured
+on a machine without network access or API keys. install_fakes() registers them in client_registry
+and the crawler pool, the application code itself runs unchanged.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlparse
+import numpy as np
+import client_registry
+import crawler_pool
+import embedding_cache
+import llm_cache
+import page_cache
+import telemetry
+from crawler_pool import CrawlerPool
+from configuration import (
+    IDENTIFY_DETAILS_FROM_JOB_PROMPT, IDENTIFY_DETAILS_FROM_RESUME_PROMPT, SUMMARY_PROMPT, SUGGESTIONS_JOB_BASED_ON_RESUME,
+    COVER_LETTER_GENERATION_PROMPT, COLD_EMAILS_MESSAGES_PROMPT, RESUME_SUMMARY_PROMPT,
+)
+
+RECORDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "recorded_responses.json")
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "job_pages")
+
+# Recorded response to replay for each system prompt. identify_job_details appends the fields it
+# still needs to the job prompt, so prompts are matched by prefix.
+PROMPT_RESPONSES = [
+    (IDENTIFY_DETAILS_FROM_JOB_PROMPT, "job_details"),
+    (IDENTIFY_DETAILS_FROM_RESUME_PROMPT, "resume_sections"),
+    (SUMMARY_PROMPT, "summary"),
+    (SUGGESTIONS_JOB_BASED_ON_RESUME, "suggestions"),
+    (COVER_LETTER_GENERATION_PROMPT, "cover_letter"),
+    (COLD_EMAILS_MESSAGES_PROMPT, "reach_out"),
+    (RESUME_SUMMARY_PROMPT, "resume_summary"),
+]
+
+EMBEDDING_DIMENSIONS = {"text-embedding-3-large": 3072}
+
+
+class Latency:
+    """
+    Simulated service time: `seconds`, varied uniformly by +/- `jitter` (a fraction of it).
+    """
+
+    def __init__(self, seconds=0.0, jitter=0.0, seed=0):
+        self.seconds = seconds
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        with self._lock:
+            spread = self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.seconds * (1 + spread))
+
+    async def wait(self, fraction=1.0):
+        await asyncio.sleep(self.sample() * fraction)
+
+    def block(self):
+        # For the synchronous Supabase client, which the application runs in worker threads
+        time.sleep(self.sample())
+
+
+class Recordings:
+    """
+    The recorded responses, made unique per prompt so the response cache and single-flight
+    behave as they would for distinct real jobs.
+    """
+
+    def __init__(self, path=RECORDINGS_PATH):
+        with open(path) as recordings_file:
+            recordings = json.load(recordings_file)
+        self.responses = recordings["responses"]
+        self.resume_paragraphs = recordings["resume_paragraphs"]
+
+    def respond(self, system_prompt, user_prompt):
+        name = next((name for prompt, name in PROMPT_RESPONSES if system_prompt.startswith(prompt)), "default")
+        recorded = self.responses[name]
+        reference = hashlib.sha256(user_prompt.encode("utf-8")).hexdigest()[:10]
+        content = recorded["content"]
+        # A real model answers different prompts differently, which keeps the following prompts distinct too
+        try:
+            parsed = json.loads(content)
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, dict):
+            content = json.dumps(dict(parsed, Reference=reference))
+        elif isinstance(parsed, list):
+            content = json.dumps(parsed + [f"REFERENCE: {reference}."])
+        else:
+            content = f"{content}\n\nReference: {reference}"
+        return content, recorded["input_tokens"], recorded["output_tokens"]
+
+
+def text_chunks(text, count=12):
+    # Streams arrive as many small pieces, the first one after the time to first token
+    size = max(1, len(text) // count)
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+class _FakeChatCompletions:
+    def __init__(self, recordings, latency):
+        self.recordings = recordings
+        self.latency = latency
+
+    async def create(self, model, messages, temperature=None, stream=False, stream_options=None, **kwargs):
+        system_prompt = next((message["content"] for message in messages if message["role"] == "system"), "")
+        user_prompt = next((message["content"] for message in messages if message["role"] == "user"), "")
+        content, input_tokens, output_tokens = self.recordings.respond(system_prompt, user_prompt)
+        usage = SimpleNamespace(prompt_tokens=input_tokens, completion_tokens=output_tokens, total_tokens=input_tokens + output_tokens)
+        if not stream:
+            await self.latency.wait()
+            message = SimpleNamespace(role="assistant", content=content)
+            return SimpleNamespace(id="chatcmpl-fake", model=model, choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")], usage=usage)
+
+        async def chunks():
+            await self.latency.wait(0.3)
+            pieces = text_chunks(content)
+            for piece in pieces:
+                await self.latency.wait(0.7 / len(pieces))
+                yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=piece))], usage=None)
+            if stream_options and stream_options.get("include_usage"):
+                yield SimpleNamespace(choices=[], usage=usage)
+        return chunks()
+
+
+class _FakeEmbeddings:
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def create(self, input, model, **kwargs):
+        await self.latency.wait()
+        dimensions = EMBEDDING_DIMENSIONS.get(model, 1536)
+        data = []
+        for index, text in enumerate(input):
+            # The same text always gets the same vector, like the real API
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).normal(size=dimensions).astype(np.float32)
+            data.append(SimpleNamespace(index=index, embedding=(vector / np.linalg.norm(vector)).tolist()))
+        tokens = sum(max(1, len(text) // 4) for text in input)
+        return SimpleNamespace(data=data, model=model, usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens))
+
+
+class FakeAsyncOpenAI:
+    """
+    Covers chat.completions.create (plain and streamed) and embeddings.create.
+    """
+
+    def __init__(self, recordings, llm_latency, embedding_latency):
+        self.chat = SimpleNamespace(completions=_FakeChatCompletions(recordings, llm_latency))
+        self.embeddings = _FakeEmbeddings(embedding_latency)
+
+
+class _FakeUsage(SimpleNamespace):
+    def model_dump_json(self):
+        return json.dumps(vars(self))
+
+
+class _FakeMessageStream:
+    def __init__(self, content, message, latency):
+        self.content = content
+        self.message = message
+        self.latency = latency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        async def pieces():
+            await self.latency.wait(0.3)
+            chunks = text_chunks(self.content)
+            for piece in chunks:
+                await self.latency.wait(0.7 / len(chunks))
+                yield piece
+        return pieces()
+
+    async def get_final_message(self):
+        return self.message
+
+
+class _FakeMessages:
+    def __init__(self, recordings, latency):
+        self.recordings = recordings
+        self.latency = latency
+
+    def _message(self, system, messages, model):
+        system_prompt = "".join(block["text"] for block in system) if isinstance(system, list) else system or ""
+        content, input_tokens, output_tokens = self.recordings.respond(system_prompt, messages[-1]["content"])
+        message = SimpleNamespace(
+            id="msg_fake", model=model, stop_reason="end_turn",
+            content=[SimpleNamespace(type="text", text=content)],
+            usage=_FakeUsage(input_tokens=input_tokens, output_tokens=output_tokens),
+        )
+        return content, message
+
+    async def create(self, model, messages, system=None, max_tokens=None, temperature=None, **kwargs):
+        await self.latency.wait()
+        return self._message(system, messages, model)[1]
+
+    def stream(self, model, messages, system=None, max_tokens=None, temperature=None, **kwargs):
+        content, message = self._message(system, messages, model)
+        return _FakeMessageStream(content, message, self.latency)
+
+
+class FakeAsyncAnthropic:
+    """
+    Covers messages.create and messages.stream.
+    """
+
+    def __init__(self, recordings, latency):
+        self.messages = _FakeMessages(recordings, latency)
+
+
+class _FakeQuery:
+    def __init__(self, database, table_name):
+        self.database = database
+        self.table_name = table_name
+        self.rows = None
+
+    def insert(self, rows, **kwargs):
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None, **kwargs):
+        return self.insert(rows)
+
+    def select(self, *columns, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        # Filters, ordering and limits (eq, in_, order, limit, ...) do not change what the fake returns
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self.database.latency.block()
+        with self.database.lock:
+            table = self.database.tables.setdefault(self.table_name, [])
+            if self.rows is None:
+                return SimpleNamespace(data=list(table))
+            inserted = []
+            for row in self.rows:
+                self.database.next_id += 1
+                inserted.append(dict(row, id=self.database.next_id))
+            table.extend(inserted)
+        return SimpleNamespace(data=inserted)
+
+
+class FakeSupabase:
+    """
+    In-memory tables behind the subset of the Supabase query builder the application uses.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.tables = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def table(self, table_name):
+        return _FakeQuery(self, table_name)
+
+    def rpc(self, name, params=None):
+        return _FakeQuery(self, name)
+
+
+class FakeCrawler:
+    """
+    Replaces crawl4ai's AsyncWebCrawler, serving the saved fixture pages.
+
+    Every URL gets its own copy of the page with a requisition number in the job title and
+    description, so each job is as distinct as a real posting would be. The fixture is picked by the URL without its query.
+    """
+
+    def __init__(self, pages, latency):
+        self.pages = pages
+        self.latency = latency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def arun(self, url, **kwargs):
+        await self.latency.wait()
+        parsed = urlparse(url)
+        page = self.pages.get(f"{parsed.scheme}://{parsed.netloc}{parsed.path}")
+        if page is None:
+            return SimpleNamespace(success=False, html=None, error_message="No fixture page for this URL")
+        html, title = page
+        reference = hashlib.sha256(url.encode("utf-8")).hexdigest()[:6]
+        html = html.replace(title, f"{title} (Req {reference})")
+        # The first paragraph of the description too, whether it sits in the markup or escaped in JSON-LD
+        for paragraph_end in ("</p>", "&lt;/p&gt;"):
+            html = html.replace(paragraph_end, f" Requisition {reference}.{paragraph_end}", 1)
+        return SimpleNamespace(success=True, html=html, error_message=None)
+
+
+def load_fixture_pages(fixtures_dir=FIXTURES_DIR):
+    """
+    Returns:
+    - dict: Fixture page URL -> (HTML, job title).
+    """
+    pages = {}
+    for file_name in sorted(os.listdir(fixtures_dir)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(fixtures_dir, file_name)) as expected_file:
+                expected = json.load(expected_file)
+            with open(os.path.join(fixtures_dir, file_name[:-5] + ".html")) as html_file:
+                pages[expected["url"]] = (html_file.read(), expected["job_details"]["Job role"])
+    return pages
+
+def isolate_state(workdir):
+    """
+    Run from `workdir` with fresh process-wide caches and metrics store, so every benchmark run
+    starts cold and leaves the repository's own .cache untouched. Cache and metrics paths are relative.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    llm_cache._llm_cache.reset()
+    embedding_cache._embedding_cache.reset()
+    page_cache._page_cache.reset()
+    telemetry._metrics_store = None
+
+def install_fakes(llm_latency=None, embedding_latency=None, db_latency=None, crawl_latency=None, recordings_path=RECORDINGS_PATH):
+    """
+    Register the fake clients and a crawler pool of fake browsers in place of the real ones.
+
+    Args:
+    - llm_latency, embedding_latency, db_latency, crawl_latency (Latency): Simulated service times, none by default.
+    - recordings_path (str): JSON file of recorded responses.
+
+    Returns:
+    - SimpleNamespace: The installed fakes (openai, anthropic, supabase), e.g. to inspect the inserted rows.
+    """
+    recordings = Recordings(recordings_path)
+    pages = load_fixture_pages()
+    fakes = SimpleNamespace(
+        recordings=recordings,
+        openai=FakeAsyncOpenAI(recordings, llm_latency or Latency(), embedding_latency or Latency()),
+        anthropic=FakeAsyncAnthropic(recordings, llm_latency or Latency()),
+        supabase=FakeSupabase(db_latency or Latency()),
+        job_urls=list(pages),
+    )
+    client_registry.register_client("async_openai", fakes.openai)
+    client_registry.register_client("async_anthropic", fakes.anthropic)
+    client_registry.register_client("supabase", fakes.supabase)
+
+    crawl_latency = crawl_latency or Latency()
+    if crawler_pool._crawler_pool is not None:
+        crawler_pool._crawler_pool.close()
+    crawler_pool._crawler_pool = CrawlerPool(crawler_factory=lambda: FakeCrawler(pages, crawl_latency))
+    return fakes
@@ -0,0 +1,255 @@
+"""
+End-to-end and per-stage throughput of the pipeline, offline, at several scales.
+
+Every external service is replaced by the stand-ins in benchmarks/fakes.py, which replay recorded
+responses after a configurable latency, so runs are repeatable and need no network or API keys.
+Each (benchmark, scale) run starts with cold caches in a scratch directory.
+
+Run from the repository root:
+    python -m benchmarks.offline_suite --scales 1,10,100 --output results.json
+    python -m benchmarks.offline_suite --compare results.json   # fails when a run got slower than the baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.fakes import Latency, install_fakes, isolate_state
+
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = ["process_resumes", "generate_embeddings", "find_best_resume", "insert_data_into_table", "analyze"]
+DEFAULT_SCALES = [1, 10, 100, 1000]
+
+
+def write_resume_files(directory, paragraphs, count):
+    # Variants of one recorded resume, each slightly different like a folder of tailored resumes
+    from docx import Document
+    paths = []
+    for number in range(count):
+        document = Document()
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+        document.add_paragraph(f"Variant {number}: tailored for role family {number % 7}.")
+        path = os.path.join(directory, f"resume_variant_{number}.docx")
+        document.save(path)
+        paths.append(path)
+    return paths
+
+def job_urls(fakes, count):
+    # The fixture pages in rotation, each URL a distinct posting
+    return [f"{fakes.job_urls[number % len(fakes.job_urls)]}?job={number}" for number in range(count)]
+
+def random_embeddings(count, dimensions=1536, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dimensions)).astype(np.float32)
+    return list(vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+
+async def bench_process_resumes(fakes, scale, workdir, concurrency):
+    from find_optimal_resume import process_resumes
+    from configuration import IDENTIFY_DETAILS_FROM_RESUME_PROMPT, IDENTIFY_DETAILS_FORM_RESUME_MODEL
+    paths = write_resume_files(workdir, fakes.recordings.resume_paragraphs, scale)
+    resumes = await process_resumes(paths, IDENTIFY_DETAILS_FROM_RESUME_PROMPT, IDENTIFY_DETAILS_FORM_RESUME_MODEL, openai_client=fakes.openai)
+    return len(resumes)
+
+async def bench_generate_embeddings(fakes, scale, workdir, concurrency):
+    from create_embeddings import generate_embeddings
+    from configuration import EMBEDDING_MODEL
+    jobs = pd.DataFrame({"job_description": [f"{fakes.recordings.responses['summary']['content']} Posting {number}." for number in range(scale)]})
+    embedded = await generate_embeddings(jobs, EMBEDDING_MODEL, "job")
+    return len(embedded)
+
+async def bench_find_best_resume(fakes, scale, workdir, concurrency):
+    from find_optimal_resume import find_best_resume
+    from tracing import profiled
+    resumes = pd.DataFrame({
+        "resume_name": [f"resume_{number}" for number in range(scale)],
+        "resume_text": [f"Resume {number}" for number in range(scale)],
+        "resume_embedding": random_embeddings(scale, seed=1),
+    })
+    job = pd.DataFrame({"job_description_embeddings": random_embeddings(1, seed=2)})
+    with profiled("similarity"):
+        find_best_resume(resumes, job)
+    return scale
+
+async def bench_insert_data_into_table(fakes, scale, workdir, concurrency):
+    from supabase_backend import insert_data_into_table
+    from supabase_helper_functions import prepare_data_job_description
+    from configuration import JOB_DETAILS_TABLE_NAME
+    jobs = pd.DataFrame({
+        "job_link": [f"https://jobs.example.com/{number}" for number in range(scale)],
+        "position_name": ["Senior Machine Learning Engineer"] * scale,
+        "job_description": [fakes.recordings.responses["summary"]["content"]] * scale,
+        "job_description_embeddings": random_embeddings(scale, seed=3),
+    })
+    rows = await insert_data_into_table(fakes.supabase, JOB_DETAILS_TABLE_NAME, prepare_data_job_description(jobs), batch_size=100)
+    return len(rows)
+
+async def analyze_job(url, resumes, fakes):
+    """
+    The Analyze flow of streamlit_ui for one posting, outside Streamlit: extraction and detail
+    identification, then the same stage graph the UI runs (analysis_pipeline), with a view that shows nothing.
+    """
+    from get_job_details_crawl4ai import extract_job_posting
+    from local_job_parser import identify_job_details
+    from analysis_pipeline import run_analysis_pipeline
+    from telemetry import telemetry_stage
+
+    with telemetry_stage("extract_job"):
+        job_description, job_details = await extract_job_posting(url)
+    job_data = json.dumps({"job_description": job_description, "job_details": job_details})
+    with telemetry_stage("identify_details"):
+        llama_response, _, _ = await identify_job_details(fakes.openai, job_data)
+
+    state = {
+        "openai_client": fakes.openai,
+        "anthropic_client": fakes.anthropic,
+        "supabase_client": fakes.supabase,
+        "job_link": url,
+        "job_description": job_description,
+        "llama_response": llama_response,
+        # Every posting gets its own copy, find_best_resume adds the match columns to it
+        "resume": resumes.copy(),
+        "master_resume": resumes.iloc[0],
+    }
+    await run_analysis_pipeline(state)
+
+async def bench_analyze(fakes, scale, workdir, concurrency):
+    # `concurrency` postings are analyzed at once, like that many users clicking Analyze together
+    resumes = pd.DataFrame({
+        "resume_name": [f"resume_{number}" for number in range(5)],
+        "resume_text": [" ".join(fakes.recordings.resume_paragraphs) + f" Variant {number}." for number in range(5)],
+        "resume_embedding": random_embeddings(5, seed=4),
+    })
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def analyze(url):
+        async with semaphore:
+            await analyze_job(url, resumes, fakes)
+
+    await asyncio.gather(*(analyze(url) for url in job_urls(fakes, scale)))
+    return scale
+
+BENCHMARK_FUNCTIONS = {
+    "process_resumes": bench_process_resumes,
+    "generate_embeddings": bench_generate_embeddings,
+    "find_best_resume": bench_find_best_resume,
+    "insert_data_into_table": bench_insert_data_into_table,
+    "analyze": bench_analyze,
+}
+
+def stage_breakdown(run_id):
+    # Per stage and kind of call: count and time, from the run's telemetry
+    from telemetry import summarize_metrics
+    summary = summarize_metrics(run_id=run_id)
+    if summary.empty:
+        return []
+    columns = ["stage", "kind", "calls", "cache_hits", "coalesced", "errors", "wall_time_total_s", "wall_time_p50_s", "wall_time_p95_s"]
+    return json.loads(summary[columns].to_json(orient="records"))
+
+def run_one(name, scale, latencies, concurrency):
+    from telemetry import telemetry_run
+    original_dir = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix=f"bench_{name}_{scale}_")
+    isolate_state(workdir)
+    fakes = install_fakes(**latencies)
+
+    async def timed():
+        with telemetry_run() as run_id:
+            start = time.perf_counter()
+            items = await BENCHMARK_FUNCTIONS[name](fakes, scale, workdir, concurrency)
+            return items, time.perf_counter() - start, run_id
+
+    try:
+        items, seconds, run_id = asyncio.run(timed())
+        return {
+            "benchmark": name,
+            "scale": scale,
+            "items": items,
+            "seconds": seconds,
+            "items_per_second": items / seconds if seconds else None,
+            "stages": stage_breakdown(run_id),
+        }
+    finally:
+        os.chdir(original_dir)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPOSITORY_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline, tolerance):
+    """
+    Print the change in seconds of every run against the baseline.
+
+    Returns:
+    - list: (benchmark, scale, ratio) for every run slower than the baseline by more than `tolerance`.
+    """
+    baseline_seconds = {(run["benchmark"], run["scale"]): run["seconds"] for run in baseline["results"]}
+    regressions = []
+    print(f"{'benchmark':<24}{'scale':>7}{'baseline s':>13}{'current s':>13}{'ratio':>8}")
+    for run in results["results"]:
+        key = (run["benchmark"], run["scale"])
+        if key not in baseline_seconds:
+            continue
+        ratio = run["seconds"] / baseline_seconds[key] if baseline_seconds[key] else float("inf")
+        print(f"{run['benchmark']:<24}{run['scale']:>7}{baseline_seconds[key]:>13.3f}{run['seconds']:>13.3f}{ratio:>8.2f}")
+        if ratio > 1 + tolerance:
+            regressions.append((run["benchmark"], run["scale"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="Comma separated, from: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="Comma separated numbers of jobs / resumes / rows")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per LLM call (streams spread it over their chunks)")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds per embedding request")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="Seconds per Supabase request")
+    parser.add_argument("--crawl-latency", type=float, default=0.3, help="Seconds per page crawl")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latencies vary by +/- this fraction")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=8, help="Postings analyzed at the same time in the analyze benchmark")
+    parser.add_argument("--output", help="Optional path of a JSON file to write the results to")
+    parser.add_argument("--compare", help="Baseline results JSON, exits with status 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    def latency(seconds, offset):
+        return Latency(seconds, args.jitter, seed=args.seed + offset)
+
+    latencies = {
+        "llm_latency": latency(args.llm_latency, 1),
+        "embedding_latency": latency(args.embedding_latency, 2),
+        "db_latency": latency(args.db_latency, 3),
+        "crawl_latency": latency(args.crawl_latency, 4),
+    }
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": [],
+    }
+    for name in args.benchmarks.split(","):
+        for scale in (int(scale) for scale in args.scales.split(",")):
+            run = run_one(name, scale, latencies, args.concurrency)
+            print(f"{name} x{scale}: {run['seconds']:.3f}s ({run['items_per_second']:.1f}/s)")
+            results["results"].append(run)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for name, scale, ratio in regressions:
+            print(f"Regression: {name} x{scale} is {ratio:.2f}x the baseline")
+        raise SystemExit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
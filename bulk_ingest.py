@@ -0,0 +1,261 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+from get_job_details_crawl4ai import extract_job_posting
+from local_job_parser import identify_job_details
+from prompt_llm_for_resume import parse_response_to_df
+from create_embeddings import generate_embeddings, EMBEDDING_COLUMNS
+from supabase_backend import insert_data_into_table
+from supabase_helper_functions import prepare_data_job_description
+from client_registry import get_async_openai_client, get_supabase_client
+from telemetry import telemetry_stage
+from configuration import (
+    BULK_INGEST_WORKERS, BULK_INGEST_QUEUE_SIZE, BULK_INGEST_EMBED_BATCH_SIZE, BULK_INGEST_INSERT_BATCH_SIZE,
+    BULK_INGEST_CHECKPOINT_PATH, EMBEDDING_MODEL, JOB_DETAILS_TABLE_NAME,
+)
+
+
+def job_row_hash(job):
+    # Hash of the sheet cells of a job, a job whose row changed is processed again
+    cells = {key: value for key, value in job.items() if key in ("ID", "Job Link")}
+    return hashlib.sha256(json.dumps(cells, sort_keys=True).encode("utf-8")).hexdigest()
+
+def job_content_hash(job):
+    # Hash of what is embedded and stored for a job: its link and the text its embedding is made from
+    text_column, _ = EMBEDDING_COLUMNS["job"]
+    content = {"Job Link": job["Job Link"], "text": job["job_df"][text_column].tolist()}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class IngestCheckpoint:
+    """
+    Append-only record of the jobs a bulk run has finished, one JSON line per job.
+
+    Lines are appended and flushed as jobs finish, so an interrupted run loses at most the jobs
+    that were still in flight. The last line for a job ID wins when the file is read back, and
+    the file is compacted to those lines once it holds mostly superseded ones.
+    """
+
+    def __init__(self, path=BULK_INGEST_CHECKPOINT_PATH):
+        self.path = path
+        self.entries = {}
+        lines = 0
+        if os.path.exists(path):
+            with open(path) as checkpoint_file:
+                for line in checkpoint_file:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash, that job simply runs again
+                        continue
+                    self.entries[str(entry["id"])] = entry
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if lines > 2 * len(self.entries) + 100:
+            self._compact()
+        self._file = open(path, "a")
+
+    def _compact(self):
+        # Write the latest entry per job to a new file, then swap it in atomically
+        with open(self.path + ".tmp", "w") as compacted:
+            for entry in self.entries.values():
+                compacted.write(json.dumps(entry) + "\n")
+        os.replace(self.path + ".tmp", self.path)
+
+    def is_done(self, job_id, row_hash=None):
+        """
+        Whether the job was ingested, and when row_hash is given, whether it was ingested from that sheet row.
+        """
+        entry = self.entries.get(str(job_id))
+        if entry is None or entry["status"] != "done":
+            return False
+        return row_hash is None or entry.get("hash") == row_hash
+
+    def has_content(self, job_id, content_hash):
+        """
+        Whether the job was ingested with exactly this embedded content, see job_content_hash.
+        """
+        entry = self.entries.get(str(job_id))
+        return entry is not None and entry["status"] == "done" and entry.get("content") == content_hash
+
+    def record(self, job_id, status, error=None, row_hash=None, content_hash=None):
+        entry = {"id": str(job_id), "status": status, "time": time.time()}
+        if row_hash is not None:
+            entry["hash"] = row_hash
+        if content_hash is not None:
+            entry["content"] = content_hash
+        if error is not None:
+            entry["error"] = str(error)
+        self.entries[str(job_id)] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def drain(queue, first, limit):
+    # Take whatever is already waiting behind `first`, up to limit items, without blocking
+    batch = [first]
+    while len(batch) < limit and not queue.empty():
+        batch.append(queue.get_nowait())
+    return batch
+
+async def scrape_job(job):
+    job["job_description"], job["job_details"] = await extract_job_posting(job["Job Link"])
+    if job["job_description"] is None:
+        raise RuntimeError("Could not crawl the job posting.")
+    return job
+
+async def extract_job_fields(job, openai_client):
+    # Same local parser, prompt and model as the Streamlit flow, so both write identical rows
+    job_data = json.dumps({"job_description": job["job_description"], "job_details": job["job_details"]})
+    response, _, _ = await identify_job_details(openai_client, job_data)
+
+    job_df = parse_response_to_df(response)
+    if job_df is None:
+        raise RuntimeError("Could not parse the extracted job fields.")
+    job_df["job_description"] = json.dumps(job["job_description"])
+    job_df["job_link"] = job["Job Link"]
+    job["job_response"] = response
+    job["job_df"] = job_df
+    return job
+
+async def ingest_jobs(jobs, workers=BULK_INGEST_WORKERS, checkpoint_path=BULK_INGEST_CHECKPOINT_PATH):
+    """
+    Scrape, parse, embed and store many job links concurrently.
+
+    Every stage has its own pool of workers, connected by bounded asyncio queues, so a slow stage
+    applies back pressure instead of piling up work. Embeddings and inserts are batched across jobs.
+    A job is checkpointed as done, with the hash of its sheet row and of its embedded content, once
+    its row is inserted. Every job passed in is scraped; choosing which ones to run (new, changed and
+    failed rows) is up to the caller, see sheet_sync.find_pending_jobs. A job whose scraped content
+    turns out identical to what was ingested before is not embedded or inserted again.
+
+    Rows are upserted on job_link, so a posting ingested again (rechecked, or left unrecorded by a
+    crash between its insert and its checkpoint line) updates its row instead of adding another.
+    This needs the unique constraint on job_info.job_link from sql/job_info.sql.
+
+    Args:
+    - jobs (list): Dictionaries with 'ID' and 'Job Link', as returned by extract_job_data_from_sheet.
+    - workers (dict): Number of workers per stage ("scrape", "extract", "embed", "insert").
+    - checkpoint_path (str): The checkpoint file.
+
+    Returns:
+    - dict: Counts of jobs "done", "failed" and "content_unchanged", and the elapsed "seconds".
+    """
+    start = time.perf_counter()
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    openai_client = get_async_openai_client()
+    supabase = get_supabase_client()
+    counts = {"done": 0, "failed": 0, "content_unchanged": 0}
+
+    scrape_queue = asyncio.Queue(BULK_INGEST_QUEUE_SIZE)
+    extract_queue = asyncio.Queue(BULK_INGEST_QUEUE_SIZE)
+    embed_queue = asyncio.Queue(BULK_INGEST_QUEUE_SIZE)
+    insert_queue = asyncio.Queue(BULK_INGEST_QUEUE_SIZE)
+
+    def fail(job, error):
+        print(f"Job {job['ID']} failed: {error}")
+        checkpoint.record(job["ID"], "failed", error)
+        counts["failed"] += 1
+
+    async def scrape_worker():
+        while True:
+            job = await scrape_queue.get()
+            try:
+                await extract_queue.put(await scrape_job(job))
+            except Exception as e:
+                fail(job, e)
+            finally:
+                scrape_queue.task_done()
+
+    async def extract_worker():
+        while True:
+            job = await extract_queue.get()
+            try:
+                job = await extract_job_fields(job, openai_client)
+                job["content_hash"] = job_content_hash(job)
+                if checkpoint.has_content(job["ID"], job["content_hash"]):
+                    # Same text as the stored row, so the same embedding: only the sheet row is recorded
+                    checkpoint.record(job["ID"], "done", row_hash=job["row_hash"], content_hash=job["content_hash"])
+                    counts["content_unchanged"] += 1
+                else:
+                    await embed_queue.put(job)
+            except Exception as e:
+                fail(job, e)
+            finally:
+                extract_queue.task_done()
+
+    async def embed_worker():
+        while True:
+            batch = drain(embed_queue, await embed_queue.get(), BULK_INGEST_EMBED_BATCH_SIZE)
+            queued = 0
+            try:
+                # One embedding call for the whole batch, the rows keep their order
+                batch_df = pd.concat([job["job_df"] for job in batch], ignore_index=True)
+                batch_df = await generate_embeddings(batch_df, EMBEDDING_MODEL, "job")
+                for position, job in enumerate(batch):
+                    job["job_df"] = batch_df.iloc[[position]]
+                    await insert_queue.put(job)
+                    queued += 1
+            except Exception as e:
+                # Jobs already handed to the insert stage are finished there, only the rest failed here
+                for job in batch[queued:]:
+                    fail(job, e)
+            finally:
+                for _ in batch:
+                    embed_queue.task_done()
+
+    async def insert_worker():
+        while True:
+            batch = drain(insert_queue, await insert_queue.get(), BULK_INGEST_INSERT_BATCH_SIZE)
+            try:
+                rows = [row for job in batch for row in prepare_data_job_description(job["job_df"])]
+                # One statement cannot upsert the same link twice, keep the last row of sheet rows sharing a link
+                rows = list({row["job_link"]: row for row in rows}.values())
+                await insert_data_into_table(supabase, JOB_DETAILS_TABLE_NAME, rows, batch_size=BULK_INGEST_INSERT_BATCH_SIZE, upsert_on="job_link")
+                for job in batch:
+                    checkpoint.record(job["ID"], "done", row_hash=job["row_hash"], content_hash=job["content_hash"])
+                    counts["done"] += 1
+                print(f"Ingested {counts['done']} jobs ({counts['failed']} failed)")
+            except Exception as e:
+                for job in batch:
+                    fail(job, e)
+            finally:
+                for _ in batch:
+                    insert_queue.task_done()
+
+    stages = [
+        ("scrape", scrape_queue, scrape_worker),
+        ("extract", extract_queue, extract_worker),
+        ("embed", embed_queue, embed_worker),
+        ("insert", insert_queue, insert_worker),
+    ]
+    tasks = []
+    for name, _, worker in stages:
+        # Tasks copy the context they are created in, so every call a worker makes is attributed to its stage
+        with telemetry_stage(f"bulk_{name}"):
+            tasks += [asyncio.ensure_future(worker()) for _ in range(workers[name])]
+
+    try:
+        for job in jobs:
+            await scrape_queue.put(dict(job, row_hash=job_row_hash(job)))
+
+        # A stage is finished once its queue is empty and the stage before it can add nothing more
+        for _, queue, _ in stages:
+            await queue.join()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        checkpoint.close()
+
+    counts["seconds"] = time.perf_counter() - start
+    print(f"Bulk ingestion finished: {counts}")
+    return counts
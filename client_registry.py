@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import httpx
+import anthropic
+import openai
+from supabase import create_client
+from credentials import OPENAI_API, ANTHROPIC_API, SUPABASE_URL, SUPABASE_KEY
+from configuration import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY, HTTP_TIMEOUT
+
+# Process-wide clients, created on first use and shared by every module, session and rerun.
+# Modules are only imported once per Streamlit server process, so these survive reruns.
+_clients = {}
+# Async clients own connection pools bound to the event loop that first uses them, while every
+# Streamlit rerun runs in a fresh loop (asyncio.run). They are therefore only ever used on one
+# long-lived background loop (see on_client_loop), so their connections outlive the reruns too.
+_client_loop = None
+# Clients registered by hand (e.g. offline stand-ins), returned instead of real ones
+_overrides = {}
+_lock = threading.Lock()
+
+
+def _http_limits():
+    # Keep idle connections open so consecutive calls skip the TCP and TLS handshakes
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+def _get_or_create(name, factory):
+    with _lock:
+        if name in _overrides:
+            return _overrides[name]
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+def get_client_loop():
+    """
+    The background event loop every async client request runs on, started on first use.
+    """
+    global _client_loop
+    with _lock:
+        if _client_loop is None:
+            _client_loop = asyncio.new_event_loop()
+            threading.Thread(target=_client_loop.run_forever, name="async-clients", daemon=True).start()
+        return _client_loop
+
+async def on_client_loop(coro):
+    """
+    Await a coroutine on the client loop, from any event loop.
+
+    Usage:
+        response = await on_client_loop(client.embeddings.create(input=texts, model=model))
+    """
+    loop = get_client_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    # Cancelling the caller cancels the request on the client loop too
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+def _post(loop, queue, item):
+    try:
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+    except RuntimeError:
+        # The caller's loop already closed, nobody is reading any more
+        pass
+
+async def iterate_on_client_loop(iterator):
+    """
+    Run an async iterator on the client loop and yield its items on the caller's loop.
+
+    Args:
+    - iterator: Async iterator using the shared async clients, e.g. a generator over a streamed completion.
+
+    Yields:
+    - The iterator's items, in order. Whatever the iterator raises is raised here after them.
+    """
+    loop = get_client_loop()
+    caller = asyncio.get_running_loop()
+    if caller is loop:
+        async for item in iterator:
+            yield item
+        return
+
+    queue = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in iterator:
+                _post(caller, queue, (item, None))
+        except BaseException as e:
+            _post(caller, queue, (done, e))
+            raise
+        _post(caller, queue, (done, None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # Stops the iterator when the caller gives up early
+        future.cancel()
+
+def register_client(name, client):
+    """
+    Use the given client for `name` ("openai", "async_openai", "anthropic", "async_anthropic",
+    "supabase") instead of creating a real one. Pass None to remove the override.
+    """
+    with _lock:
+        if client is None:
+            _overrides.pop(name, None)
+        else:
+            _overrides[name] = client
+
+def get_openai_client():
+    return _get_or_create("openai", lambda: openai.OpenAI(
+        api_key=OPENAI_API,
+        http_client=openai.DefaultHttpxClient(limits=_http_limits(), timeout=HTTP_TIMEOUT),
+    ))
+
+def get_async_openai_client():
+    # Only await its requests through on_client_loop / iterate_on_client_loop
+    return _get_or_create("async_openai", lambda: openai.AsyncOpenAI(
+        api_key=OPENAI_API,
+        http_client=openai.DefaultAsyncHttpxClient(limits=_http_limits(), timeout=HTTP_TIMEOUT),
+    ))
+
+def get_anthropic_client():
+    return _get_or_create("anthropic", lambda: anthropic.Anthropic(
+        api_key=ANTHROPIC_API,
+        http_client=anthropic.DefaultHttpxClient(limits=_http_limits(), timeout=HTTP_TIMEOUT),
+    ))
+
+def get_async_anthropic_client():
+    # Only await its requests through on_client_loop / iterate_on_client_loop
+    return _get_or_create("async_anthropic", lambda: anthropic.AsyncAnthropic(
+        api_key=ANTHROPIC_API,
+        http_client=anthropic.DefaultAsyncHttpxClient(limits=_http_limits(), timeout=HTTP_TIMEOUT),
+    ))
+
+def get_supabase_client():
+    # The Supabase client keeps its own pooled HTTP session for PostgREST
+    return _get_or_create("supabase", lambda: create_client(SUPABASE_URL, SUPABASE_KEY))
@@ -1,6 +1,72 @@
 SUPABASE_RESUME_TABLE = "resume_data"
 JOB_DETAILS_TABLE_NAME = "job_info"
 
+# Bulk insert settings: batches in flight, JSON payload size per batch, request rate and retries
+SUPABASE_INSERT_MAX_CONCURRENCY = 4
+SUPABASE_INSERT_MAX_BATCH_BYTES = 2_000_000
+SUPABASE_REQUESTS_PER_SECOND = 10
+SUPABASE_INSERT_MAX_RETRIES = 3
+SUPABASE_RETRY_BASE_DELAY = 0.5
+
+# Resume uploads: the section extraction calls run concurrently, at most
+# RESUME_LLM_REQUESTS_PER_SECOND after an initial burst
+RESUME_LLM_REQUESTS_PER_SECOND = 10
+RESUME_LLM_REQUEST_BURST = 50
+
+# Shared HTTP connection pool settings for the OpenAI and Anthropic clients
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY = 60
+HTTP_TIMEOUT = 120
+
+# Maximum LLM requests in flight at once, per provider
+LLM_MAX_CONCURRENT_REQUESTS = {"openai": 8, "anthropic": 4, "groq": 4, "litellm": 4}
+
+# On-disk LLM response cache, keyed by provider, model, prompts and sampling parameters.
+# Entries expire after LLM_CACHE_TTL_SECONDS and are evicted least recently used first above the size limit.
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = ".cache/llm_responses.sqlite3"
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# On-disk cache of crawled job posting pages, keyed by URL. Pages older than the max age are crawled again
+# (callers may accept older ones), and pages are evicted least recently used first above the size limit.
+JOB_PAGE_CACHE_PATH = ".cache/job_pages.sqlite3"
+JOB_PAGE_CACHE_MAX_AGE_SECONDS = 24 * 60 * 60
+JOB_PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Pool of warm crawl4ai browsers, kept on a background event loop and reused across Streamlit reruns.
+# A browser is relaunched after CRAWLER_MAX_PAGES_PER_BROWSER pages, after a failed crawl,
+# or when it sat idle for CRAWLER_MAX_IDLE_SECONDS.
+CRAWLER_POOL_ENABLED = True
+CRAWLER_POOL_SIZE = 2
+CRAWLER_MAX_PAGES_PER_BROWSER = 50
+CRAWLER_MAX_IDLE_SECONDS = 10 * 60
+
+# Bulk ingestion of job links from Google Sheets: workers per stage, batch sizes and the checkpoint file
+# that lets an interrupted run resume (job IDs recorded as done are skipped)
+BULK_INGEST_WORKERS = {"scrape": 4, "extract": 8, "embed": 1, "insert": 1}
+BULK_INGEST_QUEUE_SIZE = 64
+BULK_INGEST_EMBED_BATCH_SIZE = 32
+BULK_INGEST_INSERT_BATCH_SIZE = 50
+BULK_INGEST_CHECKPOINT_PATH = ".cache/bulk_ingest_checkpoint.jsonl"
+
+# The local job parser fills IDENTIFY_DETAILS_FROM_JOB_PROMPT fields with regexes and dictionaries;
+# only fields it is less confident about than this are asked from the model (0 never calls the model)
+JOB_PARSER_CONFIDENCE_THRESHOLD = 0.7
+# Fields never asked from the model, whatever the parser's confidence: they keep the local value,
+# often null. Suggestions, cover letters and resume summaries read every field, so opt in with care
+JOB_PARSER_SKIPPED_FIELDS = []
+
+# Telemetry: one JSON line per LLM, embedding and database call (and per pipeline stage), appended to METRICS_PATH
+METRICS_ENABLED = True
+METRICS_PATH = ".cache/metrics.jsonl"
+
+# Tracing: spans of each Analyze run are written to TRACE_DIR as Chrome trace and OTLP JSON files
+TRACE_ENABLED = True
+TRACE_DIR = ".cache/traces"
+TRACE_MAX_SPANS = 20000
+
 IDENTIFY_DETAILS_FROM_RESUME_PROMPT_old = (
 "You are a professional AI model tasked with extracting specific sections and their content from a resume. "
 "The resume is provided to you in free text format, and your job is to identify the following sections and extract their corresponding content. "
@@ -202,6 +268,39 @@ You are an expert summarizer for job roles. Your task is to clearly and accurate
 
 EMBEDDING_MODEL = "text-embedding-3-small"
 
+# Tokenizer used by the text-embedding-3 models, needed to pack requests under the API limits
+EMBEDDING_ENCODING = "cl100k_base"
+
+# OpenAI embeddings API limits (inputs and tokens per request, tokens per single input)
+EMBEDDING_MAX_INPUTS_PER_REQUEST = 2048
+EMBEDDING_MAX_TOKENS_PER_REQUEST = 300_000
+EMBEDDING_MAX_TOKENS_PER_INPUT = 8191
+
+# Number of embedding requests allowed in flight at the same time
+EMBEDDING_MAX_CONCURRENT_REQUESTS = 4
+
+# On-disk embedding cache (SQLite file, evicted least recently used first above the size limit)
+EMBEDDING_CACHE_PATH = ".cache/embeddings.sqlite3"
+EMBEDDING_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# How embeddings are written to Supabase: "json" (list of floats), or "float32" / "float16"
+# (base64 text, 4-8x smaller; needs text embedding columns and rules out the pgvector search backend)
+EMBEDDING_STORAGE_FORMAT = "json"
+
+# Minimum percentage match for an extra_info (RAG) entry to be passed to the suggestions prompt
+RAG_MATCH_THRESHOLD = 30
+
+# Approximate nearest-neighbour index over extra_info, used once the table has RAG_ANN_MIN_ROWS rows
+RAG_ANN_INDEX_PATH = ".cache/rag_ann_index"
+RAG_ANN_MIN_ROWS = 5000
+RAG_ANN_CANDIDATES = 100
+RAG_ANN_NPROBE = 16
+
+# Where RAG and resume matching happen: "client" fetches extra_info and the selected resumes and
+# matches locally, "pgvector" calls match_extra_info and match_resume_data from sql/vector_search.sql
+VECTOR_SEARCH_BACKEND = "client"
+VECTOR_SEARCH_MATCH_COUNT = 20
+
 IDENTIFY_DETAILS_FORM_RESUME_MODEL = "gpt-4o-mini"
 
 #IDENTIFY_DETAILS_FORM_RESUME_MODEL = "claude-3-5-sonnet-20240620"
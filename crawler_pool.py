@@ -0,0 +1,162 @@
+import asyncio
+import atexit
+import threading
+import time
+from crawl4ai import AsyncWebCrawler
+from configuration import CRAWLER_POOL_SIZE, CRAWLER_MAX_PAGES_PER_BROWSER, CRAWLER_MAX_IDLE_SECONDS
+
+
+class PooledCrawler:
+    """
+    A started AsyncWebCrawler and the bookkeeping used to decide when to relaunch it.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.pages = 0
+        self.healthy = True
+        self.last_used = time.monotonic()
+
+
+class CrawlerPool:
+    """
+    Bounded pool of warm crawl4ai browsers, reused across requests and Streamlit reruns.
+
+    A browser belongs to the event loop that launched it, while Streamlit runs every rerun in a new
+    loop. The pool therefore owns a background thread with its own long-lived loop; callers on any
+    loop submit crawls to it and await the result.
+
+    Browsers are health checked before every use and relaunched after max_pages pages, after sitting
+    idle for max_idle_seconds, or straight away after a crawl raised or returned an unsuccessful result.
+    """
+
+    def __init__(self, size=CRAWLER_POOL_SIZE, max_pages=CRAWLER_MAX_PAGES_PER_BROWSER,
+                 max_idle_seconds=CRAWLER_MAX_IDLE_SECONDS, crawler_factory=None):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_idle_seconds = max_idle_seconds
+        self.crawler_factory = crawler_factory or (lambda: AsyncWebCrawler(verbose=True))
+        self.launched = 0
+        self.recycled = 0
+        self.pages = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="crawler-pool", daemon=True)
+        self._thread.start()
+        # Created on the pool's loop, asyncio primitives must belong to the loop that uses them
+        self._idle = asyncio.run_coroutine_threadsafe(self._make_queue(), self._loop).result()
+        self._slots = asyncio.run_coroutine_threadsafe(self._make_slots(), self._loop).result()
+        self._closed = False
+
+    async def _make_queue(self):
+        return asyncio.Queue()
+
+    async def _make_slots(self):
+        return asyncio.Semaphore(self.size)
+
+    async def _launch(self):
+        crawler = self.crawler_factory()
+        # __aenter__ starts the browser on every crawl4ai version, start() only exists on newer ones
+        await crawler.__aenter__()
+        self.launched += 1
+        return PooledCrawler(crawler)
+
+    async def _shutdown(self, pooled):
+        try:
+            await pooled.crawler.__aexit__(None, None, None)
+        except Exception as e:
+            print(f"Error while closing a pooled browser: {e}")
+
+    def _is_usable(self, pooled):
+        return (
+            pooled.healthy
+            and pooled.pages < self.max_pages
+            and time.monotonic() - pooled.last_used < self.max_idle_seconds
+        )
+
+    async def _acquire(self):
+        # Reuse an idle browser that passes the health check, otherwise launch a fresh one
+        while not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            if self._is_usable(pooled):
+                return pooled
+            self.recycled += 1
+            await self._shutdown(pooled)
+        return await self._launch()
+
+    async def _crawl(self, url, kwargs):
+        # The semaphore bounds the number of browsers, there is at most one per slot
+        async with self._slots:
+            pooled = await self._acquire()
+            try:
+                result = await pooled.crawler.arun(url=url, **kwargs)
+                # A failed crawl (crashed browser, dead context, blocked page) can leave the browser broken
+                if not getattr(result, "success", True):
+                    pooled.healthy = False
+            except Exception:
+                pooled.healthy = False
+                raise
+            finally:
+                pooled.pages += 1
+                pooled.last_used = time.monotonic()
+                self.pages += 1
+                if pooled.healthy:
+                    self._idle.put_nowait(pooled)
+                else:
+                    # Closed before the slot is released, so the next crawl starts with a fresh browser
+                    self.recycled += 1
+                    await self._shutdown(pooled)
+            return result
+
+    async def arun(self, url, **kwargs):
+        """
+        Crawl a URL with a pooled browser. Can be awaited from any event loop.
+
+        Args:
+        - url (str): The page to crawl.
+        - kwargs: Passed on to AsyncWebCrawler.arun.
+
+        Returns:
+        - The crawl4ai CrawlResult.
+        """
+        if self._closed:
+            raise RuntimeError("The crawler pool is closed.")
+        future = asyncio.run_coroutine_threadsafe(self._crawl(url, kwargs), self._loop)
+        return await asyncio.wrap_future(future)
+
+    async def _close_all(self):
+        while not self._idle.empty():
+            await self._shutdown(self._idle.get_nowait())
+
+    def close(self):
+        """
+        Close every browser and stop the background loop.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result(timeout=30)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "launched": self.launched,
+            "recycled": self.recycled,
+            "pages": self.pages,
+            "idle": self._idle.qsize(),
+        }
+
+
+_crawler_pool = None
+_crawler_pool_lock = threading.Lock()
+
+def get_crawler_pool():
+    # One pool per process, shared by every Streamlit session and rerun
+    global _crawler_pool
+    with _crawler_pool_lock:
+        if _crawler_pool is None:
+            _crawler_pool = CrawlerPool()
+            atexit.register(_crawler_pool.close)
+        return _crawler_pool
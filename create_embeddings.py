@@ -1,68 +1,157 @@
 # pip install accelerate
+import asyncio
+import numpy as np
 import pandas as pd
-import pandas as pd
-from openai import OpenAI
-from credentials import OPENAI_API
+import tiktoken
+from client_registry import get_async_openai_client, on_client_loop
 import streamlit as st
+from embedding_cache import get_embedding_cache
+from single_flight import embedding_requests, request_key
+from telemetry import record_usage, track_call
+from tracing import profiled
+from configuration import EMBEDDING_ENCODING, EMBEDDING_MAX_INPUTS_PER_REQUEST, EMBEDDING_MAX_TOKENS_PER_REQUEST, EMBEDDING_MAX_TOKENS_PER_INPUT, EMBEDDING_MAX_CONCURRENT_REQUESTS
+
+# Text column to embed and column to write the vectors to, for each embedding_of value
+EMBEDDING_COLUMNS = {
+    "resume": ("resume_text", "resume_embedding"),
+    "job": ("job_description", "job_description_embeddings"),
+    "rag_text": ("text", "text_embedding"),
+}
+
+def pack_embedding_batches(texts, encoder, max_inputs=EMBEDDING_MAX_INPUTS_PER_REQUEST, max_tokens=EMBEDDING_MAX_TOKENS_PER_REQUEST, max_tokens_per_input=EMBEDDING_MAX_TOKENS_PER_INPUT):
+    """
+    Pack texts into request sized batches that stay under the embeddings API limits.
+
+    Args:
+    - texts (list): The texts to embed, in order.
+    - encoder: tiktoken encoding used to count tokens.
+    - max_inputs (int): Maximum number of inputs in a single request.
+    - max_tokens (int): Maximum number of tokens summed over a single request.
+    - max_tokens_per_input (int): Inputs longer than this are truncated.
+
+    Returns:
+    - list: (start_index, batch_texts) tuples covering the texts in order.
+    """
+    batches = []
+    batch, batch_start, batch_tokens = [], 0, 0
+
+    for index, tokens in enumerate(encoder.encode_ordinary_batch(texts)):
+        text = texts[index]
+        if len(tokens) > max_tokens_per_input:
+            # The API rejects over-long inputs, so keep only the leading tokens
+            tokens = tokens[:max_tokens_per_input]
+            text = encoder.decode(tokens)
+
+        # Close the current batch when adding this input would break either limit
+        if batch and (len(batch) >= max_inputs or batch_tokens + len(tokens) > max_tokens):
+            batches.append((batch_start, batch))
+            batch, batch_start, batch_tokens = [], index, 0
+
+        batch.append(text)
+        batch_tokens += len(tokens)
+
+    if batch:
+        batches.append((batch_start, batch))
+    return batches
+
+async def request_embeddings(texts, embedding_model, client=None, max_concurrency=EMBEDDING_MAX_CONCURRENT_REQUESTS):
+    """
+    Embed a list of texts with as few API requests as possible, bypassing the cache.
+
+    Args:
+    - texts (list): The texts to embed (non-empty strings).
+    - embedding_model (str): The OpenAI embedding model to use.
+    - client (AsyncOpenAI): Optional async client, the shared one is used when not given.
+    - max_concurrency (int): Number of batch requests allowed in flight at once.
+
+    Returns:
+    - np.ndarray: Contiguous float32 matrix with one row per input text, in input order.
+    """
+    encoder = tiktoken.get_encoding(EMBEDDING_ENCODING)
+    with profiled("tokenization"):
+        batches = pack_embedding_batches(texts, encoder)
+    print(f"Embedding {len(texts)} texts in {len(batches)} request(s)...")
+
+    client = client or get_async_openai_client()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def embed_batch(batch_start, batch):
+        async with semaphore:
+            response = await on_client_loop(client.embeddings.create(input=batch, model=embedding_model))
+        record_usage(response.usage)
+        return batch_start, response.data
+
+    results = await asyncio.gather(*(embed_batch(batch_start, batch) for batch_start, batch in batches))
+
+    # Write every vector back at its original position, using the index the API returns for each item
+    dimensions = len(results[0][1][0].embedding)
+    matrix = np.empty((len(texts), dimensions), dtype=np.float32)
+    for batch_start, items in results:
+        for item in items:
+            matrix[batch_start + item.index] = item.embedding
+
+    return matrix
+
+async def embed_texts(texts, embedding_model, client=None, max_concurrency=EMBEDDING_MAX_CONCURRENT_REQUESTS, use_cache=True):
+    """
+    Embed a list of texts, serving repeated texts from the on-disk embedding cache.
+
+    Args:
+    - texts (list): The texts to embed.
+    - embedding_model (str): The OpenAI embedding model to use.
+    - client (AsyncOpenAI): Optional async client, the shared one is used when not given.
+    - max_concurrency (int): Number of batch requests allowed in flight at once.
+    - use_cache (bool): Read and write the embedding cache (default is True).
+
+    Returns:
+    - np.ndarray: Contiguous float32 matrix with one row per input text, in input order.
+    """
+    # The API rejects empty strings, so send a single space for missing text
+    texts = [str(text) if text is not None and str(text).strip() else " " for text in texts]
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    cache = get_embedding_cache() if use_cache else None
+    cached = cache.get_many(embedding_model, texts) if cache else {}
+
+    # Only texts missing from the cache go to the API, and each distinct text only once
+    missing = list(dict.fromkeys(text for index, text in enumerate(texts) if index not in cached))
+    fresh = {}
+    async with track_call("embedding", "openai", embedding_model) as record:
+        record.cache_hit = not missing
+        if missing:
+            async def request_and_store():
+                missing_matrix = await request_embeddings(missing, embedding_model, client, max_concurrency)
+                if cache:
+                    cache.put_many(embedding_model, missing, missing_matrix)
+                return missing_matrix
+
+            # Concurrent identical requests (same posting analyzed twice at once) share one API call
+            missing_matrix = await embedding_requests.run(request_key(embedding_model, missing), request_and_store)
+            fresh = dict(zip(missing, missing_matrix))
+        else:
+            print(f"All {len(texts)} embeddings served from cache.")
+
+    dimensions = len(next(iter(cached.values()))) if cached else missing_matrix.shape[1]
+    matrix = np.empty((len(texts), dimensions), dtype=np.float32)
+    for index, text in enumerate(texts):
+        matrix[index] = cached[index] if index in cached else fresh[text]
+
+    return matrix
 
 async def generate_embeddings(dataframe, embedding_model, embedding_of):
-    # Ensure that OpenAI API client is set up
-    openai_client = OpenAI(api_key=OPENAI_API)
-
-    if embedding_of == "resume":
-        embeddings = []
-        for index, row in dataframe.iterrows():
-            final_str_cleaned = row['resume_text']
-            
-            # Generate embeddings using OpenAI API
-            response = openai_client.embeddings.create(
-                input=final_str_cleaned,
-                model=embedding_model
-            )
-            
-            embeddings.append(response.data[0].embedding)  # Assuming this is the correct structure
-        
-        # Add embeddings to the DataFrame
-        dataframe['resume_embedding'] = embeddings
-        return dataframe
-    
-    elif embedding_of == "job":
-        embeddings = []
-        for index, row in dataframe.iterrows():
-            job_description = row['job_description']
-            
-            # Generate embeddings using OpenAI API
-            response = openai_client.embeddings.create(
-                input=job_description,
-                model="text-embedding-3-small"
-            )
-            
-            embeddings.append(response.data[0].embedding)  # Append the embedding for each job
-        
-        # Add embeddings to the DataFrame
-        dataframe['job_description_embeddings'] = embeddings
-        return dataframe
-    
-    elif embedding_of == "rag_text":
-        embeddings = []
-        for index, row in dataframe.iterrows():
-            rag_text = row['text']
-            
-            # Generate embeddings using OpenAI API
-            response = openai_client.embeddings.create(
-                input=rag_text,
-                model="text-embedding-3-small"
-            )
-            
-            embeddings.append(response.data[0].embedding)  # Append the embedding for each job
-        
-        # Add embeddings to the DataFrame
-        dataframe['text_embedding'] = embeddings
-        return dataframe
-    
-    else:
+    if embedding_of not in EMBEDDING_COLUMNS:
         return "Incorrect embedding of parameter passed."
 
+    text_column, embedding_column = EMBEDDING_COLUMNS[embedding_of]
+
+    # Generate embeddings for the whole column in batched requests
+    embedding_matrix = await embed_texts(dataframe[text_column].tolist(), embedding_model)
+
+    # Add embeddings to the DataFrame (as lists, so the rows stay JSON serializable for Supabase)
+    dataframe[embedding_column] = embedding_matrix.tolist()
+    return dataframe
+
 def load_tokenizer_t5():
     print("Downloading model and tokenizer....")
     tokenizer = T5Tokenizer.from_pretrained("google/flan-t5-large")
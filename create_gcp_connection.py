@@ -41,9 +41,55 @@ def authenticate_google_apis():
 
     return drive_service, sheets_service
 
+def column_letter(index):
+    # 0 -> A, 25 -> Z, 26 -> AA
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+def fetch_sheet_columns(sheets_service, spreadsheet_id, sheet_name, column_names):
+    """
+    Fetches only the named columns of a sheet: the header row first, then one batchGet for the columns.
+
+    Parameters:
+    - sheets_service: Google Sheets API service object.
+    - spreadsheet_id: The ID of the Google Spreadsheet.
+    - sheet_name: The name of the specific sheet to read from.
+    - column_names: Header names of the columns to fetch.
+
+    Returns:
+    - A list of dictionaries, one per row, keyed by column name. None if a column is missing from the header.
+    """
+    header_result = sheets_service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=f'{sheet_name}!1:1').execute()
+    headers = header_result.get('values', [[]])[0] if header_result.get('values') else []
+    try:
+        indexes = [headers.index(name) for name in column_names]
+    except ValueError:
+        print(f'Required columns {list(column_names)} not found in the sheet.')
+        return None
+
+    # Open-ended ranges such as Sheet1!C2:C return each column down to its last filled cell
+    ranges = [f'{sheet_name}!{column_letter(index)}2:{column_letter(index)}' for index in indexes]
+    result = sheets_service.spreadsheets().values().batchGet(
+        spreadsheetId=spreadsheet_id, ranges=ranges, majorDimension='COLUMNS'
+    ).execute()
+    columns = [(value_range.get('values') or [[]])[0] for value_range in result.get('valueRanges', [])]
+
+    row_count = max((len(column) for column in columns), default=0)
+    rows = []
+    for row_number in range(row_count):
+        rows.append({
+            name: column[row_number] if row_number < len(column) else ''
+            for name, column in zip(column_names, columns)
+        })
+    return rows
+
 def extract_job_data_from_sheet(sheets_service, spreadsheet_id, sheet_name):
     """
-    Fetches the data from the Google Sheet and extracts the columns for ID and Job Link.
+    Fetches the ID and Job Link columns from the Google Sheet.
     
     Parameters:
     - sheets_service: Google Sheets API service object.
@@ -53,37 +99,16 @@ def extract_job_data_from_sheet(sheets_service, spreadsheet_id, sheet_name):
     Returns:
     - A list of dictionaries, each containing 'ID' and 'Job Link'.
     """
-    # Define the range to fetch all data from the sheet
-    range_name = f'{sheet_name}!A:Z'  # Adjust the range as needed (assuming columns are within A-Z)
-    
-    # Fetch data from Google Sheets
-    result = sheets_service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
-    rows = result.get('values', [])
-
-    # Check if the sheet contains data
+    # Only the two needed columns are downloaded, not the whole A:Z range
+    rows = fetch_sheet_columns(sheets_service, spreadsheet_id, sheet_name, ['ID', 'Job Link'])
+    if rows is None:
+        return []
     if not rows:
         print('No data found in the sheet.')
         return []
 
-    # Assuming the first row contains headers, find the indexes for 'ID' and 'Job Link'
-    headers = rows[0]
-    try:
-        id_index = headers.index('ID')  # Adjust if column header is different
-        job_link_index = headers.index('Job Link')  # Adjust if column header is different
-    except ValueError:
-        print('Required columns (ID, Job Link) not found in the sheet.')
-        return []
-
-    # Extract data for 'ID' and 'Job Link' columns
-    job_data = []
-    for row in rows[1:]:  # Skip the header row
-        if len(row) > max(id_index, job_link_index):  # Ensure the row has enough columns
-            job_data.append({
-                'ID': row[id_index],
-                'Job Link': row[job_link_index]
-            })
-
-    return job_data
+    # Skip rows where either cell is empty
+    return [row for row in rows if row['ID'] and row['Job Link']]
 
 # Assuming you have authenticated and have the `sheets_service`
 spreadsheet_id = '1se48TIjgf49cu4NjieXUW6VNrOB0SdcFb9UNbvDbdOw'  # Replace with your actual Spreadsheet ID
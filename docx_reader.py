@@ -0,0 +1,14 @@
+import docx
+
+def extract_text_from_docx(file_path):
+    # Open the .docx file
+    doc = docx.Document(file_path)
+    
+    # Extract all the text
+    resume_text = []
+    for paragraph in doc.paragraphs:
+        # Add non-empty paragraphs to the list
+        if paragraph.text.strip():
+            resume_text.append(paragraph.text.strip())
+    
+    return resume_text
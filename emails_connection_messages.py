@@ -1,11 +1,14 @@
-from prompt_openai import run_openai_chat_completion
+from prompt_openai import run_openai_chat_completion, stream_openai_chat_completion
 import json
-from prompt_anthropic import run_anthropic_chat_completion
-import streamlit as st
+from prompt_anthropic import run_anthropic_chat_completion, stream_anthropic_chat_completion
+from llm_concurrency import collect_stream
+from llm_cache import is_error_response
+from client_registry import get_async_openai_client, get_async_anthropic_client
 
 
-async def generate_connection_messages_email(system_prompt, structured_job_data, resume_text, model_name, model_temp):
-    
+async def generate_connection_messages_email(system_prompt, structured_job_data, resume_text, model_name, model_temp, on_text=None, openai_client=None, anthropic_client=None, use_cache=False):
+    # use_cache: new messages are written on every Analyze by default, True reuses the last ones for the same inputs
+
     ## Construct a user_prompt that will have structure job description 
     # Convert all columns in the job description DataFrame to a single text string
     #job_description_text = " ".join(structured_job_data.fillna("").astype(str).values.flatten())
@@ -16,13 +19,21 @@ async def generate_connection_messages_email(system_prompt, structured_job_data,
     "job_description_text" : "{structured_job_data}"
     '''
     if model_name != "claude-3-5-sonnet-20240620":
+        # The clients default to the shared ones, the same ones the session holds
+        openai_client = openai_client or get_async_openai_client()
+        # Stream the messages when the caller wants to show them as they are written
+        if on_text is not None:
+            return await collect_stream(stream_openai_chat_completion(openai_client, user_prompt, system_prompt, model_name, model_temp, use_cache=use_cache), on_text)
         # Generate suggestions using the LLaMA model
-        suggestions = await run_openai_chat_completion(st.session_state.openai_client, user_prompt, system_prompt, model_name, model_temp)
+        suggestions = await run_openai_chat_completion(openai_client, user_prompt, system_prompt, model_name, model_temp, use_cache=use_cache)
         return suggestions
     
     else:
-        suggestions = await run_anthropic_chat_completion(st.session_state.anthropic_client, json.dumps(user_prompt), system_prompt, model_name, max_tokens = 2500)
+        anthropic_client = anthropic_client or get_async_anthropic_client()
+        if on_text is not None:
+            return await collect_stream(stream_anthropic_chat_completion(anthropic_client, json.dumps(user_prompt), system_prompt, model_name, max_tokens = 2500, use_cache=use_cache), on_text)
+        suggestions = await run_anthropic_chat_completion(anthropic_client, json.dumps(user_prompt), system_prompt, model_name, max_tokens = 2500, use_cache=use_cache)
+        # Failures come back as {"error": ...}, returned as the same error text the streamed path gives
+        if is_error_response(suggestions):
+            return suggestions['error']
         return suggestions['content']
-
-
-
@@ -0,0 +1,58 @@
+import hashlib
+import unicodedata
+import numpy as np
+from sqlite_lru_store import SharedInstance, SqliteLruStore
+from configuration import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES
+
+
+def normalize_text(text):
+    # Unicode normalize and collapse whitespace so cosmetic differences share a cache entry
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+def embedding_cache_key(model, text):
+    normalized = normalize_text(text)
+    return hashlib.sha256(f"{model}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache, keyed by the hash of (model, normalized text).
+
+    Vectors are stored as raw float32 bytes. When the stored vectors grow past max_bytes the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_bytes=EMBEDDING_CACHE_MAX_BYTES):
+        self.store = SqliteLruStore(path, "embeddings", max_bytes, metadata_columns=("model", "dimensions"))
+
+    def get_many(self, model, texts):
+        """
+        Look up cached vectors for a list of texts.
+
+        Returns:
+        - dict: Position in texts -> float32 vector, for the texts that were cached.
+        """
+        keys = [embedding_cache_key(model, text) for text in texts]
+        found = self.store.get_many(keys)
+        return {
+            index: np.frombuffer(found[key], dtype=np.float32) for index, key in enumerate(keys) if key in found
+        }
+
+    def put_many(self, model, texts, vectors):
+        entries = []
+        for text, vector in zip(texts, vectors):
+            vector = np.ascontiguousarray(vector, dtype=np.float32)
+            entries.append((embedding_cache_key(model, text), vector.tobytes(), (model, vector.shape[0])))
+        self.store.put_many(entries)
+
+    def stats(self):
+        return self.store.stats()
+
+    def clear(self):
+        self.store.clear()
+
+
+_embedding_cache = SharedInstance(EmbeddingCache)
+
+def get_embedding_cache():
+    return _embedding_cache.get()
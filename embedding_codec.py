@@ -0,0 +1,100 @@
+import base64
+import numpy as np
+from configuration import EMBEDDING_STORAGE_FORMAT
+
+# Prefix and little-endian dtype of each binary storage format
+BINARY_FORMATS = {
+    "float32": ("f32:", "<f4"),
+    "float16": ("f16:", "<f2"),
+}
+PREFIX_DTYPES = {prefix: dtype for prefix, dtype in BINARY_FORMATS.values()}
+
+# Embedding columns of the Supabase tables, decoded to NumPy arrays when rows are fetched
+EMBEDDING_COLUMN_NAMES = ("resume_embedding", "job_description_embeddings", "text_embedding")
+
+
+def encode_embedding(vector, storage_format=EMBEDDING_STORAGE_FORMAT):
+    """
+    Encode an embedding for storage in a Supabase row.
+
+    Args:
+    - vector: The embedding, as a list or array.
+    - storage_format (str): "json" for a list of floats, "float32" or "float16" for a prefixed base64 string.
+
+    Returns:
+    - list or str: The encoded embedding (None stays None).
+    """
+    if vector is None:
+        return None
+    if storage_format == "json":
+        return np.asarray(vector, dtype=np.float32).tolist()
+
+    prefix, dtype = BINARY_FORMATS[storage_format]
+    return prefix + base64.b64encode(np.asarray(vector, dtype=dtype).tobytes()).decode("ascii")
+
+def decode_embedding(value):
+    """
+    Decode an embedding read from Supabase into a float32 array.
+
+    Accepts the base64 formats written by encode_embedding, JSON lists, and pgvector's
+    text form ("[0.1,0.2,...]").
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        dtype = PREFIX_DTYPES.get(value[:4])
+        if dtype is not None:
+            return np.frombuffer(base64.b64decode(value[4:]), dtype=dtype).astype(np.float32)
+        return np.array(value.strip("[]").split(","), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+def is_missing_embedding(value):
+    # Rows whose embedding was never written come back as None, or NaN once pandas has touched the column
+    return value is None or (isinstance(value, float) and value != value)
+
+def decode_embedding_column(values, with_mask=False):
+    """
+    Decode a whole column of embeddings straight into a contiguous float32 matrix.
+
+    Rows without an embedding (None or NaN) decode to rows of zeros, which match nothing.
+
+    Args:
+    - values: Iterable of stored embeddings, e.g. a DataFrame column.
+    - with_mask (bool): Also return which rows had an embedding.
+
+    Returns:
+    - np.ndarray: float32 matrix with one row per value, or (matrix, valid) with valid a boolean
+      array when with_mask is True.
+    """
+    values = list(values)
+    valid = np.array([not is_missing_embedding(value) for value in values], dtype=bool)
+    if valid.all():
+        matrix = _decode_present(values)
+    else:
+        present = _decode_present([value for value, is_valid in zip(values, valid) if is_valid])
+        matrix = np.zeros((len(values), present.shape[1]), dtype=np.float32)
+        matrix[valid] = present
+    return (matrix, valid) if with_mask else matrix
+
+def _decode_present(values):
+    if not values:
+        return np.empty((0, 0), dtype=np.float32)
+
+    # All rows in the same binary format: decode the bytes once, without a per-row array
+    first = values[0]
+    if isinstance(first, str) and first[:4] in PREFIX_DTYPES and all(isinstance(value, str) and value[:4] == first[:4] for value in values):
+        raw = b"".join(base64.b64decode(value[4:]) for value in values)
+        return np.frombuffer(raw, dtype=PREFIX_DTYPES[first[:4]]).reshape(len(values), -1).astype(np.float32)
+
+    # Lists and arrays convert in one call, mixed or text columns are decoded row by row
+    if not any(isinstance(value, str) for value in values):
+        return np.ascontiguousarray(np.asarray(values, dtype=np.float32))
+    return np.ascontiguousarray(np.asarray([decode_embedding(value) for value in values], dtype=np.float32))
+
+def decode_embedding_columns(dataframe):
+    # Replace stored embeddings with float32 arrays, so matching never parses floats again; missing ones stay None
+    for column in EMBEDDING_COLUMN_NAMES:
+        if column in dataframe.columns:
+            matrix, valid = decode_embedding_column(dataframe[column], with_mask=True)
+            dataframe[column] = [row if is_valid else None for row, is_valid in zip(matrix, valid)]
+    return dataframe
@@ -0,0 +1,90 @@
+import numpy as np
+from embedding_codec import decode_embedding_column
+
+
+def stack_embeddings(values):
+    """
+    Stack a column of embeddings (lists or arrays) into a contiguous float32 matrix.
+
+    Args:
+    - values: Iterable of equal-length vectors (lists, arrays or encoded strings), e.g. a DataFrame column.
+
+    Returns:
+    - np.ndarray: float32 matrix with one row per vector, zeros for rows without an embedding.
+    """
+    # Decoding the whole column at once is much cheaper than vstack over per-row arrays
+    return decode_embedding_column(values)
+
+def normalize_rows(matrix):
+    # Scale every row to unit length so a dot product is the cosine similarity
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+class EmbeddingMatcher:
+    """
+    Cosine-similarity matcher over a fixed set of embeddings.
+
+    The embeddings are normalized once into a float32 matrix, so every query is a single
+    matrix-vector (or matrix-matrix, for several job vectors) product.
+    """
+
+    def __init__(self, embeddings, ids=None):
+        self.matrix = normalize_rows(embeddings) if len(embeddings) else np.empty((0, 0), dtype=np.float32)
+        self.ids = np.arange(len(self.matrix)) if ids is None else np.asarray(ids)
+
+    @classmethod
+    def from_frame(cls, dataframe, embedding_column, id_column=None):
+        ids = dataframe[id_column].to_numpy() if id_column else None
+        return cls(stack_embeddings(dataframe[embedding_column]), ids=ids)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def scores(self, query):
+        """
+        Cosine similarity between the query vector(s) and every stored embedding.
+
+        Args:
+        - query (np.ndarray): A single vector of shape (d,) or a matrix of job vectors (m, d).
+
+        Returns:
+        - np.ndarray: Scores of shape (n,) for a single vector, or (m, n) for a matrix.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        single = query.ndim == 1
+        scores = normalize_rows(np.atleast_2d(query)) @ self.matrix.T
+        return scores[0] if single else scores
+
+    def top_k(self, query, k):
+        """
+        The k best matching rows for the query vector(s), best first.
+
+        Returns:
+        - tuple: (positions, scores), shaped (k,) for a single vector or (m, k) for a matrix.
+        """
+        scores = self.scores(query)
+        k = min(k, scores.shape[-1])
+        if k <= 0:
+            empty = np.empty(scores.shape[:-1] + (0,))
+            return empty.astype(np.intp), empty.astype(np.float32)
+
+        # argpartition finds the top k in linear time, only those k are then sorted
+        positions = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+        top_scores = np.take_along_axis(scores, positions, axis=-1)
+        order = np.argsort(-top_scores, axis=-1)
+        return np.take_along_axis(positions, order, axis=-1), np.take_along_axis(top_scores, order, axis=-1)
+
+    def above_threshold(self, query, threshold):
+        """
+        All rows whose similarity with a single query vector is at least threshold, best first.
+
+        Returns:
+        - tuple: (positions, scores) of the matching rows.
+        """
+        scores = self.scores(query)
+        positions = np.flatnonzero(scores >= threshold)
+        positions = positions[np.argsort(-scores[positions])]
+        return positions, scores[positions]
@@ -1,16 +1,24 @@
+import asyncio
 import numpy as np
 import pandas as pd
 import os
-from resume_text import extract_text_from_docx, clean_llm_response_for_resume
-from sklearn.metrics.pairwise import cosine_similarity
+from docx_reader import extract_text_from_docx
+from resume_text import clean_llm_response_for_resume
+from embedding_matcher import EmbeddingMatcher, stack_embeddings
 from prompt_llm_for_resume import run_llama_prompt
-import streamlit as st
 from prompt_openai import run_openai_chat_completion
 import json
 from credentials import ANTHROPIC_API
 from llm_api_calls_LiteLLM import run_liteLLM_call
-from prompt_anthropic import run_anthropic_chat_completion
+from prompt_anthropic import run_anthropic_chat_completion, stream_anthropic_chat_completion
+from llm_concurrency import collect_stream
+from client_registry import get_async_openai_client, get_async_anthropic_client
+from llm_cache import is_error_response
+from rate_limiter import TokenBucket
 import re
+from vector_search import search_similar_rows
+from tracing import profiled
+from configuration import RAG_MATCH_THRESHOLD, VECTOR_SEARCH_BACKEND, RESUME_LLM_REQUESTS_PER_SECOND, RESUME_LLM_REQUEST_BURST
 
 
 os.environ["ANTHROPIC_API_KEY"] = ANTHROPIC_API
@@ -19,70 +27,154 @@ os.environ["ANTHROPIC_API_KEY"] = ANTHROPIC_API
 TEMP_DIR = "temp_dir"
 os.makedirs(TEMP_DIR, exist_ok=True)  # This will create the directory if it does not exist
 
-async def process_resumes(file_paths, IDENTIFY_DETAILS_FROM_RESUME_PROMPT, model):
-    all_resumes = []  # List to collect resumes as dicts
+# One request budget for resume extraction, shared by every upload in the process
+resume_llm_rate_limiter = TokenBucket(RESUME_LLM_REQUESTS_PER_SECOND, capacity=RESUME_LLM_REQUEST_BURST)
 
-    for file_path in file_paths:
+async def parse_resume_file(file_path):
+    """
+    Text of a DOCX resume, parsed in a thread so large files do not hold up the event loop.
+    """
+    return await asyncio.to_thread(extract_text_from_docx, file_path)
+
+async def process_resumes(file_paths, IDENTIFY_DETAILS_FROM_RESUME_PROMPT, model, openai_client=None, on_progress=None):
+    """
+    Extract the sections of many resumes concurrently.
+
+    Every file is parsed in a thread and its extraction call starts as soon as its text is
+    ready, so the whole batch takes about as long as the slowest file (within the rate limit and
+    LLM_MAX_CONCURRENT_REQUESTS). A file that fails is reported and left out, the others carry on.
+
+    Args:
+    - file_paths (list): Paths of the DOCX resumes.
+    - IDENTIFY_DETAILS_FROM_RESUME_PROMPT (str): System prompt for the extraction.
+    - model (str): The model to use.
+    - openai_client: Defaults to the shared client, the same one the session holds.
+    - on_progress (callable): Optional, called as on_progress(file_path, status, error) with status
+      "parsing", "extracting", "done" or "failed" (error is None unless it failed).
+
+    Returns:
+    - pd.DataFrame: resume_name and resume_text of the files that succeeded, in input order.
+    """
+    openai_client = openai_client or get_async_openai_client()
+
+    def report(file_path, status, error=None):
+        if on_progress is not None:
+            on_progress(file_path, status, error)
+
+    async def process_resume(file_path):
         if not os.path.exists(file_path):
-            print(f"File not found: {file_path}")
-            continue
-        
+            raise FileNotFoundError(f"File not found: {file_path}")
+
         print(f"Processing file: {file_path}")
-        
-        # Extracting text from the resume
-        print("Extracting text...")
-        resume_text = extract_text_from_docx(file_path)
-        
+        report(file_path, "parsing")
+        resume_text = await parse_resume_file(file_path)
+
         # Extracting resume name from file path
         resume_name = os.path.basename(file_path).split('.')[0]  # Assuming file name is the resume name
-        
+
         # Extracting sections using LLM
-        print("Extracting sections using LLM...")
+        report(file_path, "extracting")
+        await resume_llm_rate_limiter.acquire()
         #resume_llm_response = await extract_resume_sections_langchain(IDENTIFY_DETAILS_FROM_RESUME_PROMPT, model, resume_text)
-        resume_llm_response = await run_openai_chat_completion(st.session_state.openai_client, json.dumps(resume_text), IDENTIFY_DETAILS_FROM_RESUME_PROMPT,model)
-
+        resume_llm_response = await run_openai_chat_completion(openai_client, json.dumps(resume_text), IDENTIFY_DETAILS_FROM_RESUME_PROMPT,model)
         #resume_llm_response = await run_liteLLM_call(json.dumps(resume_text), IDENTIFY_DETAILS_FROM_RESUME_PROMPT, model)
-        # Cleaning the LLM response
-        cleaned_resume_llm_response = clean_llm_response_for_resume(resume_llm_response)
+        if is_error_response(resume_llm_response):
+            raise RuntimeError(resume_llm_response)
 
-        # Append to all_resumes list
-        all_resumes.append({
+        # Cleaning the LLM response
+        return {
             'resume_name': resume_name,
-            'resume_text': cleaned_resume_llm_response
-        })
+            'resume_text': clean_llm_response_for_resume(resume_llm_response)
+        }
+
+    async def process_or_report(file_path):
+        try:
+            resume = await process_resume(file_path)
+        except Exception as e:
+            print(f"Failed to process {file_path}: {e}")
+            report(file_path, "failed", e)
+            return None
+        report(file_path, "done")
+        return resume
+
+    results = await asyncio.gather(*(process_or_report(file_path) for file_path in file_paths))
+    all_resumes = [resume for resume in results if resume is not None]
+    print(f"Processed {len(all_resumes)} of {len(file_paths)} resumes")
 
     # Convert to DataFrame
-    return pd.DataFrame(all_resumes)
+    return pd.DataFrame(all_resumes, columns=['resume_name', 'resume_text'])
 
-def find_best_resume(resume_df, job_desc_embedding):
+def find_best_resume(resume_df, job_desc_embedding, matcher=None):
+
+    # Reuse a prebuilt matcher when given, otherwise normalize the resume embeddings once here
+    if matcher is None:
+        matcher = EmbeddingMatcher.from_frame(resume_df, 'resume_embedding')
+    job_vector = stack_embeddings(job_desc_embedding['job_description_embeddings'])[0]
 
-    # Ensure embeddings are numpy arrays
-    resume_embeddings = np.vstack(resume_df['resume_embedding'].to_numpy())
-    job_desc_embedding = np.vstack(job_desc_embedding['job_description_embeddings'].to_numpy()).reshape(1, -1)
-    
     # Calculate cosine similarity and get percentage match
-    similarities = cosine_similarity(resume_embeddings, job_desc_embedding)
-    resume_df['percentage_match'] = similarities.flatten() * 100  # Convert to percentage
+    similarities = matcher.scores(job_vector)
+    resume_df['percentage_match'] = similarities * 100  # Convert to percentage
 
     # Get resume_data with the highest match
-    best_resume_row = resume_df.loc[resume_df['percentage_match'].idxmax()]
-    best_resume_data = best_resume_row['resume_text']  # Extract the resume text
+    best_resume_data = resume_df['resume_text'].iloc[int(similarities.argmax())]  # Extract the resume text
     return best_resume_data, resume_df  # Return best match resume text and full DataFrame with percentage matches
 
-def find_rag_data_match_percentage(rag_df, job_desc_embedding):
+async def rank_resumes(supabase, resume_df, job_desc_embedding):
+    """
+    Match the candidate resumes against a job description.
+
+    Resume rows that carry their embeddings (e.g. fresh uploads) are matched here. With the pgvector
+    backend, rows holding only resume_name are ranked inside Postgres by match_resume_data, so the
+    resume texts and embeddings are never downloaded.
+
+    Args:
+    - supabase: Supabase client.
+    - resume_df (pd.DataFrame): The candidate resumes.
+    - job_desc_embedding (pd.DataFrame): The job row with 'job_description_embeddings'.
+
+    Returns:
+    - tuple: (best_resume_text, DataFrame with resume_name and percentage_match per resume)
+    """
+    if 'resume_embedding' in resume_df.columns or VECTOR_SEARCH_BACKEND != "pgvector":
+        with profiled("similarity"):
+            return find_best_resume(resume_df, job_desc_embedding)
+
+    job_vector = job_desc_embedding['job_description_embeddings'].iloc[0]
+    matches = await search_similar_rows(supabase, 'resume_data', job_vector, match_count=len(resume_df), match_threshold=-1.0,
+                                        filters={"resume_names": resume_df['resume_name'].tolist()})
+    if matches.empty:
+        raise ValueError("None of the selected resumes has an embedding.")
+    return matches['resume_text'].iloc[0], matches
+
+def find_rag_data_match_percentage(rag_df, job_desc_embedding, matcher=None, threshold=RAG_MATCH_THRESHOLD, ann_index=None):
+
+    job_vector = stack_embeddings(job_desc_embedding['job_description_embeddings'])[0]
+
+    if ann_index is not None:
+        candidate_ids, candidate_scores = ann_index.search(job_vector)
+        # The index returns a fixed number of candidates. When even the weakest of them clears the threshold,
+        # rows past the cut may clear it too, so the whole table is scored exactly below instead
+        truncated = 0 < len(candidate_scores) < len(ann_index) and candidate_scores[-1] * 100 >= threshold
+        if not truncated:
+            # Only the candidates get a percentage, the other rows rank below the weakest one, under the threshold
+            candidate_percentages = pd.Series(candidate_scores * 100, index=candidate_ids)
+            rag_df['percentage_match'] = rag_df['id'].map(candidate_percentages)
+            best_rag_data = rag_df[rag_df['percentage_match'] >= threshold].sort_values(by='percentage_match', ascending=False)
+            return best_rag_data, rag_df
+        print(f"All {len(candidate_scores)} RAG index candidates match, scoring every row instead")
+
+    # Reuse a prebuilt matcher when given, otherwise normalize the rag embeddings once here
+    if matcher is None:
+        matcher = EmbeddingMatcher.from_frame(rag_df, 'text_embedding')
 
-    # Ensure embeddings are numpy arrays
-    rag_embeddings = np.vstack(rag_df['text_embedding'].to_numpy())
-    job_desc_embedding = np.vstack(job_desc_embedding['job_description_embeddings'].to_numpy()).reshape(1, -1)
-    
     # Calculate cosine similarity and get percentage match
-    similarities = cosine_similarity(rag_embeddings, job_desc_embedding)
-    rag_df['percentage_match'] = similarities.flatten() * 100  # Convert to percentage
+    similarities = matcher.scores(job_vector)
+    rag_df['percentage_match'] = similarities * 100  # Convert to percentage
 
-    # Get resume_data with the highest match
-    best_rag_data = rag_df[rag_df['percentage_match'] >= 30 ]
-    #best_rag_row = rag_df.loc[rag_df['percentage_match'].idxmax()]
-    #best_rag_data = best_rag_row['text']  # Extract the rag text
+    # Keep the rag rows above the threshold, best match first
+    matched_positions = np.flatnonzero(rag_df['percentage_match'].to_numpy() >= threshold)
+    matched_positions = matched_positions[np.argsort(-similarities[matched_positions])]
+    best_rag_data = rag_df.iloc[matched_positions]
     return best_rag_data, rag_df  # Return best match rag text and full DataFrame with percentage matches
 
 async def get_file_paths(uploaded_files):
@@ -97,8 +189,9 @@ async def get_file_paths(uploaded_files):
 
     return file_paths
 
-async def suggest_resume_improvements(openai_client, system_prompt, structured_job_data, resume_text, rag_text, model_name, model_temp):
-    
+async def suggest_resume_improvements(openai_client, system_prompt, structured_job_data, resume_text, rag_text, model_name, model_temp, use_cache=False):
+    # use_cache: suggestions are written fresh on every Analyze by default, so they can be regenerated
+
     ## Construct a user_prompt that will have structure job description 
     # Convert all columns in the job description DataFrame to a single text string
     #job_description_text = " ".join(structured_job_data.fillna("").astype(str).values.flatten())
@@ -111,11 +204,15 @@ async def suggest_resume_improvements(openai_client, system_prompt, structured_j
     '''
     
     # Generate suggestions using the LLaMA model
-    suggestions = await run_openai_chat_completion(openai_client, user_prompt, system_prompt, model_name, model_temp)
+    suggestions = await run_openai_chat_completion(openai_client, user_prompt, system_prompt, model_name, model_temp, use_cache=use_cache)
     
     return suggestions
 
-async def prepare_cover_letter(openai_client, system_prompt, llama_response, best_resume_text, model_name, model_temp):
+async def prepare_cover_letter(openai_client, system_prompt, llama_response, best_resume_text, model_name, model_temp, on_text=None, anthropic_client=None, use_cache=False):
+    # on_text: optional callback, when given the letter is streamed and it receives the text written so far
+    # use_cache: a new letter is written on every Analyze by default, True reuses the last one for the same inputs
+    # anthropic_client defaults to the shared client, the same one the session holds
+    anthropic_client = anthropic_client or get_async_anthropic_client()
 
 
     ## Construct a user_prompt that will have structure job description 
@@ -131,8 +228,13 @@ async def prepare_cover_letter(openai_client, system_prompt, llama_response, bes
     # Generate suggestions using the LLaMA model
     #cover_letter = await run_openai_chat_completion(openai_client, user_prompt, system_prompt, model_name, model_temp)
     #cover_letter = await run_liteLLM_call(json.dumps(user_prompt), system_prompt, model_name)
-    cover_letter = await run_anthropic_chat_completion(st.session_state.anthropic_client, json.dumps(user_prompt), system_prompt, model_name, max_tokens = 2048)
-    
+    if on_text is not None:
+        return await collect_stream(stream_anthropic_chat_completion(anthropic_client, json.dumps(user_prompt), system_prompt, model_name, max_tokens = 2048, use_cache=use_cache), on_text)
+
+    cover_letter = await run_anthropic_chat_completion(anthropic_client, json.dumps(user_prompt), system_prompt, model_name, max_tokens = 2048, use_cache=use_cache)
+    # Failures come back as {"error": ...}, returned as the same error text the streamed path gives
+    if is_error_response(cover_letter):
+        return cover_letter['error']
     
     return cover_letter['content']
 
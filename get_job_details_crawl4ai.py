@@ -1,119 +1,93 @@
-import json
 import asyncio
 from crawl4ai import AsyncWebCrawler
-from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 import streamlit as st
+from page_cache import get_page_cache
+from site_adapters import extract_with_adapters
+from crawler_pool import get_crawler_pool
+from tracing import span
+from configuration import CRAWLER_POOL_ENABLED
 
 def main_get_job_link():
     job_link = input("Please share the job link that you want the details from\n")
     print(f"Okay, so accessing the link {job_link}")
     return job_link
 
-async def extract_job_description(url):
-    print("\n--- Using JsonCssExtractionStrategy for Fast Structured Output ---")
-
-    # Define the extraction schema as a list of dictionaries
-    schema = {
-            "name": "job description",
-            "baseSelector": "div.JobDetails_jobDescriptionWrapper___tqxc",
-            "fields": [
-                {
-                    "name": "job description: ",
-                    "selector": "div",
-                    "type": "text",
-                },
-            ]
-    }
-
-    # Create the extraction strategy
-    extraction_strategy = JsonCssExtractionStrategy(schema, verbose=True)
-
-    # Use the AsyncWebCrawler with the extraction strategy
-    async with AsyncWebCrawler(verbose=True) as crawler:
-        result = await crawler.arun(
-            url=url,
-            extraction_strategy=extraction_strategy,
-            bypass_cache=True,
-        )
-
-        if not result.success:
-            print("Failed to crawl the page")
-            return
-
-        # Print raw extracted content for debugging
-        #print("Extracted job description content")
-
-        # Parse the extracted content
-        try:
-            job_descriptions = json.loads(result.extracted_content)
-            if job_descriptions:
-                print("Extracted job description content")
-                print("job description is: ", job_descriptions)
-            else:
-                print("No job description data extracted.")
-        except json.JSONDecodeError:
-            print("Failed to parse extracted content as JSON.")
+async def fetch_job_page(url, max_age_seconds=None):
+    """
+    HTML of a job posting, from the local page cache when a fresh copy exists, otherwise crawled once.
+
+    Args:
+    - url (str): The job posting URL.
+    - max_age_seconds (float): Oldest cached page accepted (default JOB_PAGE_CACHE_MAX_AGE_SECONDS). 0 forces a new crawl.
+
+    Returns:
+    - str: The page HTML, or None if the crawl failed.
+    """
+    cache = get_page_cache()
+    html = cache.get(url, max_age_seconds)
+    if html is not None:
+        print(f"Using cached page for {url}")
+        return html
+
+    if CRAWLER_POOL_ENABLED:
+        # Warm browser from the pool, launching one costs more than loading the page
+        result = await get_crawler_pool().arun(url, bypass_cache=True)
+    else:
+        async with AsyncWebCrawler(verbose=True) as crawler:
+            result = await crawler.arun(
+                url=url,
+                bypass_cache=True,
+            )
+
+    if not result.success:
+        print("Failed to crawl the page")
+        return None
+
+    cache.put(url, result.html)
+    return result.html
+
+async def extract_job_posting(url, max_age_seconds=None):
+    """
+    Fetch a job posting once and extract both the job description and the header details from it,
+    with the first site adapter that recognizes the page (see site_adapters), no model call needed.
+
+    Args:
+    - url (str): The job posting URL.
+    - max_age_seconds (float): Oldest cached page accepted, see fetch_job_page.
+
+    Returns:
+    - tuple: (job_description, job_details), each a list of extracted records, or (None, None) if the crawl failed.
+    """
+    with span("scrape", url=url):
+        html = await fetch_job_page(url, max_age_seconds)
+    if html is None:
+        return None, None
+
+    # Parsing a large page takes a moment, keep it off the event loop
+    with span("parse_page") as parse_span:
+        job_descriptions, job_details, adapter_name = await asyncio.to_thread(extract_with_adapters, url, html)
+        if parse_span is not None:
+            parse_span.attributes["adapter"] = adapter_name
+    print(f"\n--- Extracted with the {adapter_name} site adapter ---")
+
+    if job_descriptions:
+        print("Extracted job description content")
+        print("job description is: ", job_descriptions)
+    else:
+        print("No job description data extracted.")
+
+    if job_details:
+        print("Extracted job details content")
+        print("job description is: ", job_details)
+    else:
+        print("No job details data extracted.")
+
+    return job_descriptions, job_details
 
+async def extract_job_description(url):
+    job_descriptions, _ = await extract_job_posting(url)
     return job_descriptions
 
 async def extract_job_details(url):
-    print("\n--- Using JsonCssExtractionStrategy for Fast Structured Output ---")
-
-    # Define the extraction schema
-    schema = {
-        "name": "header",
-        "baseSelector": ".JobDetails_jobDetailsHeader__Hd9M3",
-        "fields": [
-            {
-                "name": "company name",
-                "selector": "h4",
-                "type": "text",
-            },
-            {
-                "name": "Job role",
-                "selector": "h1",
-                "type": "text",
-            },
-            {
-                "name": "company rating",
-                "selector": "span",
-                "type": "text",
-            },
-            {
-                "name": "Job Location",
-                "selector": "div.JobDetails_location__mSg5h",
-                "type": "text",
-            }
-        ],
-    }
-    # Create the extraction strategy
-    extraction_strategy = JsonCssExtractionStrategy(schema, verbose=True)
-
-    # Use the AsyncWebCrawler with the extraction strategy
-    async with AsyncWebCrawler(verbose=True) as crawler:
-        result = await crawler.arun(
-            url=url,
-            extraction_strategy=extraction_strategy,
-            bypass_cache=True,
-        )
-
-        if not result.success:
-            print("Failed to crawl the page")
-            return
-
-        # Print raw extracted content for debugging
-        #print("Extracted Content: ", result.extracted_content)
-
-        # Parse the extracted content
-        try:
-            job_details = json.loads(result.extracted_content)
-            if job_details:
-                print("Extracted job details content")
-                print("job description is: ", job_details)
-
-            else:
-                print("No job details data extracted.")
-        except json.JSONDecodeError:
-            print("Failed to parse extracted content as JSON.")
-
-    return job_details
\ No newline at end of file
+    _, job_details = await extract_job_posting(url)
+    return job_details
@@ -2,6 +2,9 @@ from fpdf import FPDF
 from docx import Document
 import streamlit as st
 from io import BytesIO
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 import tiktoken
 
 # Pricing dictionary for different models
@@ -23,6 +26,20 @@ PRICING = {
     "gpt-3.5-turbo-0301": {"input": 1.50 / 1_000_000, "output": 2.00 / 1_000_000},
     # Adding the new model
     "gpt-4o-mini": {"input": 0.150 / 1_000_000, "output": 0.600 / 1_000_000},  # Updated model pricing
+    "gpt-4o": {"input": 2.50 / 1_000_000, "output": 10.00 / 1_000_000},
+}
+
+# Models without a local tokenizer, priced only from the usage the API reports (see telemetry.model_price)
+USAGE_PRICING = {
+    "claude-3-5-sonnet-20240620": {"input": 3.00 / 1_000_000, "output": 15.00 / 1_000_000},
+    "claude-3-5-sonnet-20241022": {"input": 3.00 / 1_000_000, "output": 15.00 / 1_000_000},
+    "claude-3-5-haiku-20241022": {"input": 0.80 / 1_000_000, "output": 4.00 / 1_000_000},
+    "claude-3-haiku-20240307": {"input": 0.25 / 1_000_000, "output": 1.25 / 1_000_000},
+    "claude-3-opus-20240229": {"input": 15.00 / 1_000_000, "output": 75.00 / 1_000_000},
+    # Embedding models only bill input tokens
+    "text-embedding-3-small": {"input": 0.02 / 1_000_000, "output": 0.0},
+    "text-embedding-3-large": {"input": 0.13 / 1_000_000, "output": 0.0},
+    "text-embedding-ada-002": {"input": 0.10 / 1_000_000, "output": 0.0},
 }
 
 # Manually define encodings for specific models
@@ -42,74 +59,126 @@ MODEL_ENCODINGS = {
     "gpt-3.5-turbo-16k-0613": "cl100k_base",      # For gpt-3.5-turbo, gpt-4, gpt-4-turbo
     "gpt-3.5-turbo-0301": "cl100k_base",   
     "gpt-4o-mini": "o200k_base",       # For gpt-3.5-turbo, gpt-4, gpt-4-turbo
+    "gpt-4o": "o200k_base",
 }
 
 
-def calculate_token_cost(input_text, output_text, budget=10.00, model_name=None):
+# Columns of the per-model results returned by calculate_token_cost
+COST_RESULT_COLUMNS = ["model_name", "input_tokens", "output_tokens", "total_tokens", "total_cost", "runs_possible_with_budget"]
+
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding_name):
+    # Loading an encoding parses its whole vocabulary, do it once per process
+    return tiktoken.get_encoding(encoding_name)
+
+def count_tokens(texts, encoding_name):
     """
-    Calculate the token count and cost for processing input and output text using specified OpenAI models,
-    and determine how many times the code can be run with a given budget.
+    Token count of every text with one encoding, each distinct text is tokenized only once.
 
     Args:
-        input_text (str): The input text to be processed.
-        output_text (str): The generated output text.
-        budget (float): The total budget available for running the code (default is 10 dollars).
-        model_name (str or list): The model name or a list of model names to include in the calculation. 
-                                  If None, all available models are included.
+    - texts (list): The texts to count.
+    - encoding_name (str): The tiktoken encoding, e.g. "cl100k_base".
 
     Returns:
-        list: A list of dictionaries containing token and cost information for each model,
-              along with how many times the code can be run within the budget.
+    - np.ndarray: Token counts, in the order of texts.
+    """
+    # Logged calls repeat the same prompts a lot, so only distinct texts are tokenized
+    positions = {}
+    indexes = np.array([positions.setdefault(str(text), len(positions)) for text in texts], dtype=np.int64)
+    tokens = get_encoder(encoding_name).encode_ordinary_batch(list(positions))
+    return np.array([len(text_tokens) for text_tokens in tokens], dtype=np.int64)[indexes]
+
+def estimate_token_costs(pairs, model_names=None, budget=10.00):
     """
-    results = []
+    Token counts and costs of many (input, output) text pairs for many models at once.
+
+    Texts are tokenized once per distinct encoding rather than once per model, and the costs of all
+    pairs are computed as array operations, so thousands of logged calls take milliseconds.
 
-    # Determine which models to process
-    models_to_process = (
-        [model_name] if isinstance(model_name, str) else model_name
-        if isinstance(model_name, list) else PRICING.keys()
-    )
+    Args:
+    - pairs (list): (input_text, output_text) tuples.
+    - model_names (str or list): Models to price, all models in PRICING when None. Models without an
+      encoding are skipped with a warning, as calculate_token_cost always did.
+    - budget (float): Budget used for runs_possible_with_budget (default is 10 dollars).
 
-    # Loop through the selected models and calculate costs
-    for model in models_to_process:
-        # Ensure the model exists in the pricing dictionary
+    Returns:
+    - pd.DataFrame: One row per pair and model, with pair_index, model_name, encoding, token counts,
+      input_cost, output_cost, total_cost and runs_possible_with_budget.
+    """
+    models = [model_names] if isinstance(model_names, str) else list(model_names) if model_names is not None else list(PRICING)
+    valid_models = []
+    for model in models:
         if model not in PRICING:
             print(f"Warning: Model {model} is not available in PRICING. Skipping.")
-            continue
-
-        # Get the correct tokenizer encoding for the model
-        encoding_name = MODEL_ENCODINGS.get(model, None)
-        if encoding_name is None:
+        elif MODEL_ENCODINGS.get(model) is None:
             print(f"Warning: No encoding for {model}. Skipping.")
-            continue  # Skip models that don't have a valid encoding
-
-        # Get the encoder for the model
-        encoder = tiktoken.get_encoding(encoding_name)
-
-        # Calculate token counts
-        input_tokens = len(encoder.encode(input_text))
-        output_tokens = len(encoder.encode(output_text))
-        total_tokens = input_tokens + output_tokens
-
-        # Calculate costs
-        pricing = PRICING[model]
-        input_cost = input_tokens * pricing["input"]
-        output_cost = output_tokens * pricing["output"]
+        else:
+            valid_models.append(model)
+
+    input_texts = [input_text for input_text, _ in pairs]
+    output_texts = [output_text for _, output_text in pairs]
+    counts = {}
+    for encoding_name in dict.fromkeys(MODEL_ENCODINGS[model] for model in valid_models):
+        counts[encoding_name] = (count_tokens(input_texts, encoding_name), count_tokens(output_texts, encoding_name))
+
+    frames = []
+    for model in valid_models:
+        encoding_name = MODEL_ENCODINGS[model]
+        input_tokens, output_tokens = counts[encoding_name]
+        input_cost = input_tokens * PRICING[model]["input"]
+        output_cost = output_tokens * PRICING[model]["output"]
         total_cost = input_cost + output_cost
-
-        # Calculate how many runs can be done with the given budget
-        runs_possible = budget / total_cost if total_cost > 0 else 0
-
-        # Store result for this model
-        results.append({
+        runs_possible = np.divide(budget, total_cost, out=np.zeros(len(pairs)), where=total_cost > 0)
+        frames.append(pd.DataFrame({
+            "pair_index": np.arange(len(pairs)),
             "model_name": model,
+            "encoding": encoding_name,
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
-            "total_tokens": total_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_cost": input_cost,
+            "output_cost": output_cost,
             "total_cost": total_cost,
-            "runs_possible_with_budget": runs_possible
-        })
+            "runs_possible_with_budget": runs_possible,
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["pair_index", "encoding", "input_cost", "output_cost"] + COST_RESULT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def cost_rows_to_records(cost_df):
+    # The list-of-dicts format calculate_token_cost has always returned, with plain Python numbers
+    return [
+        {
+            "model_name": row.model_name,
+            "input_tokens": int(row.input_tokens),
+            "output_tokens": int(row.output_tokens),
+            "total_tokens": int(row.total_tokens),
+            "total_cost": float(row.total_cost),
+            "runs_possible_with_budget": float(row.runs_possible_with_budget),
+        }
+        for row in cost_df.itertuples(index=False)
+    ]
 
-    return results
+def calculate_token_cost(input_text, output_text, budget=10.00, model_name=None):
+    """
+    Calculate the token count and cost for processing input and output text using specified OpenAI models,
+    and determine how many times the code can be run with a given budget.
+
+    Args:
+        input_text (str): The input text to be processed.
+        output_text (str): The generated output text.
+        budget (float): The total budget available for running the code (default is 10 dollars).
+        model_name (str or list): The model name or a list of model names to include in the calculation. 
+                                  If None, all available models are included.
+
+    Returns:
+        list: A list of dictionaries containing token and cost information for each model,
+              along with how many times the code can be run within the budget.
+    """
+    # The texts are tokenized once per encoding, not once per model
+    return cost_rows_to_records(estimate_token_costs([(input_text, output_text)], model_name, budget))
 
 
 def calculate_token_cost_for_all_models(input_text, output_text, budget=10.00):
@@ -126,43 +195,7 @@ def calculate_token_cost_for_all_models(input_text, output_text, budget=10.00):
         list: A list of dictionaries containing token and cost information for each model,
               along with how many times the code can be run within the budget.
     """
-    results = []
-
-    # Loop through all models and calculate costs
-    for model_name, pricing in PRICING.items():
-        # Get the correct tokenizer encoding for the model
-        encoding_name = MODEL_ENCODINGS.get(model_name, None)
-        if encoding_name is None:
-            print(f"Warning: No encoding for {model_name}. Skipping.")
-            continue  # Skip models that don't have a valid encoding
-
-        # Get the encoder for the model
-        encoder = tiktoken.get_encoding(encoding_name)
-
-        # Calculate token counts
-        input_tokens = len(encoder.encode(input_text))
-        output_tokens = len(encoder.encode(output_text))
-        total_tokens = input_tokens + output_tokens
-
-        # Calculate costs
-        input_cost = input_tokens * pricing["input"]
-        output_cost = output_tokens * pricing["output"]
-        total_cost = input_cost + output_cost
-
-        # Calculate how many runs can be done with the given budget
-        runs_possible = budget / total_cost if total_cost > 0 else 0
-
-        # Store result for this model
-        results.append({
-            "model_name": model_name,
-            "input_tokens": input_tokens,
-            "output_tokens": output_tokens,
-            "total_tokens": total_tokens,
-            "total_cost": total_cost,
-            "runs_possible_with_budget": runs_possible
-        })
-
-    return results
+    return calculate_token_cost(input_text, output_text, budget)
 
 # Function to save cover letter as PDF
 def save_as_pdf(content):
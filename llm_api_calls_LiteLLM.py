@@ -1,7 +1,18 @@
 from litellm import acompletion
 import json
+from llm_concurrency import call_llm
+from llm_cache import cached_llm_call
+from telemetry import record_usage
 
-async def run_liteLLM_call(model_response, system_prompt, llm_model, llm_temperature=0.2):
+async def run_liteLLM_call(model_response, system_prompt, llm_model, llm_temperature=0.2, use_cache=True):
+    # Identical prompts are answered from the response cache, use_cache=False forces a new call
+    return await cached_llm_call(
+        "litellm", llm_model, system_prompt, model_response, {"temperature": llm_temperature},
+        lambda: _request_liteLLM_call(model_response, system_prompt, llm_model, llm_temperature),
+        use_cache,
+    )
+
+async def _request_liteLLM_call(model_response, system_prompt, llm_model, llm_temperature):
 
     user_prompt = json.dumps(model_response)
 
@@ -25,9 +36,8 @@ async def run_liteLLM_call(model_response, system_prompt, llm_model, llm_tempera
                 }
             ]
         
-        response = await acompletion(model=llm_model,
-                                     messages=messages, 
-                                     temperature=llm_temperature)
+        response = await call_llm("litellm", None, acompletion, model=llm_model, messages=messages, temperature=llm_temperature)
+        record_usage(getattr(response, "usage", None))
 
         try:
     # Access the main content directly
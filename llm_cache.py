@@ -0,0 +1,121 @@
+import hashlib
+import json
+from single_flight import llm_requests
+from sqlite_lru_store import SharedInstance, SqliteLruStore
+from telemetry import track_call
+from configuration import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS
+
+# Prefixes the wrappers put on the strings they return instead of raising
+ERROR_PREFIXES = ("Input Error:", "Unexpected Error:", "Response Parsing Error:", "Response Error:")
+
+
+def llm_cache_key(provider, model, system_prompt, user_prompt, params):
+    """
+    Hash of everything that decides the response: provider, model, both prompts and the sampling parameters.
+    """
+    payload = json.dumps([provider, model, system_prompt, user_prompt, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def is_error_response(response):
+    # Failed calls are returned as error strings or {"error": ...} dicts, those must never be cached
+    if response is None:
+        return True
+    if isinstance(response, dict):
+        return "error" in response
+    if isinstance(response, str):
+        return not response.strip() or response.startswith(ERROR_PREFIXES)
+    return False
+
+
+class LlmResponseCache:
+    """
+    On-disk LLM response cache.
+
+    Responses are stored as JSON. Entries older than ttl_seconds are treated as misses and removed,
+    and when the stored responses grow past max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl_seconds=LLM_CACHE_TTL_SECONDS):
+        self.store = SqliteLruStore(
+            path, "responses", max_bytes, metadata_columns=("provider", "model"), ttl_seconds=ttl_seconds
+        )
+
+    def get(self, key):
+        """
+        Look up a cached response.
+
+        Returns:
+        - The cached response, or None if it is missing or expired.
+        """
+        serialized = self.store.get(key)
+        return None if serialized is None else json.loads(serialized)
+
+    def put(self, key, provider, model, response):
+        self.store.put(key, json.dumps(response), provider, model)
+
+    def stats(self):
+        return self.store.stats()
+
+    def clear(self):
+        self.store.clear()
+
+
+_llm_cache = SharedInstance(LlmResponseCache)
+
+def get_llm_cache():
+    return _llm_cache.get()
+
+def lookup_response(provider, model, system_prompt, user_prompt, params, use_cache=True):
+    """
+    Find the cached response for a prompt.
+
+    Returns:
+    - tuple: (key, response). key is None when caching is disabled, response is None on a miss
+      or when use_cache is False.
+    """
+    if not LLM_CACHE_ENABLED:
+        return None, None
+    key = llm_cache_key(provider, model, system_prompt, user_prompt, params)
+    response = get_llm_cache().get(key) if use_cache else None
+    if response is not None:
+        print(f"LLM cache hit ({provider}, {model})")
+    return key, response
+
+def store_response(key, provider, model, response):
+    # Error responses are never stored, the next call should retry the request
+    if key is not None and not is_error_response(response):
+        get_llm_cache().put(key, provider, model, response)
+
+async def cached_llm_call(provider, model, system_prompt, user_prompt, params, call, use_cache=True):
+    """
+    Return the cached response for this prompt, or run `call` and cache what it returns.
+
+    Args:
+    - provider (str): "openai", "anthropic", "litellm" or "groq".
+    - model (str): The model name.
+    - system_prompt (str): The system prompt.
+    - user_prompt: The user prompt, anything JSON serializable.
+    - params (dict): Sampling parameters that change the response, e.g. temperature and max_tokens.
+    - call: Async callable taking no arguments that makes the actual request.
+    - use_cache (bool): False skips the lookup and always calls the model, the fresh response is still stored.
+
+    Returns:
+    - The response, as `call` returns it. Error responses are returned but not cached.
+    """
+    async with track_call("llm", provider, model) as record:
+        key, response = lookup_response(provider, model, system_prompt, user_prompt, params, use_cache)
+        if response is not None:
+            record.cache_hit = True
+            return response
+
+        async def call_and_store():
+            response = await call()
+            store_response(key, provider, model, response)
+            return response
+
+        # Identical requests already in flight (other sessions, workers) share that call instead of making their own
+        flight_key = key or llm_cache_key(provider, model, system_prompt, user_prompt, params)
+        response = await llm_requests.run(flight_key, call_and_store)
+        if is_error_response(response):
+            record.error = str(response)[:300]
+        return response
@@ -0,0 +1,77 @@
+import asyncio
+import inspect
+import threading
+import anthropic
+import openai
+from client_registry import on_client_loop
+from configuration import LLM_MAX_CONCURRENT_REQUESTS
+
+ASYNC_CLIENT_TYPES = (openai.AsyncOpenAI, anthropic.AsyncAnthropic)
+
+# asyncio semaphores belong to one event loop, so they are only acquired on the client loop
+# (client_registry.get_client_loop), which outlives the loop of every Streamlit rerun
+_semaphores = {}
+_lock = threading.Lock()
+
+
+def provider_slot(provider):
+    """
+    Semaphore limiting how many requests to `provider` are in flight at once across the process.
+    Only use it in code running on the client loop.
+
+    Usage:
+        async def request():
+            async with provider_slot("openai"):
+                ...
+        await on_client_loop(request())
+    """
+    with _lock:
+        if provider not in _semaphores:
+            _semaphores[provider] = asyncio.Semaphore(LLM_MAX_CONCURRENT_REQUESTS.get(provider, 4))
+        return _semaphores[provider]
+
+async def call_llm(provider, client, method, **kwargs):
+    """
+    Call an SDK method without blocking the event loop, under the provider's concurrency limit.
+
+    Args:
+    - provider (str): Key in LLM_MAX_CONCURRENT_REQUESTS ("openai", "anthropic", ...).
+    - client: The SDK client `method` belongs to, None for plain functions such as litellm.acompletion.
+    - method: The SDK method to call, e.g. client.chat.completions.create.
+    - kwargs: Arguments for the method.
+
+    Returns:
+    - The SDK response.
+    """
+    async def request():
+        async with provider_slot(provider):
+            if isinstance(client, ASYNC_CLIENT_TYPES) or inspect.iscoroutinefunction(method):
+                return await method(**kwargs)
+            # Sync clients would block every other coroutine, so run them in a worker thread
+            return await asyncio.to_thread(method, **kwargs)
+
+    return await on_client_loop(request())
+
+async def collect_stream(chunks, on_text=None):
+    """
+    Join the text chunks of a streamed completion, reporting the text so far as it grows.
+
+    Args:
+    - chunks: Async iterator of text pieces, e.g. stream_openai_chat_completion(...).
+    - on_text (callable): Optional, called with the full text received so far after every chunk.
+
+    Returns:
+    - str: The complete text. When the stream fails, an "Input Error: ..." or "Unexpected Error: ..."
+      string like the non-streamed calls return (see llm_cache.is_error_response), never the partial text.
+    """
+    text = ""
+    try:
+        async for chunk in chunks:
+            text += chunk
+            if on_text is not None:
+                on_text(text)
+    except ValueError as ve:
+        return f"Input Error: {str(ve)}"
+    except Exception as e:
+        return f"Unexpected Error: {str(e)}"
+    return text
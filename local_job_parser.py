@@ -0,0 +1,321 @@
+import json
+import re
+from prompt_openai import run_openai_chat_completion
+from llm_cache import is_error_response
+from tracing import profiled
+from configuration import (
+    IDENTIFY_DETAILS_FROM_JOB_PROMPT, IDENTIFY_DETAILS_FROM_JOB_MODEL, JOB_PARSER_CONFIDENCE_THRESHOLD,
+    JOB_PARSER_SKIPPED_FIELDS,
+)
+
+# Keys of IDENTIFY_DETAILS_FROM_JOB_PROMPT, in the order the prompt lists them
+JOB_FIELDS = [
+    "Company name", "Position name", "Seniority level", "Joining date", "Team name", "Location",
+    "Reference job code", "Salary", "Hiring Manager", "Email address to contant", "Hybrid or Remote?",
+    "Company description", "Team description", "Job responsibilities", "Preferred skills", "Required skills",
+    "Exceptional skills", "Technical keywords", "Necessary experience", "Bonus experience",
+    "Job role classifications", "Company values", "Benefits", "Soft skills", "Visa Sponsorship",
+]
+
+# Technical skills matched as whole words, spelled the way they should appear in the output
+SKILLS = [
+    "Python", "R", "SQL", "Java", "Scala", "Golang", "Rust", "C++", "C#", "JavaScript", "TypeScript", "Kotlin", "Swift",
+    "Bash", "MATLAB", "Julia", "Spark", "PySpark", "Hadoop", "Kafka", "Airflow", "dbt", "Snowflake", "BigQuery",
+    "Redshift", "Databricks", "PostgreSQL", "MySQL", "MongoDB", "Redis", "Elasticsearch", "Cassandra", "DynamoDB",
+    "AWS", "Azure", "GCP", "Google Cloud", "Docker", "Kubernetes", "Terraform", "CI/CD", "Git", "Linux",
+    "TensorFlow", "PyTorch", "Keras", "JAX", "scikit-learn", "XGBoost", "LightGBM", "pandas", "NumPy", "SciPy",
+    "Hugging Face", "Transformers", "LangChain", "LlamaIndex", "OpenAI", "LLM", "LLMs", "RAG", "NLP",
+    "Computer Vision", "Deep Learning", "Machine Learning", "Reinforcement Learning", "Generative AI", "MLOps",
+    "MLflow", "Kubeflow", "SageMaker", "Vertex AI", "ONNX", "TensorRT", "CUDA", "A/B testing", "Statistics",
+    "Time Series", "Forecasting", "Recommender Systems", "Tableau", "Power BI", "Looker", "Excel", "ETL",
+    "Data Engineering", "Data Visualization", "React", "Node.js", "Django", "Flask", "FastAPI", "Spring",
+    "GraphQL", "REST", "gRPC", "Microservices", "Vector Databases", "Pinecone", "pgvector",
+]
+
+SOFT_SKILLS = [
+    "communication", "teamwork", "collaboration", "problem-solving", "problem solving", "leadership", "mentoring",
+    "ownership", "attention to detail", "curiosity", "adaptability", "time management", "critical thinking",
+    "stakeholder management", "presentation",
+]
+
+SENIORITY_LEVELS = [
+    ("Intern", r"\bintern(ship)?\b"), ("Junior", r"\b(junior|jr\.?|entry[- ]level|associate)\b"),
+    ("Principal", r"\bprincipal\b"), ("Staff", r"\bstaff\b"), ("Lead", r"\blead\b"),
+    ("Director", r"\bdirector\b"), ("Manager", r"\bmanager\b"), ("Senior", r"\b(senior|sr\.?)\b"),
+    ("Mid-level", r"\bmid[- ]level\b"),
+]
+
+ROLE_CLASSIFICATIONS = [
+    ("Machine Learning Engineer", r"\b(machine learning|ml) engineer"), ("Data Scientist", r"\bdata scien"),
+    ("Data Engineer", r"\bdata engineer"), ("Data Analyst", r"\b(data|business) analyst"),
+    ("AI Engineer", r"\b(ai|genai|llm) engineer"), ("Software Engineer", r"\b(software|backend|frontend|full[- ]stack) (engineer|developer)"),
+    ("Research Scientist", r"\bresearch scientist"), ("Product Manager", r"\bproduct manager"),
+]
+
+US_STATES = (
+    "AL AK AZ AR CA CO CT DE FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH NJ NM NY NC ND OH OK "
+    "OR PA RI SC SD TN TX UT VT VA WA WV WI WY DC"
+).split()
+
+# Headings that open a section of the description, per output field
+SECTION_HEADINGS = {
+    "Job responsibilities": ["responsibilities", "what you will do", "what you'll do", "your role", "the role", "duties", "key responsibilities"],
+    "Required skills": ["requirements", "qualifications", "required qualifications", "minimum qualifications", "what we are looking for", "what we're looking for", "who you are", "must have"],
+    "Preferred skills": ["preferred qualifications", "preferred skills", "nice to have", "nice-to-have", "bonus points", "pluses"],
+    "Benefits": ["benefits", "perks", "what we offer", "why join us", "compensation and benefits"],
+    "Company values": ["our values", "values"],
+}
+
+# Sentences that mark experience as welcome rather than required
+BONUS_PATTERN = re.compile(r"\b(?:is a plus|a plus|nice to have|bonus|is welcome|are welcome|not required|preferred)\b", re.IGNORECASE)
+
+SALARY_PATTERN = re.compile(
+    r"(?:[$€£]\s?\d[\d,.]*\s?[kK]?|\d[\d,.]*\s?[kK]?\s?(?:USD|EUR|GBP))"
+    r"(?:\s?(?:-|–|to)\s?(?:[$€£]\s?)?\d[\d,.]*\s?[kK]?(?:\s?(?:USD|EUR|GBP))?)?"
+    r"(?:\s*(?:per|/|a)\s*(?:year|yr|annum|hour|hr))?"
+)
+
+
+def job_text_and_details(job_data):
+    """
+    Flatten the scraped job data into one description text and the header details.
+
+    Args:
+    - job_data: The JSON string sent to IDENTIFY_DETAILS_FROM_JOB_PROMPT, {"job_description": [...], "job_details": [...]},
+      or pasted job text.
+
+    Returns:
+    - tuple: (description text, details dict)
+    """
+    if isinstance(job_data, str):
+        try:
+            job_data = json.loads(job_data)
+        except json.JSONDecodeError:
+            return job_data, {}
+    if isinstance(job_data, str):
+        return job_data, {}
+
+    description = job_data.get("job_description") or []
+    if isinstance(description, list):
+        description = "\n".join(str(value) for record in description for value in (record.values() if isinstance(record, dict) else [record]))
+    details = job_data.get("job_details") or [{}]
+    details = details[0] if isinstance(details, list) and details else details
+    return str(description), details if isinstance(details, dict) else {}
+
+def split_items(text):
+    # A bulleted section ends with its bullets, the paragraph after them belongs to no section
+    bullets = re.findall(r"^\s*[-*•●▪◦]\s*(.+)$", text, re.MULTILINE)
+    if bullets:
+        return [bullet.strip() for bullet in bullets if len(bullet.strip()) > 2]
+    # Otherwise lines are items; text flattened to one line is split at bullets and sentence ends
+    items = re.split(r"\n+|\s*[•●▪◦]\s*|(?<=[.;])\s+(?=[A-Z])", text)
+    return [item.strip(" -*\t") for item in items if len(item.strip(" -*\t")) > 2]
+
+def find_sections(text):
+    """
+    Split the description at the headings in SECTION_HEADINGS.
+
+    A heading counts when it starts a line or is followed by a colon, so a word like
+    "requirements" in running prose does not open a section.
+
+    Returns:
+    - dict: Field name -> list of items under its heading(s).
+    """
+    heading_fields = {heading: field for field, headings in SECTION_HEADINGS.items() for heading in headings}
+    alternatives = "|".join(re.escape(heading) for heading in sorted(heading_fields, key=len, reverse=True))
+    pattern = re.compile(rf"(?:^|\n)\s*(?:{alternatives})\s*:?\s*(?=\n)|(?:{alternatives})\s*:", re.IGNORECASE)
+
+    # Any other short line ending with a colon also closes the previous section
+    other_heading = re.compile(r"(?:^|\n)[^\n.]{3,40}:\s*(?=\n)")
+    boundaries = sorted({match.start() for match in other_heading.finditer(text)} | {len(text)})
+
+    sections = {}
+    for match in pattern.finditer(text):
+        heading = re.sub(r"[\s:]+", " ", match.group(0)).strip().lower()
+        field = heading_fields.get(heading)
+        if field is None:
+            continue
+        end = min(
+            [boundary for boundary in boundaries if boundary > match.end()]
+            + [other.start() for other in pattern.finditer(text, match.end())]
+        )
+        sections.setdefault(field, []).extend(split_items(text[match.end():end]))
+    return sections
+
+def find_terms(text, terms):
+    found = []
+    for term in terms:
+        # Whole words only, and C++ / C# / CI/CD keep their symbols. Short terms (R, AWS, RAG) must match
+        # case, so "r" or "rag" in ordinary words do not count.
+        pattern = rf"(?<![\w+#/&]){re.escape(term)}(?![\w+#/&])"
+        if re.search(pattern, text, 0 if len(term) <= 3 else re.IGNORECASE):
+            found.append(term)
+    return found
+
+def sentences(text):
+    return [sentence.strip() for sentence in re.split(r"(?<=[.!?])\s+|\n+", text) if sentence.strip()]
+
+def parse_job_fields(job_data):
+    """
+    Fill the fields of IDENTIFY_DETAILS_FROM_JOB_PROMPT locally with regexes, gazetteers and a skills dictionary.
+
+    Every field gets a confidence between 0 and 1. A confident null means the text gives no hint of
+    the field at all (no salary figures, no mention of a visa, ...), which is also what the model answers.
+
+    Args:
+    - job_data: The scraped job data (see job_text_and_details).
+
+    Returns:
+    - dict: Field name -> (value, confidence).
+    """
+    text, details = job_text_and_details(job_data)
+    lower_text = text.lower()
+    title = details.get("Job role") or ""
+    fields = {field: (None, 0.0) for field in JOB_FIELDS}
+    for field in JOB_FIELDS:
+        if field in SECTION_HEADINGS or field in ("Exceptional skills", "Job role classifications", "Soft skills", "Technical keywords"):
+            fields[field] = ([], 0.0)
+
+    # Header fields scraped from the posting itself are as good as it gets
+    if details.get("company name"):
+        fields["Company name"] = (details["company name"], 0.95)
+    if title:
+        fields["Position name"] = (title, 0.95)
+    if details.get("Job Location"):
+        fields["Location"] = (details["Job Location"], 0.9)
+    else:
+        cities = re.findall(rf"\b([A-Z][a-zA-Z.]+(?: [A-Z][a-zA-Z.]+)*), ({'|'.join(US_STATES)})\b", text)
+        if cities:
+            fields["Location"] = ("; ".join(dict.fromkeys(f"{city}, {state}" for city, state in cities)), 0.6)
+
+    for level, pattern in SENIORITY_LEVELS:
+        if title and re.search(pattern, title, re.IGNORECASE):
+            fields["Seniority level"] = (level, 0.85)
+            break
+    else:
+        if title:
+            # A title without a level word, the model answers null for these as well
+            fields["Seniority level"] = (None, 0.7)
+
+    salaries = [match.group(0).strip() for match in SALARY_PATTERN.finditer(text) if re.search(r"\d{2}", match.group(0))]
+    ranges = [salary for salary in salaries if re.search(r"-|–|to", salary)]
+    if ranges:
+        fields["Salary"] = (ranges[0], 0.9)
+    elif salaries and re.search(r"salary|compensation|pay range|base pay", lower_text):
+        fields["Salary"] = (salaries[0], 0.7)
+    elif not salaries and not re.search(r"salary|compensation|pay range|base pay", lower_text):
+        fields["Salary"] = (None, 0.8)
+
+    remote = re.search(r"\bremote\b|work from home|wfh", lower_text)
+    hybrid = re.search(r"\bhybrid\b", lower_text)
+    onsite = re.search(r"\bon[- ]?site\b|in[- ]office|in the office", lower_text)
+    work_mode = [name for name, found in (("Remote", remote), ("Hybrid", hybrid), ("On-site", onsite)) if found]
+    if work_mode:
+        fields["Hybrid or Remote?"] = (" / ".join(work_mode), 0.8 if len(work_mode) == 1 else 0.6)
+    elif not re.search(r"\boffice\b|work from|in person|relocat", lower_text):
+        fields["Hybrid or Remote?"] = (None, 0.75)
+
+    if re.search(r"(not|unable to|cannot|can't|no|without|won't|will not)\b[^.]{0,40}\bsponsor", lower_text):
+        fields["Visa Sponsorship"] = ("No", 0.9)
+    elif re.search(r"\bsponsor(ship)?\b[^.]{0,30}\b(available|provided|offered)\b|\bwill sponsor\b|\bcan sponsor\b", lower_text):
+        fields["Visa Sponsorship"] = ("Yes", 0.85)
+    elif not re.search(r"sponsor|visa|work authori[sz]ation", lower_text):
+        fields["Visa Sponsorship"] = (None, 0.8)
+
+    emails = re.findall(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+", text)
+    fields["Email address to contant"] = (emails[0], 0.95) if emails else (None, 0.9)
+
+    job_code = re.search(r"\b(?:job|req|requisition|reference|ref)\.?\s*(?:id|#|code|number|no\.?)\s*:?\s*([A-Z0-9][A-Z0-9-]{2,})", text, re.IGNORECASE)
+    fields["Reference job code"] = (job_code.group(1), 0.9) if job_code else (None, 0.7)
+
+    start = re.search(r"(?:start date|joining date|start(?:ing)? (?:on|in|by))\s*:?\s*([^.\n]{3,40})", text, re.IGNORECASE)
+    if start:
+        fields["Joining date"] = (start.group(1).strip(), 0.75)
+    elif not re.search(r"\bstart\b|\bjoin(ing)? date\b|immediate", lower_text):
+        fields["Joining date"] = (None, 0.8)
+
+    years = re.findall(r"[^.\n]*\b(?:\d+\+?|one|two|three|four|five|six|seven|eight|nine|ten)\s*(?:or more\s*)?(?:-\s*\d+\s*)?years?\b[^.\n]*", text, re.IGNORECASE)
+    if years:
+        fields["Necessary experience"] = ("; ".join(dict.fromkeys(sentence.strip(" -*•") for sentence in years)), 0.75)
+
+    keywords = find_terms(text, SKILLS)
+    fields["Technical keywords"] = (keywords, 0.75 if len(keywords) >= 3 else 0.4)
+
+    soft_skills = find_terms(text, SOFT_SKILLS)
+    fields["Soft skills"] = ([skill.capitalize() for skill in soft_skills], 0.7 if len(soft_skills) >= 2 else 0.3)
+
+    classifications = [name for name, pattern in ROLE_CLASSIFICATIONS if re.search(pattern, f"{title} {lower_text[:500]}", re.IGNORECASE)]
+    if classifications:
+        # The title naming the role is reliable, a mention near the top of the text less so
+        from_title = any(re.search(pattern, title, re.IGNORECASE) for name, pattern in ROLE_CLASSIFICATIONS if name in classifications)
+        fields["Job role classifications"] = (classifications, 0.8 if from_title else 0.6)
+
+    team = re.search(r"\b(?:join|on|in) (?:the|our) ((?:[A-Z][\w&/-]*\s){1,4})team\b", text)
+    if team:
+        fields["Team name"] = (team.group(1).strip(), 0.8)
+
+    company = details.get("company name")
+    text_sentences = sentences(text)
+    # Postings usually open by introducing the company and the team in their own sentences
+    company_sentences = [sentence for sentence in text_sentences[:6] if company and sentence.startswith(company)]
+    if company_sentences:
+        fields["Company description"] = (company_sentences[0], 0.75)
+    team_sentences = [sentence for sentence in text_sentences[:8] if re.match(r"(?:Our|The) (?:[\w&/-]+ ){0,3}team\b", sentence)]
+    if team_sentences:
+        fields["Team description"] = (team_sentences[0], 0.75)
+
+    bonus = [sentence for sentence in text_sentences if BONUS_PATTERN.search(sentence) and re.search(r"experience|familiarity|knowledge", sentence, re.IGNORECASE)]
+    if bonus:
+        fields["Bonus experience"] = ("; ".join(bonus), 0.7)
+
+    for field, items in find_sections(text).items():
+        if items:
+            fields[field] = (items, 0.75)
+
+    return fields
+
+def fields_to_response(fields):
+    # The same JSON the model returns, so parse_response_to_df works on either
+    return json.dumps({field: value for field, (value, _) in fields.items()})
+
+async def identify_job_details(openai_client, job_data, threshold=JOB_PARSER_CONFIDENCE_THRESHOLD, model=IDENTIFY_DETAILS_FROM_JOB_MODEL, skipped_fields=JOB_PARSER_SKIPPED_FIELDS):
+    """
+    Extract the job fields locally and ask the model only for the fields below the confidence threshold.
+
+    Args:
+    - openai_client: The OpenAI client.
+    - job_data: The job data otherwise sent to IDENTIFY_DETAILS_FROM_JOB_PROMPT.
+    - threshold (float): Minimum confidence to keep a local value. 0 never calls the model, above 1 always does.
+    - model (str): Model used for the remaining fields.
+    - skipped_fields (list): Fields kept as parsed even below the threshold, never asked from the model.
+
+    Returns:
+    - tuple: (JSON response string in the prompt's format, dict of field -> confidence, list of fields asked from the model)
+    """
+    with profiled("local_job_parse"):
+        fields = parse_job_fields(job_data)
+    missing = [field for field in JOB_FIELDS if fields[field][1] < threshold and field not in skipped_fields]
+    print(f"Local job parser filled {len(JOB_FIELDS) - len(missing)} of {len(JOB_FIELDS)} fields, asking the model for {len(missing)}")
+    if not missing:
+        return fields_to_response(fields), {field: confidence for field, (_, confidence) in fields.items()}, []
+
+    # Same prompt, restricted to the fields the local parser could not fill with confidence
+    system_prompt = (
+        IDENTIFY_DETAILS_FROM_JOB_PROMPT
+        + "\n\nOnly extract these keys and respond with a JSON dictionary containing exactly them: "
+        + json.dumps(missing)
+    )
+    response = await run_openai_chat_completion(openai_client, job_data, system_prompt, model)
+    try:
+        if is_error_response(response):
+            raise ValueError(response)
+        llm_fields = json.loads(response)
+    except (ValueError, TypeError) as e:
+        # Keep the local best guesses rather than failing the whole job
+        print(f"Model call for the remaining job fields failed, using the local values: {e}")
+        llm_fields = {}
+
+    for field in missing:
+        if field in llm_fields:
+            fields[field] = (llm_fields[field], 1.0)
+    return fields_to_response(fields), {field: confidence for field, (_, confidence) in fields.items()}, missing
@@ -1,105 +1,115 @@
 #from get_job_details import main_get_job_link, call_reader_api
-from prompt_llm_for_resume import run_llama_prompt, parse_response_to_df, save_job_dict_response
-from get_job_details_crawl4ai import main_get_job_link, extract_job_description, extract_job_details
-from create_embeddings import embed_text_in_column
+from prompt_llm_for_resume import save_job_dict_response
+from get_job_details_crawl4ai import main_get_job_link, extract_job_posting
+from create_embeddings import embed_text_in_column, generate_embeddings
 from create_gcp_connection import authenticate_google_apis, extract_job_data_from_sheet
 from find_optimal_resume import find_best_resume, process_resumes, suggest_resume_improvements
-
-
-import json
+from bulk_ingest import IngestCheckpoint, extract_job_fields, job_content_hash, job_row_hash
+from supabase_backend import insert_data_into_table
+from supabase_helper_functions import prepare_data_job_description
+from client_registry import get_async_openai_client, get_supabase_client
+from sheet_sync import find_pending_jobs, sync_sheet
+from telemetry import telemetry_stage
+from tracing import start_trace, enable_profiling, write_profiles
+from configuration import (
+    TRACE_DIR, EMBEDDING_MODEL, JOB_DETAILS_TABLE_NAME, IDENTIFY_DETAILS_FROM_RESUME_PROMPT, IDENTIFY_DETAILS_FORM_RESUME_MODEL,
+    SUGGESTIONS_JOB_BASED_ON_RESUME, PROVIDING_SUGGESTIONS_MODEL,
+)
+
+
+import argparse
 import pandas as pd
 import asyncio
 import torch
 
 SPREADSHEET_ID = ''  # Replace with your actual Spreadsheet ID
 SHEET_NAME = 'Sheet1'  # Replace with the name of your sheet
+RESUME_PATHS = ["/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Extras/Pratik Hotchandani GenAI.docx",
+                "/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Pratik Hotchandani AI.docx",
+                "/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Pratik Hotchandani ML.docx",
+                "/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Pratik Hotchandani Sr. Data Scientist.docx"]  # Replace with your resumes
     
 
-async def main():
+async def main(spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME, resume_paths=RESUME_PATHS):
 
     print("Authenticating google sign in")
     drive_service, sheets_service = authenticate_google_apis()
+    openai_client = get_async_openai_client()
+    supabase = get_supabase_client()
+
+    # The resumes are the same for every job, so they are processed and embedded once
+    print("processing resumes..")
+    with telemetry_stage("process_resumes"):
+        resume_df = await process_resumes(resume_paths, IDENTIFY_DETAILS_FROM_RESUME_PROMPT, IDENTIFY_DETAILS_FORM_RESUME_MODEL, openai_client=openai_client)
+    if resume_df.empty:
+        print("None of the resumes could be processed.")
+        return
+    with telemetry_stage("resume_embedding"):
+        resume_emb_df = await generate_embeddings(resume_df, EMBEDDING_MODEL, "resume")
+
+    sheets_data = extract_job_data_from_sheet(sheets_service, spreadsheet_id, sheet_name)
+    # Shares the bulk ingestion checkpoint, so rows already ingested by either mode are not processed again
+    checkpoint = IngestCheckpoint()
+    try:
+        for job in find_pending_jobs(sheets_data, checkpoint):
+            try:
+                await process_job(job, resume_emb_df, openai_client, supabase, checkpoint)
+            except Exception as e:
+                print(f"Job {job['ID']} failed: {e}")
+                checkpoint.record(job["ID"], "failed", e)
+    finally:
+        checkpoint.close()
+
+async def process_job(job, resume_emb_df, openai_client, supabase, checkpoint):
+    # Scrape, parse, embed and store one sheet row, then match it against the resumes and suggest improvements
+    print(f"ID: {job['ID']}, Job Link: {job['Job Link']}")
+    with telemetry_stage("extract_job"):
+        job['job_description'], job['job_details'] = await extract_job_posting(job['Job Link'])
+    if job['job_description'] is None:
+        raise RuntimeError("Could not crawl the job posting.")
 
-    sheets_data = extract_job_data_from_sheet(sheets_service, SPREADSHEET_ID, SHEET_NAME)
-    # Print the extracted job data
-    for job in sheets_data:
-        print(f"ID: {job['ID']}, Job Link: {job['Job Link']}")
-        job_description = await extract_job_description(job['Job Link'])
-        job_details = await extract_job_details(job['Job Link'])
-
-        # Create a dictionary combining both variables
-        job_data = {
-            "job_description": job_description,
-            "job_details": job_details
-        }
-
-        # Convert to JSON object (string)
-        json_data = json.dumps(job_data, indent=2)
-
-        ## Prompting LLM
-        # Combine the prompt with the job description text
-        #full_prompt = RESUME_PROMPT + "\n" + json.dumps(job_data)
-        full_prompt = json.dumps(job_data)
-        llama_response = await run_llama_prompt(full_prompt)
-        print("response generated...", llama_response)
-        #print("Llama response is: ", llama_response)
-        print("parsing llama response..")
-        job_data_dict = parse_response_to_df(llama_response)
-        save_job_dict_response(job_data_dict, "job")
-
-        # Extract job description string
-        job_description_text = job_description[0].get('job description: ', '')
-        print("job description text is: ", job_description)
-        print("creating embeddings for job description....")
-        #job_emb_df = embed_text_in_column(job_description_text, "job")
-        #job_emb_df.to_csv("job_emb_df.csv")
-        print("job emb saved..")
-        """
-        file_path = "/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Extras/Pratik Hotchandani GenAI.docx"
-        print("extracting text...")
-        resume_text = extract_text_from_docx(file_path)
-        model_name = "qwen2.5:7b"
-        print("extracting sections using llm...")
-        resume_llm_response = await extract_resume_sections_langchain(RESUME_SECTION_IDENTIFICATION_PROMPT, model_name, resume_text)
-        cleaned_resume_llm_response = clean_llm_response_for_resume(resume_llm_response)
-        print("creating embeddings....")
-        resume_emb_df = embed_text_in_column(cleaned_resume_llm_response, "resume")
-        print("embeddings generated...")
-        resume_emb_df.to_csv("resume_emb_df.csv")
-        """
-        print("processing resumes..")
-        file_paths = ["/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Extras/Pratik Hotchandani GenAI.docx",
-                      "/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Pratik Hotchandani AI.docx",
-                      "/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Pratik Hotchandani ML.docx",
-                      "/Users/pratikhotchandani/Downloads/Github/Automating-job-applications/Pratik Hotchandani Sr. Data Scientist.docx"]
-        # Run the process_resumes function with your list of file paths
-        emb_df = await process_resumes(file_paths)
-
-
-        # Assuming job_emb_df['job_emb'].values[0] is the single embedding vector for the job description
-        best_resume_text, updated_emb_df = find_best_resume(emb_df, job_emb_df['job_emb'].values[0])
-        # Print the DataFrame with percentage matches
-        print(updated_emb_df[['resume_data', 'percentage_match']])
-
-        print("generating suggestions...")
-        suggestions = await suggest_resume_improvements(job_data_dict, best_resume_text, "llama3.1:8b")
-        save_job_dict_response(suggestions, "suggestions")
-        print("suggestions saved: ", suggestions)
-        """
-        ## Create embedding of unstructured job description
-        tokenizer, model = load_tokenizer_t5()
-        emb = generate_embedding_t5(job_description_text,tokenizer, model)
-        if len(emb) > 1:
-            concatenated_emb = emb[0]  # Start with the first tensor
-            for i in range(1, len(emb)):  # Iterate over the rest of the tensors
-                concatenated_emb = torch.cat((concatenated_emb, emb[i]), dim=1)  # Concatenate along the appropriate dimension
-
-            print(f"Concatenated Embedding: {concatenated_emb}")
-        else:
-            concatenated_emb = emb[0]  # If there's only one tensor, use it as is
-            print(f"Single Embedding: {concatenated_emb}")    
-        
-        print("Enddd of job : ", job['ID'], "......")
+    ## Prompting LLM
+    # Same local parser, prompt and model as the Streamlit flow and the bulk ingestion
+    print("parsing job details..")
+    with telemetry_stage("identify_details"):
+        job = await extract_job_fields(job, openai_client)
+    save_job_dict_response(job['job_df'].to_dict('records')[0], "job")
+
+    print("creating embeddings for job description....")
+    with telemetry_stage("job_embedding"):
+        job_emb_df = await generate_embeddings(job['job_df'], EMBEDDING_MODEL, "job")
+    with telemetry_stage("save_job"):
+        # Upserted like the bulk rows, a changed posting updates its row
+        await insert_data_into_table(supabase, JOB_DETAILS_TABLE_NAME, prepare_data_job_description(job_emb_df), batch_size=100, upsert_on="job_link")
+    checkpoint.record(job["ID"], "done", row_hash=job_row_hash(job), content_hash=job_content_hash(job))
+    print("job emb saved..")
+
+    with telemetry_stage("match"):
+        best_resume_text, updated_emb_df = find_best_resume(resume_emb_df.copy(), job_emb_df)
+    # Print the DataFrame with percentage matches
+    print(updated_emb_df[['resume_name', 'percentage_match']])
+
+    print("generating suggestions...")
+    with telemetry_stage("suggestions"):
+        suggestions = await suggest_resume_improvements(openai_client, SUGGESTIONS_JOB_BASED_ON_RESUME, job['job_response'], best_resume_text, "", PROVIDING_SUGGESTIONS_MODEL, model_temp=0.2)
+    save_job_dict_response(suggestions, "suggestions")
+    print("suggestions saved: ", suggestions)
+    print("Enddd of job : ", job['ID'], "......")
+    """
+    ## Create embedding of unstructured job description
+    tokenizer, model = load_tokenizer_t5()
+    emb = generate_embedding_t5(job_description_text,tokenizer, model)
+    if len(emb) > 1:
+        concatenated_emb = emb[0]  # Start with the first tensor
+        for i in range(1, len(emb)):  # Iterate over the rest of the tensors
+            concatenated_emb = torch.cat((concatenated_emb, emb[i]), dim=1)  # Concatenate along the appropriate dimension
+
+        print(f"Concatenated Embedding: {concatenated_emb}")
+    else:
+        concatenated_emb = emb[0]  # If there's only one tensor, use it as is
+        print(f"Single Embedding: {concatenated_emb}")    
+    
+    print("Enddd of job : ", job['ID'], "......")
 
 
     
@@ -107,12 +117,11 @@ async def main():
     print("Welcome to the python program that automates applyinh to jobs!!")
     print("Called 01 file")
     job_link = main_get_job_link()
-    job_description = await extract_job_description(job_link)
-    job_details = await extract_job_details(job_link)
+    job_description, job_details = await extract_job_posting(job_link)
     # Create a dictionary combining both variables
     job_data = {
-        "job_description": job_description,
-        "job_details": job_details
+    "job_description": job_description,
+    "job_details": job_details
     }
     # Convert to JSON object (string)
     json_data = json.dumps(job_data, indent=2)
@@ -131,14 +140,14 @@ async def main():
     tokenizer, model = load_tokenizer_t5()
     emb = generate_embedding_t5(job_description_text,tokenizer, model)
     if len(emb) > 1:
-        concatenated_emb = emb[0]  # Start with the first tensor
-        for i in range(1, len(emb)):  # Iterate over the rest of the tensors
-            concatenated_emb = torch.cat((concatenated_emb, emb[i]), dim=1)  # Concatenate along the appropriate dimension
+    concatenated_emb = emb[0]  # Start with the first tensor
+    for i in range(1, len(emb)):  # Iterate over the rest of the tensors
+        concatenated_emb = torch.cat((concatenated_emb, emb[i]), dim=1)  # Concatenate along the appropriate dimension
 
-        print(f"Concatenated Embedding: {concatenated_emb}")
+    print(f"Concatenated Embedding: {concatenated_emb}")
     else:
-        concatenated_emb = emb[0]  # If there's only one tensor, use it as is
-        print(f"Single Embedding: {concatenated_emb}")        
+    concatenated_emb = emb[0]  # If there's only one tensor, use it as is
+    print(f"Single Embedding: {concatenated_emb}")        
     
     ## Create embedding of resumes
     
@@ -152,6 +161,42 @@ async def main():
     
 
 
+async def bulk_main(spreadsheet_id, sheet_name, recheck=False):
+    # Scrape, parse, embed and store the sheet's job links concurrently, see bulk_ingest and sheet_sync
+    print("Authenticating google sign in")
+    drive_service, sheets_service = authenticate_google_apis()
+    # Only rows that are new or changed since the last run go through the pipeline, unless rechecking
+    return await sync_sheet(sheets_service, spreadsheet_id, sheet_name, recheck=recheck)
+
+async def traced(name, coroutine, trace_dir):
+    # The whole run is one trace, written out even when the run fails part way
+    with start_trace(name) as trace:
+        try:
+            return await coroutine
+        finally:
+            trace.write(trace_dir)
+
+
 # Ensure the event loop is run properly
 if __name__ == "__main__":
-    asyncio.run(main())  # Run the async main function
+    parser = argparse.ArgumentParser(description="Process the job links of a Google Sheet.")
+    parser.add_argument("--bulk", action="store_true", help="Ingest the new or changed job links concurrently, resuming from the last checkpoint")
+    parser.add_argument("--spreadsheet-id", default=SPREADSHEET_ID, help="The Google Sheet with the ID and Job Link columns, with or without --bulk")
+    parser.add_argument("--sheet-name", default=SHEET_NAME)
+    parser.add_argument("--resumes", nargs="+", default=RESUME_PATHS, help="DOCX resumes to match every job against, without --bulk")
+    parser.add_argument("--recheck", action="store_true", help="With --bulk, scrape already ingested links again and update the postings that changed")
+    parser.add_argument("--trace-dir", default=TRACE_DIR, help="Where the Chrome trace and OTLP JSON files of the run are written")
+    parser.add_argument("--profile", action="store_true", help="Also profile the CPU bound steps with cProfile, written as .prof files next to the trace")
+    args = parser.parse_args()
+    if args.recheck and not args.bulk:
+        parser.error("--recheck only applies to --bulk")
+
+    enable_profiling(args.profile)
+    try:
+        if args.bulk:
+            asyncio.run(traced("bulk", bulk_main(args.spreadsheet_id, args.sheet_name, args.recheck), args.trace_dir))
+        else:
+            asyncio.run(traced("main", main(args.spreadsheet_id, args.sheet_name, args.resumes), args.trace_dir))  # Run the async main function
+    finally:
+        if args.profile:
+            write_profiles(args.trace_dir)
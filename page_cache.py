@@ -0,0 +1,51 @@
+import hashlib
+from sqlite_lru_store import SharedInstance, SqliteLruStore
+from configuration import JOB_PAGE_CACHE_PATH, JOB_PAGE_CACHE_MAX_AGE_SECONDS, JOB_PAGE_CACHE_MAX_BYTES
+
+
+def page_cache_key(url):
+    # Trailing slashes and surrounding whitespace do not change the page
+    return hashlib.sha256(url.strip().rstrip("/").encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """
+    On-disk cache of crawled HTML pages, keyed by URL.
+
+    Every entry keeps the time it was fetched, readers decide how old a page may be (max_age_seconds
+    is only the default), so age never deletes a page. When the stored pages grow past max_bytes the
+    least recently used ones are evicted.
+    """
+
+    def __init__(self, path=JOB_PAGE_CACHE_PATH, max_age_seconds=JOB_PAGE_CACHE_MAX_AGE_SECONDS, max_bytes=JOB_PAGE_CACHE_MAX_BYTES):
+        self.max_age_seconds = max_age_seconds
+        self.store = SqliteLruStore(path, "pages", max_bytes, metadata_columns=("url",))
+
+    def get(self, url, max_age_seconds=None):
+        """
+        Look up a cached page.
+
+        Args:
+        - url (str): The page URL.
+        - max_age_seconds (float): Oldest page accepted, defaults to the cache's max age. 0 always misses.
+
+        Returns:
+        - str: The cached HTML, or None if it is missing or too old.
+        """
+        max_age_seconds = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        return self.store.get(page_cache_key(url), max_age_seconds)
+
+    def put(self, url, html):
+        self.store.put(page_cache_key(url), html, url)
+
+    def stats(self):
+        return self.store.stats()
+
+    def clear(self):
+        self.store.clear()
+
+
+_page_cache = SharedInstance(PageCache)
+
+def get_page_cache():
+    return _page_cache.get()
@@ -0,0 +1,79 @@
+import asyncio
+from dataclasses import dataclass, field
+from telemetry import telemetry_stage, track_call
+
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline: an async function and the names of the stages it needs to wait for.
+    """
+    name: str
+    func: object  # async callable taking no arguments
+    depends_on: tuple = field(default_factory=tuple)
+
+
+def order_stages(stages):
+    """
+    Order stages so every stage comes after its dependencies.
+
+    Raises:
+    - ValueError: If a dependency is unknown or the stages form a cycle.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    ordered, done, visiting = [], set(), set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Pipeline stages form a cycle at '{stage.name}'.")
+        visiting.add(stage.name)
+        for dependency in stage.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'.")
+            visit(by_name[dependency])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+async def run_stage_graph(stages):
+    """
+    Run pipeline stages concurrently, starting each one as soon as its dependencies have finished.
+
+    Independent stages overlap, so the total time is that of the longest dependency chain rather
+    than the sum of all stages. If a stage fails the stages still running are cancelled.
+
+    Args:
+    - stages (list): Stage objects.
+
+    Returns:
+    - dict: Stage name -> value returned by the stage.
+    """
+    results = {}
+    tasks = {}
+
+    async def run(stage):
+        # Awaiting a finished task again is free, so every stage simply waits on all of its dependencies
+        await asyncio.gather(*(tasks[dependency] for dependency in stage.depends_on))
+        # Calls made by the stage are attributed to it, and the stage itself is timed as one record
+        with telemetry_stage(stage.name):
+            async with track_call("stage", None, None):
+                results[stage.name] = await stage.func()
+        return results[stage.name]
+
+    # Creating tasks in dependency order guarantees every dependency task exists before it is awaited
+    for stage in order_stages(stages):
+        tasks[stage.name] = asyncio.ensure_future(run(stage))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except Exception:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return results
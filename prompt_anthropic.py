@@ -1,15 +1,16 @@
-import anthropic
 import json
+from client_registry import get_async_anthropic_client, iterate_on_client_loop
+from llm_concurrency import call_llm, provider_slot
+from llm_cache import cached_llm_call, lookup_response, store_response
+from telemetry import CallRecord, record_usage, write_record
 
-async def initialize_anthropic_client(anthropic_api_key):
-    client = anthropic.Anthropic(
-        # defaults to os.environ.get("ANTHROPIC_API_KEY")
-        api_key=anthropic_api_key,
-    )
+async def initialize_anthropic_client():
+    # Async client shared by every call in this run, see client_registry
+    client = get_async_anthropic_client()
     return client
 
 
-async def run_anthropic_chat_completion(client, llama_response, system_prompt, model, max_tokens = 1024, temperature=0.2):
+async def run_anthropic_chat_completion(client, llama_response, system_prompt, model, max_tokens = 1024, temperature=0.2, use_cache=True):
     """
     Function to run a custom prompt on Anthropic's Chat Completion API.
     Args:
@@ -17,9 +18,17 @@ async def run_anthropic_chat_completion(client, llama_response, system_prompt, m
     - system_prompt (str): The system-level instruction to guide the model's behavior
     - model (str): The model version to use
     - temperature (float): The sampling temperature (default is 0.2)
+    - use_cache (bool): False skips the response cache lookup and always calls the API (default is True)
     Returns:
     - dict: The response content and usage statistics
     """
+    return await cached_llm_call(
+        "anthropic", model, system_prompt, llama_response, {"max_tokens": max_tokens, "temperature": temperature},
+        lambda: _request_anthropic_chat_completion(client, llama_response, system_prompt, model, max_tokens, temperature),
+        use_cache,
+    )
+
+async def _request_anthropic_chat_completion(client, llama_response, system_prompt, model, max_tokens, temperature):
     print("Inside anthropic chat completion call!!!")
     user_prompt = json.dumps(llama_response)
     
@@ -31,7 +40,10 @@ async def run_anthropic_chat_completion(client, llama_response, system_prompt, m
             raise ValueError("system_prompt must be a non-empty string.")
 
         print("Generating Anthropic chat response...")
-        response = client.messages.create(
+        response = await call_llm(
+            "anthropic",
+            client,
+            client.messages.create,
             max_tokens=max_tokens,
             model=model,
             system=[
@@ -45,6 +57,7 @@ async def run_anthropic_chat_completion(client, llama_response, system_prompt, m
             temperature=temperature
         )
         print("Response generated from anthropic model..")
+        record_usage(response.usage)
         
         # Extract text content from the response
         content_text = response.content[0].text if isinstance(response.content, list) else response.content.text
@@ -63,4 +76,80 @@ async def run_anthropic_chat_completion(client, llama_response, system_prompt, m
     except ValueError as ve:
         return {"error": f"Input Error: {str(ve)}"}
     except Exception as e:
-        return {"error": f"Unexpected Error: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Unexpected Error: {str(e)}"}
+
+async def stream_anthropic_chat_completion(client, llama_response, system_prompt, model, max_tokens = 1024, temperature=0.2, use_cache=True):
+    """
+    Stream a custom prompt on Anthropic's Messages API, yielding the text as it is generated.
+
+    Takes the same arguments as run_anthropic_chat_completion, and the joined chunks are the same
+    text its "content" would hold, so they can be parsed the same way once the stream is done.
+    Both share the response cache: a cached response is yielded as a single chunk.
+
+    Yields:
+    - str: The next piece of generated text.
+
+    Raises:
+    - Exception: Whatever failed, after the text received so far. collect_stream turns it into the
+      same "Input Error: ..." / "Unexpected Error: ..." text run_anthropic_chat_completion reports.
+    """
+    user_prompt = json.dumps(llama_response)
+    if not isinstance(system_prompt, str) or not system_prompt.strip():
+        raise ValueError("system_prompt must be a non-empty string.")
+
+    # A generator can be resumed from different contexts, so the record is passed around rather than set as current
+    record = CallRecord("llm", "anthropic", model)
+    key, cached = lookup_response("anthropic", model, system_prompt, llama_response, {"max_tokens": max_tokens, "temperature": temperature}, use_cache)
+    if cached is not None:
+        record.cache_hit = True
+        write_record(record)
+        yield cached["content"]
+        return
+
+    try:
+        print("Streaming Anthropic chat response...")
+        final = {}
+
+        async def stream_text():
+            async with provider_slot("anthropic"):
+                async with client.messages.stream(
+                    max_tokens=max_tokens,
+                    model=model,
+                    system=[
+                        {
+                            "type": "text",
+                            "text": system_prompt,
+                            "cache_control": {"type": "ephemeral"}
+                        }
+                    ],
+                    messages=[{"role": "user", "content": user_prompt}],
+                    temperature=temperature
+                ) as stream:
+                    async for text in stream.text_stream:
+                        yield text
+                    final["message"] = await stream.get_final_message()
+
+        chunks = []
+        async for text in iterate_on_client_loop(stream_text()):
+            record.first_token()
+            chunks.append(text)
+            yield text
+        message = final["message"]
+        if message.usage:
+            record.add_usage(message.usage.input_tokens, message.usage.output_tokens)
+
+        # Cache the same dict run_anthropic_chat_completion returns, so either function can reuse it
+        response_dict = {
+            "content": "".join(chunks),
+            "usage": message.usage.model_dump_json() if message.usage else None,
+            "stop_reason": message.stop_reason,
+            "message_id": message.id
+        }
+        print(f"Usage statistics: {response_dict['usage']}")
+        store_response(key, "anthropic", model, response_dict)
+    except Exception as e:
+        record.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        if not record.cache_hit:
+            write_record(record)
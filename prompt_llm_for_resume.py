@@ -3,8 +3,11 @@ import pandas as pd
 from langchain_groq import ChatGroq
 import streamlit as st
 from credentials import GROQ_API
+from llm_concurrency import call_llm
+from llm_cache import cached_llm_call
+from telemetry import record_usage
 
-async def run_llama_prompt(user_prompt, system_prompt, model, model_temp = 0.2):
+async def run_llama_prompt(user_prompt, system_prompt, model, model_temp = 0.2, use_cache=True):
     """
     Function to run a custom prompt on LLaMA 3.1 using the Ollama API.
 
@@ -15,9 +18,18 @@ async def run_llama_prompt(user_prompt, system_prompt, model, model_temp = 0.2):
     - temperature (float): The sampling temperature to use (default is 0.7). 
         Higher values produce more random outputs, while lower values make the output more deterministic.
 
+    - use_cache (bool): False skips the response cache lookup and always calls the model (default is True).
+
     Returns:
     - str: The response from the model or an error message.
     """
+    return await cached_llm_call(
+        "groq", model, system_prompt, user_prompt, {"temperature": model_temp},
+        lambda: _request_llama_prompt(user_prompt, system_prompt, model, model_temp),
+        use_cache,
+    )
+
+async def _request_llama_prompt(user_prompt, system_prompt, model, model_temp):
     try:
         # Ensure prompt is a non-empty string
         if not isinstance(user_prompt, str) or not user_prompt.strip():
@@ -44,7 +56,8 @@ async def run_llama_prompt(user_prompt, system_prompt, model, model_temp = 0.2):
             ("human", f"{user_prompt}"),
         ]
 
-        ai_msg = llm.invoke(messages)
+        ai_msg = await call_llm("groq", llm, llm.ainvoke, input=messages)
+        record_usage(getattr(ai_msg, "usage_metadata", None))
         
         return ai_msg.content
 
@@ -94,7 +107,7 @@ async def summarize_job_description(systemPrompt, userPrompt, model):
             ),
             ("human", f"{userPrompt}"),
         ]
-        ai_msg = llm.invoke(messages)
+        ai_msg = await call_llm("groq", llm, llm.ainvoke, input=messages)
 
         return ai_msg.content
 
@@ -1,15 +1,18 @@
 import os
-from openai import OpenAI
-from credentials import OPENAI_API
+from client_registry import get_async_openai_client, iterate_on_client_loop
+from llm_concurrency import call_llm, provider_slot
+from llm_cache import cached_llm_call, lookup_response, store_response
+from telemetry import CallRecord, record_usage, write_record
 import json
 import streamlit as st
 
 # Initialize the OpenAI client
 async def initialize_openai_client():
-    client = OpenAI(api_key=OPENAI_API)
+    # Async client shared by every call in this run, see client_registry
+    client = get_async_openai_client()
     return client
 
-async def run_openai_chat_completion(client, llama_response, system_prompt, model, temperature=0.2):
+async def run_openai_chat_completion(client, llama_response, system_prompt, model, temperature=0.2, use_cache=True):
     """
     Function to run a custom prompt on OpenAI's Chat Completion API.
 
@@ -20,9 +23,18 @@ async def run_openai_chat_completion(client, llama_response, system_prompt, mode
     - temperature (float): The sampling temperature to use (default is 0.2). 
         Higher values produce more random outputs, while lower values make the output more deterministic.
 
+    - use_cache (bool): False skips the response cache lookup and always calls the API (default is True).
+
     Returns:
     - str: The response from the model or an error message.
     """
+    return await cached_llm_call(
+        "openai", model, system_prompt, llama_response, {"temperature": temperature},
+        lambda: _request_openai_chat_completion(client, llama_response, system_prompt, model, temperature),
+        use_cache,
+    )
+
+async def _request_openai_chat_completion(client, llama_response, system_prompt, model, temperature):
     user_prompt = json.dumps(llama_response)
 
     try:
@@ -36,7 +48,10 @@ async def run_openai_chat_completion(client, llama_response, system_prompt, mode
         print("Generating OpenAI chat response...")
 
         # Call the OpenAI Chat Completion API
-        completion = client.chat.completions.create(
+        completion = await call_llm(
+            "openai",
+            client,
+            client.chat.completions.create,
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -47,6 +62,7 @@ async def run_openai_chat_completion(client, llama_response, system_prompt, mode
             ],
             temperature=temperature
         )
+        record_usage(getattr(completion, "usage", None))
 
         try:
     # Access the main content directly
@@ -68,3 +84,66 @@ async def run_openai_chat_completion(client, llama_response, system_prompt, mode
         return f"Response Parsing Error: {str(ke)}"
     except Exception as e:
         return f"Unexpected Error: {str(e)}"
+
+
+async def stream_openai_chat_completion(client, llama_response, system_prompt, model, temperature=0.2, use_cache=True):
+    """
+    Stream a custom prompt on OpenAI's Chat Completion API, yielding the text as it is generated.
+
+    Takes the same arguments as run_openai_chat_completion, and the joined chunks are the same
+    text it would have returned. Both share the response cache: a cached response is yielded as a single chunk.
+
+    Yields:
+    - str: The next piece of generated text.
+
+    Raises:
+    - Exception: Whatever failed, after the text received so far. collect_stream turns it into the
+      same "Input Error: ..." / "Unexpected Error: ..." value run_openai_chat_completion returns.
+    """
+    user_prompt = json.dumps(llama_response)
+    if not isinstance(system_prompt, str) or not system_prompt.strip():
+        raise ValueError("system_prompt must be a non-empty string.")
+
+    # A generator can be resumed from different contexts, so the record is passed around rather than set as current
+    record = CallRecord("llm", "openai", model)
+    key, cached = lookup_response("openai", model, system_prompt, llama_response, {"temperature": temperature}, use_cache)
+    if cached is not None:
+        record.cache_hit = True
+        write_record(record)
+        yield cached
+        return
+
+    try:
+        print("Streaming OpenAI chat response...")
+        async def stream_chunks():
+            async with provider_slot("openai"):
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=temperature,
+                    stream=True,
+                    # Streams only report token usage when asked to, in a final chunk without choices
+                    stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    yield chunk
+
+        chunks = []
+        async for chunk in iterate_on_client_loop(stream_chunks()):
+            if chunk.usage:
+                record.add_usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+            # The last chunk of a stream can come without choices
+            if chunk.choices and chunk.choices[0].delta.content:
+                record.first_token()
+                chunks.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        store_response(key, "openai", model, "".join(chunks))
+    except Exception as e:
+        record.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        if not record.cache_hit:
+            write_record(record)
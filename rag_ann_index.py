@@ -0,0 +1,262 @@
+import os
+import numpy as np
+from embedding_matcher import normalize_rows
+from embedding_codec import decode_embedding_column
+from configuration import RAG_ANN_INDEX_PATH, RAG_ANN_NPROBE, RAG_ANN_CANDIDATES
+
+# hnswlib is optional, the pure NumPy IVF index is used when it is not installed
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+class IvfBackend:
+    """
+    Inverted-file index in pure NumPy: spherical k-means centroids, one vector list per centroid.
+
+    A query scores the centroids, then only the vectors of the nprobe closest lists.
+    """
+
+    name = "ivf"
+
+    def __init__(self, dimensions, nprobe=RAG_ANN_NPROBE):
+        self.dimensions = dimensions
+        self.nprobe = nprobe
+        self.centroids = np.empty((0, dimensions), dtype=np.float32)
+        self.list_vectors = []
+        self.list_labels = []
+        self.trained_on = 0
+
+    def train(self, vectors, iterations=10, seed=0):
+        # Around 2 * sqrt(n) lists keeps both the centroid scan and the probed lists small
+        nlist = int(np.clip(2 * np.sqrt(len(vectors)), 1, len(vectors)))
+        rng = np.random.default_rng(seed)
+
+        # Train on a sample, k-means over the whole table is not needed for good centroids
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), 64 * nlist), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            # Keep the previous centroid for lists that ended up empty
+            empty = np.bincount(assignments, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        self.centroids = centroids
+        self.trained_on = len(vectors)
+        self.list_vectors = [np.empty((0, self.dimensions), dtype=np.float32) for _ in range(nlist)]
+        self.list_labels = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+
+    def add(self, vectors, labels):
+        assignments = np.concatenate([
+            np.argmax(vectors[start:start + 4096] @ self.centroids.T, axis=1)
+            for start in range(0, len(vectors), 4096)
+        ])
+        for list_number in np.unique(assignments):
+            members = assignments == list_number
+            self.list_vectors[list_number] = np.concatenate([self.list_vectors[list_number], vectors[members]])
+            self.list_labels[list_number] = np.concatenate([self.list_labels[list_number], labels[members]])
+
+    def search(self, query, k):
+        probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        scores = np.concatenate([self.list_vectors[list_number] @ query for list_number in probes])
+        labels = np.concatenate([self.list_labels[list_number] for list_number in probes])
+        k = min(k, len(scores))
+        if k == 0:
+            return labels[:0], scores[:0]
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return labels[top], scores[top]
+
+    def save(self, path):
+        sizes = np.array([len(labels) for labels in self.list_labels], dtype=np.int64)
+        np.savez(
+            path + ".ivf.npz",
+            centroids=self.centroids,
+            vectors=np.concatenate(self.list_vectors) if self.list_vectors else self.centroids[:0],
+            labels=np.concatenate(self.list_labels) if self.list_labels else np.empty(0, dtype=np.int64),
+            sizes=sizes,
+            nprobe=self.nprobe,
+            trained_on=self.trained_on,
+        )
+
+    @classmethod
+    def load(cls, path, dimensions):
+        data = np.load(path + ".ivf.npz")
+        backend = cls(dimensions, nprobe=int(data["nprobe"]))
+        backend.centroids = data["centroids"]
+        backend.trained_on = int(data["trained_on"])
+        offsets = np.concatenate([[0], np.cumsum(data["sizes"])])
+        backend.list_vectors = [data["vectors"][start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        backend.list_labels = [data["labels"][start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        return backend
+
+
+class HnswBackend:
+    """
+    HNSW graph index from hnswlib, used when the package is installed.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, dimensions, ef_search=64):
+        self.dimensions = dimensions
+        self.ef_search = ef_search
+        self.index = hnswlib.Index(space="ip", dim=dimensions)
+        self.index.init_index(max_elements=1024, ef_construction=200, M=16)
+
+    def train(self, vectors):
+        # HNSW needs no training step, the graph is built while adding
+        pass
+
+    def add(self, vectors, labels):
+        # Grow the graph capacity ahead of time, hnswlib cannot add past max_elements
+        needed = self.index.get_current_count() + len(vectors)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+        self.index.add_items(vectors, labels)
+
+    def search(self, query, k):
+        k = min(k, self.index.get_current_count())
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        self.index.set_ef(max(self.ef_search, k))
+        labels, distances = self.index.knn_query(query, k=k)
+        # Inner-product distance is 1 - similarity
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def save(self, path):
+        self.index.save_index(path + ".hnsw.bin")
+
+    @classmethod
+    def load(cls, path, dimensions):
+        backend = cls.__new__(cls)
+        backend.dimensions = dimensions
+        backend.ef_search = 64
+        backend.index = hnswlib.Index(space="ip", dim=dimensions)
+        backend.index.load_index(path + ".hnsw.bin")
+        return backend
+
+
+BACKENDS = {IvfBackend.name: IvfBackend, HnswBackend.name: HnswBackend}
+
+
+class RagAnnIndex:
+    """
+    Approximate nearest-neighbour index over the extra_info text embeddings.
+
+    Maps the database ids of the rows to internal labels, so it can be persisted to disk and
+    extended with new rows without a rebuild.
+    """
+
+    def __init__(self, dimensions, backend=None):
+        backend = backend or ("hnsw" if hnswlib is not None else "ivf")
+        self.dimensions = dimensions
+        self.backend = BACKENDS[backend](dimensions)
+        self.ids = []
+        self._id_set = set()
+
+    @classmethod
+    def build(cls, ids, embeddings, backend=None):
+        vectors = normalize_rows(embeddings)
+        index = cls(vectors.shape[1], backend=backend)
+        index.backend.train(vectors)
+        index.add(ids, vectors)
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids, embeddings):
+        """
+        Add new rows to the index, ids that are already indexed are skipped.
+        """
+        ids = list(ids)
+        keep = [position for position, row_id in enumerate(ids) if row_id not in self._id_set]
+        if not keep:
+            return 0
+
+        vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32)[keep])
+        labels = np.arange(len(self.ids), len(self.ids) + len(keep), dtype=np.int64)
+        self.backend.add(vectors, labels)
+
+        for position in keep:
+            self.ids.append(ids[position])
+            self._id_set.add(ids[position])
+        return len(keep)
+
+    def search(self, query, k=RAG_ANN_CANDIDATES):
+        """
+        Approximate top k rows for a single query vector.
+
+        Returns:
+        - tuple: (ids, scores) of the best matches, best first. Scores are cosine similarities.
+        """
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        labels, scores = self.backend.search(query, k)
+        return [self.ids[label] for label in labels], np.asarray(scores, dtype=np.float32)
+
+    def save(self, path=RAG_ANN_INDEX_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.backend.save(path)
+        np.savez(path + ".meta.npz", ids=np.asarray(self.ids), backend=self.backend.name, dimensions=self.dimensions)
+
+    @classmethod
+    def load(cls, path=RAG_ANN_INDEX_PATH):
+        meta = np.load(path + ".meta.npz")
+        backend_name = str(meta["backend"])
+        if backend_name == "hnsw" and hnswlib is None:
+            raise ImportError("The saved RAG index needs hnswlib, which is not installed.")
+
+        index = cls.__new__(cls)
+        index.dimensions = int(meta["dimensions"])
+        index.backend = BACKENDS[backend_name].load(path, index.dimensions)
+        index.ids = meta["ids"].tolist()
+        index._id_set = set(index.ids)
+        return index
+
+
+def embedded_rows(dataframe, id_column, embedding_column):
+    # Rows without an embedding yet would only add zero vectors, so they are left out of the index
+    matrix, valid = decode_embedding_column(dataframe[embedding_column], with_mask=True)
+    return dataframe[id_column].to_numpy()[valid].tolist(), matrix[valid]
+
+def load_or_build_rag_index(rag_df, path=RAG_ANN_INDEX_PATH, id_column="id", embedding_column="text_embedding"):
+    """
+    Load the persisted RAG index and add any rows it is missing, or build it from scratch.
+
+    Args:
+    - rag_df (pd.DataFrame): The extra_info rows, with their database ids and embeddings.
+    - path (str): Where the index files are stored.
+
+    Returns:
+    - RagAnnIndex: The index, saved back to disk if it changed.
+    """
+    index = None
+    if os.path.exists(path + ".meta.npz"):
+        try:
+            index = RagAnnIndex.load(path)
+        except (ImportError, OSError, ValueError, KeyError) as e:
+            print(f"Could not load the RAG index, rebuilding it: {e}")
+
+    # Centroids trained on a much smaller table give unbalanced lists, so retrain them
+    if index is not None and index.backend.name == "ivf" and len(rag_df) > 4 * index.backend.trained_on:
+        index = None
+
+    if index is None:
+        print(f"Building RAG index over {len(rag_df)} rows...")
+        ids, matrix = embedded_rows(rag_df, id_column, embedding_column)
+        index = RagAnnIndex.build(ids, matrix)
+        index.save(path)
+        return index
+
+    missing = rag_df[~rag_df[id_column].isin(index.ids)]
+    if not missing.empty:
+        added = index.add(*embedded_rows(missing, id_column, embedding_column))
+        print(f"Added {added} new rows to the RAG index.")
+        index.save(path)
+    return index
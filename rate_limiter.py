@@ -0,0 +1,34 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by async callers.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. The bookkeeping is guarded
+    by a thread lock rather than an asyncio lock, so one bucket can be shared across the event
+    loops Streamlit creates on every rerun.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            # A negative balance is how long this caller has to wait for its tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self, tokens=1):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -1,22 +1,9 @@
-import docx
 import streamlit as st
 from langchain_groq import ChatGroq
 from credentials import GROQ_API
+from llm_concurrency import call_llm
 import re
 
-def extract_text_from_docx(file_path):
-    # Open the .docx file
-    doc = docx.Document(file_path)
-    
-    # Extract all the text
-    resume_text = []
-    for paragraph in doc.paragraphs:
-        # Add non-empty paragraphs to the list
-        if paragraph.text.strip():
-            resume_text.append(paragraph.text.strip())
-    
-    return resume_text
- 
 async def extract_resume_sections_langchain(prompt, model_name, resume_text):
     """
     Function to run a custom prompt on LLaMA 3.1 using the Ollama API.
@@ -56,7 +43,7 @@ async def extract_resume_sections_langchain(prompt, model_name, resume_text):
             ),
             ("human", f"{resume_text}"),
         ]
-        ai_msg = llm.invoke(messages)
+        ai_msg = await call_llm("groq", llm, llm.ainvoke, input=messages)
         
         return ai_msg.content
 
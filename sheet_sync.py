@@ -0,0 +1,44 @@
+from create_gcp_connection import extract_job_data_from_sheet
+from bulk_ingest import IngestCheckpoint, job_row_hash, ingest_jobs
+from configuration import BULK_INGEST_CHECKPOINT_PATH
+
+
+def find_pending_jobs(jobs, checkpoint):
+    """
+    The jobs that are new, changed since they were ingested, or failed last time.
+
+    Args:
+    - jobs (list): Dictionaries with 'ID' and 'Job Link'.
+    - checkpoint (IngestCheckpoint): Record of the jobs ingested so far.
+
+    Returns:
+    - list: The jobs that still need to go through the pipeline, in sheet order.
+    """
+    pending = [job for job in jobs if not checkpoint.is_done(job["ID"], job_row_hash(job))]
+    new = sum(1 for job in pending if str(job["ID"]) not in checkpoint.entries)
+    print(f"Sheet sync: {len(jobs)} rows, {new} new, {len(pending) - new} changed or failed, {len(jobs) - len(pending)} unchanged")
+    return pending
+
+async def sync_sheet(sheets_service, spreadsheet_id, sheet_name, checkpoint_path=BULK_INGEST_CHECKPOINT_PATH, recheck=False):
+    """
+    Ingest only the rows of the sheet that were not ingested before, or changed since.
+
+    Only the ID and Job Link columns are read from the sheet, and the row and content hashes of ingested
+    jobs live in the bulk ingestion checkpoint, so a daily run costs in proportion to the new rows.
+    With recheck, every row is scraped again and only the postings whose content changed are re-embedded.
+
+    Returns:
+    - dict: The counts returned by ingest_jobs, plus the number of "unchanged" rows.
+    """
+    jobs = extract_job_data_from_sheet(sheets_service, spreadsheet_id, sheet_name)
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    try:
+        pending = find_pending_jobs(jobs, checkpoint)
+    finally:
+        checkpoint.close()
+    if recheck:
+        pending = jobs
+
+    counts = await ingest_jobs(pending, checkpoint_path=checkpoint_path)
+    counts["unchanged"] = len(jobs) - len(pending)
+    return counts
@@ -0,0 +1,98 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import threading
+from telemetry import current_call
+
+
+def request_key(*parts):
+    # Stable hash of the request arguments, anything JSON serializable
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Deduplicates identical requests that are in flight at the same time.
+
+    The first caller for a key (the leader) makes the call; callers arriving with the same key before
+    it finishes wait for the leader's result instead of making their own. In-flight calls are tracked
+    with thread-safe futures, so callers on other Streamlit sessions, threads and event loops share too.
+    Callers receive the same result object, which must therefore be treated as read-only.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    async def run(self, key, call):
+        """
+        Await `call()`, or the identical call already in flight under `key`.
+
+        Args:
+        - key (str): Hash identifying the request, see request_key.
+        - call: Async callable taking no arguments that makes the request.
+
+        Returns:
+        - The result of the call. If the call raised, every caller waiting on it gets the exception.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._in_flight[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            record = current_call.get()
+            if record is not None:
+                # The leader's record carries the tokens and cost, this one only the wait
+                record.coalesced = True
+            try:
+                # shield: a follower being cancelled must not cancel the shared future for everyone else
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled before it finished, make the call ourselves
+                return await call()
+
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._in_flight)
+        requests = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_rate": self.coalesced / requests if requests else 0.0,
+            "in_flight": in_flight,
+        }
+
+
+# One group per kind of request, shared by the whole process
+llm_requests = SingleFlight("llm")
+embedding_requests = SingleFlight("embeddings")
+
+def single_flight_stats():
+    return {group.name: group.stats() for group in (llm_requests, embedding_requests)}
@@ -0,0 +1,274 @@
+import html as html_entities
+import json
+import re
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup
+
+# Key of the description record, the same one the Glassdoor CSS schema produces
+DESCRIPTION_KEY = "job description: "
+
+# Extraction schemas for Glassdoor job postings
+JOB_DESCRIPTION_SCHEMA = {
+        "name": "job description",
+        "baseSelector": "div.JobDetails_jobDescriptionWrapper___tqxc",
+        "fields": [
+            {
+                "name": DESCRIPTION_KEY,
+                "selector": "div",
+                "type": "text",
+            },
+        ]
+}
+
+JOB_DETAILS_SCHEMA = {
+    "name": "header",
+    "baseSelector": ".JobDetails_jobDetailsHeader__Hd9M3",
+    "fields": [
+        {
+            "name": "company name",
+            "selector": "h4",
+            "type": "text",
+        },
+        {
+            "name": "Job role",
+            "selector": "h1",
+            "type": "text",
+        },
+        {
+            "name": "company rating",
+            "selector": "span",
+            "type": "text",
+        },
+        {
+            "name": "Job Location",
+            "selector": "div.JobDetails_location__mSg5h",
+            "type": "text",
+        }
+    ],
+}
+
+def clean_text(text):
+    # Collapse the whitespace left behind by markup
+    return re.sub(r"\s+", " ", text or "").strip()
+
+def html_to_text(html):
+    # Descriptions in JSON-LD are often HTML fragments, sometimes entity-escaped, keep the paragraph breaks
+    if html and "&lt;" in html:
+        html = html_entities.unescape(html)
+    return "\n".join(
+        clean_text(line) for line in BeautifulSoup(html or "", "html.parser").get_text("\n").splitlines() if clean_text(line)
+    )
+
+def domain_matches(url, domains):
+    host = urlparse(url).netloc.lower().split(":")[0]
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class SiteAdapter:
+    """
+    Extracts a job posting from the HTML of one kind of page, without any model call.
+
+    Subclasses set `domains` (an empty tuple matches every site) and implement extract, which
+    returns (job_description, job_details) as lists of records, or None when the page is not
+    one the adapter understands.
+    """
+
+    name = "base"
+    domains = ()
+
+    def matches(self, url):
+        return not self.domains or domain_matches(url, self.domains)
+
+    def extract(self, url, html):
+        raise NotImplementedError
+
+
+class GlassdoorCssAdapter(SiteAdapter):
+    """
+    Glassdoor job pages, through the CSS schemas above.
+    """
+
+    name = "glassdoor_css"
+    domains = ("glassdoor.com", "glassdoor.co.uk", "glassdoor.ca", "glassdoor.co.in", "glassdoor.de")
+
+    def extract(self, url, html):
+        # crawl4ai is only needed by this adapter, the others work on plain HTML
+        from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+        job_description = JsonCssExtractionStrategy(JOB_DESCRIPTION_SCHEMA, verbose=True).extract(url, html)
+        if not job_description:
+            return None
+        job_details = JsonCssExtractionStrategy(JOB_DETAILS_SCHEMA, verbose=True).extract(url, html)
+        return job_description, job_details
+
+
+class JsonLdJobPostingAdapter(SiteAdapter):
+    """
+    Any page that embeds a schema.org JobPosting as JSON-LD, which most job boards and ATSs do for search engines.
+    """
+
+    name = "json_ld"
+
+    def find_job_posting(self, data):
+        # JobPosting can sit at the top level, inside a list, or inside an @graph
+        if isinstance(data, list):
+            for item in data:
+                found = self.find_job_posting(item)
+                if found:
+                    return found
+        elif isinstance(data, dict):
+            types = data.get("@type")
+            types = types if isinstance(types, list) else [types]
+            if "JobPosting" in types:
+                return data
+            if "@graph" in data:
+                return self.find_job_posting(data["@graph"])
+        return None
+
+    def location(self, posting):
+        locations = posting.get("jobLocation") or []
+        locations = locations if isinstance(locations, list) else [locations]
+        names = []
+        for location in locations:
+            address = location.get("address", {}) if isinstance(location, dict) else {}
+            if isinstance(address, str):
+                names.append(address)
+                continue
+            country = address.get("addressCountry")
+            country = country.get("name") if isinstance(country, dict) else country
+            parts = [address.get("addressLocality"), address.get("addressRegion"), country]
+            names.append(", ".join(part for part in parts if part))
+        if posting.get("jobLocationType") == "TELECOMMUTE":
+            names.append("Remote")
+        return "; ".join(name for name in names if name) or None
+
+    def extract(self, url, html):
+        soup = BeautifulSoup(html, "html.parser")
+        for script in soup.find_all("script", type="application/ld+json"):
+            try:
+                data = json.loads(script.string or "")
+            except json.JSONDecodeError:
+                continue
+            posting = self.find_job_posting(data)
+            if not posting or not posting.get("description"):
+                continue
+
+            organization = posting.get("hiringOrganization") or {}
+            if isinstance(organization, str):
+                organization = {"name": organization}
+            rating = posting.get("aggregateRating") or organization.get("aggregateRating")
+            job_details = {
+                "company name": organization.get("name"),
+                "Job role": clean_text(posting.get("title")),
+                "company rating": str(rating.get("ratingValue")) if isinstance(rating, dict) and rating.get("ratingValue") else None,
+                "Job Location": self.location(posting),
+            }
+            return [{DESCRIPTION_KEY: html_to_text(posting["description"])}], [job_details]
+        return None
+
+
+class ReadabilityAdapter(SiteAdapter):
+    """
+    Last resort for any page: the block with the most paragraph text is taken as the description,
+    the title and company come from the <h1> and the page's Open Graph tags.
+
+    The page must look like a posting, a job title plus a description that talks about the role,
+    so login walls, bot checks and error pages fall through instead of being parsed as jobs.
+    """
+
+    name = "readability"
+    min_description_chars = 500
+    # Titles of pages that stand in front of the posting
+    blocked_title_pattern = re.compile(
+        r"\b(sign ?in|sign ?up|log ?in|join now|access denied|forbidden|just a moment|attention required|"
+        r"verify you are human|are you a robot|captcha|security check|page not found)\b",
+        re.IGNORECASE,
+    )
+    # Words a job description uses, at least min_job_terms different ones must appear
+    job_term_pattern = re.compile(
+        r"\b(you will|you'll|responsibilit\w*|requirements?|qualifications?|experience|skills|"
+        r"role|team|salary|compensation|benefits|apply|candidate|full[- ]time|part[- ]time)\b",
+        re.IGNORECASE,
+    )
+    min_job_terms = 3
+
+    def looks_like_job(self, title, description):
+        if not title or self.blocked_title_pattern.search(title):
+            return False
+        terms = {match.lower() for match in self.job_term_pattern.findall(description)}
+        return len(terms) >= self.min_job_terms
+
+    def score(self, block):
+        # Text of the block's own paragraphs and lists counts, text inside links (navigation, footers) counts against it
+        text = sum(len(clean_text(element.get_text(" "))) for element in block.find_all(["p", "ul", "ol"], recursive=False))
+        links = sum(len(clean_text(link.get_text(" "))) for link in block.find_all("a"))
+        return text - 2 * links
+
+    def extract(self, url, html):
+        soup = BeautifulSoup(html, "html.parser")
+        # The title often sits in the page header, read it before the boilerplate is stripped
+        heading = soup.find("h1")
+        title = clean_text(heading.get_text(" ")) if heading else None
+        for element in soup(["script", "style", "noscript", "nav", "header", "footer", "aside", "form"]):
+            element.decompose()
+
+        blocks = soup.find_all(["article", "section", "div", "main"])
+        if not blocks:
+            return None
+        best = max(blocks, key=self.score)
+        description = html_to_text(str(best))
+        if len(description) < self.min_description_chars:
+            return None
+
+        def meta(prop):
+            tag = soup.find("meta", attrs={"property": prop}) or soup.find("meta", attrs={"name": prop})
+            return clean_text(tag.get("content")) if tag and tag.get("content") else None
+
+        title = title or meta("og:title")
+        if not self.looks_like_job(title, description):
+            return None
+
+        job_details = {
+            "company name": meta("og:site_name"),
+            "Job role": title,
+            "company rating": None,
+            "Job Location": None,
+        }
+        return [{DESCRIPTION_KEY: description}], [job_details]
+
+
+# Tried in order: site specific adapters first, then the generic ones
+SITE_ADAPTERS = [GlassdoorCssAdapter(), JsonLdJobPostingAdapter(), ReadabilityAdapter()]
+
+def register_adapter(adapter, first=True):
+    """
+    Add a site adapter. By default it is tried before the existing ones, so a site specific
+    adapter takes precedence over the generic JSON-LD and readability adapters.
+    """
+    if first:
+        SITE_ADAPTERS.insert(0, adapter)
+    else:
+        SITE_ADAPTERS.append(adapter)
+
+def extract_with_adapters(url, html, adapters=None):
+    """
+    Extract a job posting from fetched HTML with the first matching adapter that finds one.
+
+    Args:
+    - url (str): The page URL, used to pick the site specific adapters.
+    - html (str): The page HTML.
+    - adapters (list): Adapters to try, defaults to SITE_ADAPTERS.
+
+    Returns:
+    - tuple: (job_description, job_details, adapter_name), or (None, None, None) if no adapter found a posting.
+    """
+    for adapter in adapters if adapters is not None else SITE_ADAPTERS:
+        if not adapter.matches(url):
+            continue
+        try:
+            extracted = adapter.extract(url, html)
+        except Exception as e:
+            print(f"Site adapter {adapter.name} failed on {url}: {e}")
+            continue
+        if extracted:
+            return extracted[0], extracted[1], adapter.name
+    return None, None, None
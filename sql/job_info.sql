@@ -0,0 +1,8 @@
+-- Unique job links for job_info, so bulk ingestion (bulk_ingest.py) can upsert on job_link:
+-- a posting that is ingested again, after it changed or after a crash, updates its row instead
+-- of adding a second one. Run once in the Supabase SQL editor.
+
+-- Existing duplicates would make the index fail, keep the newest row per link first:
+-- delete from job_info a using job_info b where a.job_link = b.job_link and a.id < b.id;
+
+alter table job_info add constraint job_info_job_link_key unique (job_link);
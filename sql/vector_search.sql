@@ -0,0 +1,47 @@
+-- Server-side similarity search for the Supabase tables, called through supabase.rpc(...)
+-- from vector_search.py. Run once in the Supabase SQL editor.
+
+create extension if not exists vector;
+
+-- The embedding columns must be pgvector columns. If they were created as json/float8[],
+-- convert them first:
+-- alter table extra_info alter column text_embedding type vector(1536) using text_embedding::text::vector;
+-- alter table resume_data alter column resume_embedding type vector(1536) using resume_embedding::text::vector;
+
+create index if not exists extra_info_text_embedding_idx
+    on extra_info using hnsw (text_embedding vector_cosine_ops);
+
+create or replace function match_extra_info(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int
+)
+returns table (id bigint, category text, title text, text text, similarity float)
+language sql stable
+as $$
+    select e.id, e.category, e.title, e.text, 1 - (e.text_embedding <=> query_embedding) as similarity
+    from extra_info e
+    where 1 - (e.text_embedding <=> query_embedding) >= match_threshold
+    order by e.text_embedding <=> query_embedding
+    limit match_count;
+$$;
+
+-- resume_names limits the search to the resumes picked in the UI, null searches them all
+drop function if exists match_resume_data(vector, float, int);
+
+create or replace function match_resume_data(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int,
+    resume_names text[] default null
+)
+returns table (id bigint, resume_name text, resume_text text, similarity float)
+language sql stable
+as $$
+    select r.id, r.resume_name, r.resume_text, 1 - (r.resume_embedding <=> query_embedding) as similarity
+    from resume_data r
+    where 1 - (r.resume_embedding <=> query_embedding) >= match_threshold
+      and (resume_names is null or r.resume_name = any(resume_names))
+    order by r.resume_embedding <=> query_embedding
+    limit match_count;
+$$;
@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class SqliteLruStore:
+    """
+    Key/value table in SQLite, bounded in size by evicting the least recently used entries.
+
+    Every row keeps its value (text or bytes), its size, when it was stored and when it was last read,
+    plus the metadata columns the owner declares. The page, embedding and LLM response caches are thin
+    adapters over it that choose the keys and encode the values.
+
+    With ttl_seconds, entries older than that are treated as misses and removed. Readers can also
+    pass a max_age_seconds of their own, which only skips older entries without removing them.
+    """
+
+    BASE_COLUMNS = ("key", "value", "size", "created", "last_access")
+
+    def __init__(self, path, table, max_bytes, metadata_columns=(), ttl_seconds=None):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.metadata_columns = tuple(metadata_columns)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Streamlit reruns the script on different threads, so the connection is shared behind a lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        columns = self.BASE_COLUMNS + self.metadata_columns
+        existing = tuple(row[1] for row in self._connection.execute(f"PRAGMA table_info({table})"))
+        if existing and existing != columns:
+            # Written by an older layout, the entries are simply fetched again
+            self._connection.execute(f"DROP TABLE {table}")
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value, size INTEGER, created REAL, last_access REAL"
+            + "".join(f", {column}" for column in self.metadata_columns) + ")"
+        )
+        self._connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)")
+        self._connection.commit()
+        self._insert = (
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        )
+
+    def get_many(self, keys, max_age_seconds=None):
+        """
+        Look up several keys at once.
+
+        Args:
+        - keys (list): The keys, repeated keys count as one lookup each.
+        - max_age_seconds (float): Optional, entries stored this long ago or earlier are misses.
+
+        Returns:
+        - dict: Key -> value, for the keys that were found.
+        """
+        now = time.time()
+        found = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters, so look the keys up in chunks
+            unique_keys = list(dict.fromkeys(keys))
+            expired = []
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, value, created FROM {self.table} WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, value, created in rows:
+                    if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                        expired.append((key,))
+                    elif max_age_seconds is None or now - created < max_age_seconds:
+                        found[key] = value
+
+            if expired:
+                self._connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", expired)
+            if found:
+                self._connection.executemany(
+                    f"UPDATE {self.table} SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                )
+            if expired or found:
+                self._connection.commit()
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def get(self, key, max_age_seconds=None):
+        """
+        Look up one key.
+
+        Returns:
+        - The stored value, or None if it is missing or too old.
+        """
+        return self.get_many([key], max_age_seconds).get(key)
+
+    def put_many(self, entries):
+        """
+        Store entries and evict old ones if the store is over its size limit.
+
+        Args:
+        - entries (list): (key, value, metadata) tuples, metadata holding one value per metadata column.
+        """
+        now = time.time()
+        rows = []
+        for key, value, metadata in entries:
+            size = len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+            rows.append((key, value, size, now, now, *metadata))
+
+        with self._lock:
+            self._connection.executemany(self._insert, rows)
+            self._connection.commit()
+            self._evict(now)
+
+    def put(self, key, value, *metadata):
+        self.put_many([(key, value, metadata)])
+
+    def _evict(self, now):
+        if self.ttl_seconds is not None:
+            self._connection.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl_seconds,))
+        total_bytes = self._connection.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            self._connection.commit()
+            return
+
+        # Walk entries from least to most recently used until enough space is freed
+        to_delete = []
+        for key, size in self._connection.execute(f"SELECT key, size FROM {self.table} ORDER BY last_access ASC"):
+            if total_bytes <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total_bytes -= size
+
+        self._connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", to_delete)
+        self._connection.commit()
+        self.evictions += len(to_delete)
+
+    def stats(self):
+        with self._lock:
+            entries, total_bytes = self._connection.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total_bytes,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute(f"DELETE FROM {self.table}")
+            self._connection.commit()
+
+
+class SharedInstance:
+    """
+    One lazily created instance per process, shared by every Streamlit session and rerun.
+
+    Usage:
+        _page_cache = SharedInstance(PageCache)
+        page_cache = _page_cache.get()
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._instance is None:
+                self._instance = self.factory()
+            return self._instance
+
+    def reset(self):
+        # The next get() creates a fresh instance, e.g. after the working directory changed
+        with self._lock:
+            self._instance = None
@@ -1,23 +1,34 @@
 import streamlit as st
 import asyncio
-from get_job_details_crawl4ai import extract_job_description, extract_job_details
+import time
+from get_job_details_crawl4ai import extract_job_posting
 import json
-from prompt_llm_for_resume import  run_llama_prompt, summarize_job_description, parse_response_to_df, save_job_dict_response
+from prompt_llm_for_resume import  run_llama_prompt, summarize_job_description
 from supabase_backend import create_supabase_connection, chunk_data, insert_data_into_table, fetch_data_from_table
 from create_embeddings import generate_embeddings
-from find_optimal_resume import find_rag_data_match_percentage, process_resumes, get_file_paths, find_best_resume, suggest_resume_improvements, prepare_cover_letter, extract_tags_content
-from supabase_helper_functions import prepare_data_rag, prepare_data_resume, prepare_data_job_description
+from find_optimal_resume import process_resumes, get_file_paths
+from embedding_matcher import EmbeddingMatcher
+from rag_ann_index import embedded_rows, load_or_build_rag_index
+from analysis_pipeline import AnalysisView, run_analysis_pipeline
+from local_job_parser import identify_job_details
+from telemetry import telemetry_run, telemetry_stage, summarize_metrics
+from tracing import start_trace, enable_profiling, write_profiles
+from supabase_helper_functions import prepare_data_rag, prepare_data_resume
 import pandas as pd
-from configuration import IDENTIFY_JOB_DESCRIPTION_PROMPT, IDENTIFY_JOB_DESCRIPTION_MODEL, RAG_DATA_STRUCTURNG_PROMPT, RAG_DATA_STRUCTURING_MODEL, COVER_LETTER_GENERATION_PROMPT, COVER_LETTER_GENERATION_MODEL, PROVIDING_SUGGESTIONS_MODEL, SUGGESTIONS_JOB_BASED_ON_RESUME, IDENTIFY_DETAILS_FORM_RESUME_MODEL, SUMMARIZE_JOB_DESCRIPTION_MODEL, IDENTIFY_DETAILS_FROM_JOB_PROMPT, SUMMARY_PROMPT, EMBEDDING_MODEL, IDENTIFY_DETAILS_FROM_JOB_MODEL, IDENTIFY_DETAILS_FROM_RESUME_PROMPT
+from configuration import IDENTIFY_JOB_DESCRIPTION_PROMPT, IDENTIFY_JOB_DESCRIPTION_MODEL, RAG_DATA_STRUCTURNG_PROMPT, RAG_DATA_STRUCTURING_MODEL, IDENTIFY_DETAILS_FORM_RESUME_MODEL, EMBEDDING_MODEL, IDENTIFY_DETAILS_FROM_RESUME_PROMPT
 from helper_functions import save_as_pdf, save_as_docx
 from prompt_openai import run_openai_chat_completion, initialize_openai_client
 import numpy as np
-from configuration import COLD_EMAILS_MESSAGES_PROMPT, COLD_EMAILS_MESSAGES_MODEL, RESUME_SUMMARY_PROMPT, RESUME_SUMMARY_MODEL
-from emails_connection_messages import generate_connection_messages_email
+from configuration import RAG_ANN_MIN_ROWS, VECTOR_SEARCH_BACKEND, TRACE_ENABLED
 from llm_api_calls_LiteLLM import run_liteLLM_call
 import os
+import sys
 from credentials import OPENAI_API, ANTHROPIC_API
-from prompt_anthropic import initialize_anthropic_client, run_anthropic_chat_completion
+from prompt_anthropic import initialize_anthropic_client
+
+# streamlit run streamlit_ui.py -- --profile also profiles the CPU bound steps of every run
+PROFILE_MODE = "--profile" in sys.argv
+enable_profiling(PROFILE_MODE)
 
 ## set ENV variables
 os.environ["OPENAI_API_KEY"] = OPENAI_API
@@ -46,6 +57,10 @@ def initialize_session_states():
         st.session_state["text"] = ""
     if "rag_df" not in st.session_state:
         st.session_state["rag_df"] = None
+    if "rag_matcher" not in st.session_state:
+        st.session_state["rag_matcher"] = None
+    if "rag_ann_index" not in st.session_state:
+        st.session_state["rag_ann_index"] = None
     if "job_emb" not in st.session_state:
         st.session_state["job_emb"] = None
     if "rag_form_visible" not in st.session_state:
@@ -107,14 +122,23 @@ def initialize_session_states():
 async def initialize_clients():
     st.session_state["supabase_client"] = await create_supabase_connection()
     st.session_state["openai_client"] = await initialize_openai_client()
-    st.session_state["anthropic_client"] = await initialize_anthropic_client(ANTHROPIC_API)
+    st.session_state["anthropic_client"] = await initialize_anthropic_client()
+
+async def fetch_resumes_by_name(resume_names):
+    # Reuse the rows already in the session when the selection has not changed
+    if VECTOR_SEARCH_BACKEND == "pgvector":
+        # The names are enough, the resumes are ranked inside Postgres (see rank_resumes)
+        return pd.DataFrame({'resume_name': list(resume_names)})
+    current = st.session_state.resume
+    if isinstance(current, pd.DataFrame) and 'resume_embedding' in current.columns and set(current['resume_name']) == set(resume_names):
+        return current
+    return await fetch_data_from_table(st.session_state["supabase_client"], 'resume_data', filters={'resume_name': ('in', list(resume_names))})
 
 async def get_resumes_ui():
     st.subheader("Select a Resume")
 
-    # Call the fetch_data_from_table function
-    # Replace 'supabase_client' and 'resume_data' with your actual Supabase client and table name
-    df = await fetch_data_from_table(st.session_state["supabase_client"], 'resume_data')
+    # Only the names are needed to populate the widgets, full rows are fetched for the selection
+    df = await fetch_data_from_table(st.session_state["supabase_client"], 'resume_data', columns=['resume_name'])
 
     if not df.empty:
         # Find the row where resume_name is "Pratik Hotchandani Master Resume 2"
@@ -122,7 +146,10 @@ async def get_resumes_ui():
 
         # Store it in session state
         if not master_resume_row.empty:
-            st.session_state['master_resume'] = master_resume_row.iloc[0]
+            # Fetch the full master resume row once per session
+            if st.session_state['master_resume'] is None:
+                master_resume_df = await fetch_data_from_table(st.session_state["supabase_client"], 'resume_data', filters={'resume_name': "Pratik Hotchandani Master Resume 2"})
+                st.session_state['master_resume'] = master_resume_df.iloc[0]
             
             # Remove the row from the dataframe
             df = df[df['resume_name'] != "Pratik Hotchandani Master Resume 2"].reset_index(drop=True)
@@ -139,7 +166,7 @@ async def get_resumes_ui():
         # Use a multiselect widget to allow multiple or single resume selection
         if select_all:
             selected_resumes = resume_names  # Select all resumes if checkbox is checked
-            selected_details = df[df['resume_name'].isin(selected_resumes)]
+            selected_details = await fetch_resumes_by_name(selected_resumes)
             #st.session_state.selected_resumes = selected_details
             st.session_state.resume = selected_details
         else:
@@ -148,7 +175,7 @@ async def get_resumes_ui():
         if not select_all and st.button("Select"):
             # Display selected resume details
             if selected_resumes:
-                st.session_state.resume = df[df['resume_name'].isin(selected_resumes)]
+                st.session_state.resume = await fetch_resumes_by_name(selected_resumes)
                 st.write("Selected Resume Details:")
                 st.dataframe(st.session_state.resume)  # Display the filtered DataFrame
                 #st.session_state.resume = selected_details
@@ -157,6 +184,31 @@ async def get_resumes_ui():
     else:
         st.write("No resumes available.")
 
+def resume_progress(file_paths):
+    """
+    A status line per uploaded file and an overall progress bar, updated by process_resumes.
+
+    Returns:
+    - tuple: (on_progress callback for process_resumes, dict of file path -> error, filled in as files fail)
+    """
+    progress_bar = st.progress(0.0, text=f"Processing {len(file_paths)} resumes...")
+    lines = {file_path: st.empty() for file_path in file_paths}
+    labels = {"parsing": "reading the file", "extracting": "extracting sections", "done": "done"}
+    finished = set()
+    failures = {}
+
+    def on_progress(file_path, status, error):
+        name = os.path.basename(file_path)
+        if status == "failed":
+            failures[file_path] = error
+            lines[file_path].error(f"{name}: failed ({error})")
+        else:
+            lines[file_path].write(f"{name}: {labels[status]}")
+        if status in ("done", "failed"):
+            finished.add(file_path)
+            progress_bar.progress(len(finished) / len(file_paths), text=f"Processed {len(finished)} of {len(file_paths)} resumes")
+    return on_progress, failures
+
 async def upload_resume():
     st.subheader("Upload a New Resume")
     uploaded_files = st.file_uploader("Choose a resume files", type=["docx"], accept_multiple_files=True)
@@ -172,10 +224,15 @@ async def upload_resume():
         if st.button("Upload"):
             # Prepare data and insert into database
             file_paths = await get_file_paths(uploaded_files)
-            resume_df = await process_resumes(file_paths, IDENTIFY_DETAILS_FROM_RESUME_PROMPT, IDENTIFY_DETAILS_FORM_RESUME_MODEL)  # Step 1: Process resumes
+            on_progress, failures = resume_progress(file_paths)
+            resume_df = await process_resumes(file_paths, IDENTIFY_DETAILS_FROM_RESUME_PROMPT, IDENTIFY_DETAILS_FORM_RESUME_MODEL, on_progress=on_progress)  # Step 1: Process resumes
+            if failures:
+                st.warning(f"{len(failures)} of {len(file_paths)} resumes could not be processed and were skipped.")
+            if resume_df.empty:
+                return
             updated_resume_df = await generate_embeddings(resume_df, EMBEDDING_MODEL , "resume")  # Step 2: Generate embeddings
             resume_prepared_data = prepare_data_resume(updated_resume_df)
-            response_insert = await insert_data_into_table(st.session_state["supabase_client"], "resume_data", resume_prepared_data, batch_size=100)
+            await insert_data_into_table(st.session_state["supabase_client"], "resume_data", resume_prepared_data, batch_size=100)
             
             st.success("Resume uploaded successfully!")
             st.write(updated_resume_df)  # Display the DataFrame with embeddings
@@ -187,13 +244,22 @@ async def include_rag_data():
     # Use the checkbox value to conditionally include RAG data
     if st.session_state["include_rag_data_checkbox"]:
         st.write("RAG data will be included in the processing.")
-        rag_df = await fetch_data_from_table(st.session_state["supabase_client"], 'extra_info')
-        st.session_state["rag_df"] = rag_df
+        # Fetch the RAG table and build its matcher once, later reruns reuse both.
+        # With the pgvector backend matching happens in the database, so nothing is fetched here.
+        if st.session_state["rag_df"] is None and VECTOR_SEARCH_BACKEND == "client":
+            rag_df = await fetch_data_from_table(st.session_state["supabase_client"], 'extra_info')
+            st.session_state["rag_df"] = rag_df
+            st.session_state["rag_matcher"] = EmbeddingMatcher.from_frame(rag_df, 'text_embedding') if not rag_df.empty else None
+            # Large RAG tables are searched through the approximate index instead of brute force
+            if len(rag_df) >= RAG_ANN_MIN_ROWS and 'id' in rag_df.columns:
+                st.session_state["rag_ann_index"] = load_or_build_rag_index(rag_df)
         #st.write(rag_df)
 
     else:
         st.write("RAG data is excluded from the processing.")
         st.session_state["rag_df"] = None
+        st.session_state["rag_matcher"] = None
+        st.session_state["rag_ann_index"] = None
 
 async def add_extra_rag_data():
     # Toggle form visibility on button click
@@ -255,6 +321,15 @@ async def add_extra_rag_data():
                 #st.write(updated_rag_df)
                 rag_prepared_data = prepare_data_rag(updated_rag_df)
                 response_insert = await insert_data_into_table(st.session_state["supabase_client"], "extra_info", rag_prepared_data, batch_size=100)
+                # Add the new entries to the persisted RAG index without rebuilding it. Ids and vectors both
+                # come from the rows the database returned, so a partial or deduplicated upsert cannot misalign them.
+                inserted_df = pd.DataFrame(response_insert)
+                if st.session_state["rag_ann_index"] is not None and {'id', 'text_embedding'} <= set(inserted_df.columns):
+                    st.session_state["rag_ann_index"].add(*embedded_rows(inserted_df, 'id', 'text_embedding'))
+                    st.session_state["rag_ann_index"].save()
+                # Refetch the RAG table (and rebuild its matcher) on the next rerun
+                st.session_state["rag_df"] = None
+                st.session_state["rag_matcher"] = None
                 st.success("All entries successfully saved!")
 
 async def job_posting_submission():
@@ -279,92 +354,95 @@ def update_selections():
     st.session_state.generate_cover_letter = st.session_state.select_all
     st.session_state.reach_out = st.session_state.select_all
 
-async def generate_suggestions_cover_letter():
-
-    # Creating a dataframe from the llm response
-    st.session_state["parsed_job_df"] = parse_response_to_df(st.session_state["llama_response"])
-    st.session_state["parsed_job_df"]['job_description'] = json.dumps(st.session_state["job_description"])
-    st.session_state["parsed_job_df"]['job_link'] = st.session_state.job_link
-
-    ## Generating embedding for job description:
-    st.session_state.job_emb  = await generate_embeddings(st.session_state["parsed_job_df"], EMBEDDING_MODEL, "job")  # Step 2: Generate embeddings
-    #st.dataframe(job_emb)
-    
-    job_prepared_data = prepare_data_job_description(st.session_state.job_emb )
-    response_insert = await insert_data_into_table(st.session_state["supabase_client"], "job_info", job_prepared_data, batch_size=100)
-
-    # Assuming job_emb_df['job_emb'].values[0] is the single embedding vector for the job description
-    st.session_state["best_resume_text"], st.session_state["updated_emb_df"] = find_best_resume(st.session_state.resume, st.session_state.job_emb)
-    # Print the DataFrame with percentage matches
-    
-    st.write("Resume Percentage Match: ")
-    st.write(st.session_state["updated_emb_df"][['resume_name', 'percentage_match']])
-
-    if st.session_state["rag_df"] is not None and not st.session_state["rag_df"].empty:
-        st.write("RAG data percentage Match: ")
-        st.session_state["best_rag_data"], updated_rag_df_percentage = find_rag_data_match_percentage(st.session_state["rag_df"], st.session_state.job_emb)
-        st.session_state["best_rag_data"] = st.session_state["best_rag_data"].sort_values(by='percentage_match', ascending=False)
-        st.write(st.session_state["best_rag_data"])
-        st.session_state["best_rag_data"] = st.session_state["best_rag_data"][['category', 'title', 'text']]
-        # Providing suggestions based on selected resume or the resume with the highest match.
-        st.session_state["rag_data_prompt"] = st.session_state["best_rag_data"].to_json(orient="records")
-        st.session_state["suggestions"] = await suggest_resume_improvements(st.session_state.openai_client, SUGGESTIONS_JOB_BASED_ON_RESUME, st.session_state["llama_response"], st.session_state["best_resume_text"], st.session_state["rag_data_prompt"], PROVIDING_SUGGESTIONS_MODEL, model_temp = 0.2)
-    else:
-        st.session_state["suggestions"] = await suggest_resume_improvements(st.session_state.openai_client, SUGGESTIONS_JOB_BASED_ON_RESUME, st.session_state["llama_response"], st.session_state["best_resume_text"], "", PROVIDING_SUGGESTIONS_MODEL, model_temp = 0.2)
-
-    with st.expander("Suggestions: "):
-        st.write(st.session_state["suggestions"])
-    save_job_dict_response(st.session_state["suggestions"], "suggestions")
-
-    ## Providing suggestions based on selected resume or the restume with the highest match.
-    st.session_state.cover_letter = await prepare_cover_letter(st.session_state.openai_client, COVER_LETTER_GENERATION_PROMPT, st.session_state["llama_response"], st.session_state["best_resume_text"], COVER_LETTER_GENERATION_MODEL, model_temp = 0.2)
-
-    # Show detailed summary inside an expander:
-    with st.expander("Cover letter: "):
-        st.write(st.session_state.cover_letter)
-
-    save_job_dict_response(st.session_state.cover_letter, "cover_letter")
-
-    # Add download buttons
-    #st.write("Download Cover Letter:")
-    #cover_letter_string = json.dumps(cover_letter)
-    # Generate files
-    #pdf_data = save_as_pdf(st.session_state.cover_letter)
-    #docx_data = save_as_docx(st.session_state.cover_letter)
-
-async def generate_reach_out_messages():
-
-    # Show detailed summary inside an expander:
-    st.session_state["cold_email_messages"] = await generate_connection_messages_email(COLD_EMAILS_MESSAGES_PROMPT, st.session_state["summary_response"], st.session_state["best_resume_text"], COLD_EMAILS_MESSAGES_MODEL, model_temp = 0.2)
-    
-    st.session_state["linkedin_recruiter_message"] = extract_tags_content(st.session_state.cold_email_messages,['linkedin_message_recruiter'])
-    with st.expander("Recruiter LinkedIn Message: "):
-        st.write(st.session_state.linkedin_recruiter_message)
-
-    st.session_state["recruiter_email"] = extract_tags_content(st.session_state.cold_email_messages,['cold_email_recruiter'])
-    with st.expander("Recruiter Cold Email: "):
-        st.write(st.session_state.recruiter_email)
-
-    st.session_state["linkedin_connection_message"] = extract_tags_content(st.session_state.cold_email_messages,['linkedin_message_hiring_manager'])
-    with st.expander("Hiring Manager Linkedin Message: "):
-        st.write(st.session_state.linkedin_connection_message)
-
-    st.session_state["hiring_manager_email"] = extract_tags_content(st.session_state.cold_email_messages,['cold_email_hiring_manager'])
-    with st.expander("Hiring Manager Cold Email: "):
-        st.write(st.session_state.hiring_manager_email)
-
-async def generate_resume_summary():
-    st.session_state.master_resume_job_description_combined = {
-                "job_description": st.session_state["llama_response"],
-                "resume": st.session_state['master_resume']['resume_text']
-            }
-
-            # Convert the combined structure to a JSON string
-    st.session_state.master_resume_job_description_combined = json.dumps(st.session_state.master_resume_job_description_combined)
-    st.session_state["resume_summary"] = await run_anthropic_chat_completion(st.session_state.anthropic_client, st.session_state.master_resume_job_description_combined, RESUME_SUMMARY_PROMPT, RESUME_SUMMARY_MODEL)
-    st.session_state["resume_summary"] = extract_tags_content(st.session_state.resume_summary['content'],['resume_summary'])
-    with st.expander("Ideal Resume Summary: "):
-        st.write(st.session_state["resume_summary"])
+def stream_into(placeholder, min_interval=0.05):
+    """
+    Callback for streamed completions that redraws `placeholder` with the text received so far.
+
+    Redraws are limited to one every min_interval seconds, every redraw is a message to the browser.
+    """
+    last_draw = [0.0]
+
+    def on_text(text):
+        now = time.monotonic()
+        if now - last_draw[0] >= min_interval:
+            placeholder.markdown(text + " ▌")
+            last_draw[0] = now
+    return on_text
+
+def show_trace_waterfall(trace):
+    """
+    Waterfall of the run's spans in a collapsed expander, with the trace files for download.
+    """
+    import altair as alt
+    spans = trace.to_frame()
+    if spans.empty:
+        return
+    expander = st.expander("Trace waterfall")
+    # One bar per span, in start order, so concurrent stages show as overlapping bars
+    chart = alt.Chart(spans.reset_index()).mark_bar().encode(
+        x=alt.X("start_s", title="seconds"),
+        x2="end_s",
+        y=alt.Y("index:O", axis=None),
+        color="span",
+        tooltip=["span", "parent", alt.Tooltip("duration_s", format=".3f")],
+    )
+    expander.altair_chart(chart, use_container_width=True)
+    expander.download_button("Chrome trace JSON", json.dumps(trace.to_chrome_trace()), file_name=f"{trace.name}.trace.json")
+    expander.download_button("OTLP JSON", json.dumps(trace.to_otlp()), file_name=f"{trace.name}.otlp.json")
+
+class StreamlitAnalysisView(AnalysisView):
+    """
+    Shows each Analyze result in a container reserved up front, so the page keeps its order
+    whichever stage finishes first. Everything is written through the container objects rather
+    than `with` blocks, so concurrent stages never end up writing into each other's section.
+    """
+
+    def __init__(self):
+        self.slots = {name: st.container() for name in ["summary", "resume_summary", "match", "suggestions", "cover_letter", "reach_out"]}
+        self.placeholders = {}
+
+    def summary(self, summary):
+        self.slots["summary"].expander("View Summary").write(summary)
+
+    def resume_summary(self, resume_summary):
+        self.slots["resume_summary"].expander("Ideal Resume Summary: ").write(resume_summary)
+
+    def resume_matches(self, resume_matches):
+        self.slots["match"].write("Resume Percentage Match: ")
+        self.slots["match"].write(resume_matches)
+
+    def rag_matches(self, rag_matches):
+        self.slots["match"].write("RAG data percentage Match: ")
+        self.slots["match"].write(rag_matches)
+
+    def suggestions(self, suggestions):
+        self.slots["suggestions"].expander("Suggestions: ").write(suggestions)
+
+    def stream(self, section):
+        # The cover letter streams into its expander, the messages into a placeholder that is
+        # replaced by their expanders once complete
+        if section == "cover_letter":
+            placeholder = self.slots[section].expander("Cover letter: ", expanded=True).empty()
+        else:
+            placeholder = self.slots[section].empty()
+        self.placeholders[section] = placeholder
+        return stream_into(placeholder)
+
+    def failed(self, section, error):
+        what = "cover letter" if section == "cover_letter" else "reach out messages"
+        self.placeholders[section].error(f"The {what} could not be generated. {error}")
+
+    def cover_letter(self, cover_letter):
+        # Replace the streamed preview with the complete letter
+        self.placeholders["cover_letter"].write(cover_letter)
+
+    def reach_out(self, messages):
+        self.placeholders["reach_out"].empty()
+        container = self.slots["reach_out"]
+        container.expander("Recruiter LinkedIn Message: ").write(messages["linkedin_recruiter_message"])
+        container.expander("Recruiter Cold Email: ").write(messages["recruiter_email"])
+        container.expander("Hiring Manager Linkedin Message: ").write(messages["linkedin_connection_message"])
+        container.expander("Hiring Manager Cold Email: ").write(messages["hiring_manager_email"])
 
 async def main():
     # Initialize session state for resume and job link if they don't exist
@@ -412,63 +490,60 @@ async def main():
     if st.button("Analyze"):
         if st.session_state.get("job_link", "").strip() or st.session_state.get("job_entry", "").strip():
             #st.session_state.openai_client = await initialize_openai_client()
-
-            if st.session_state.get("job_link", "").strip():
+            # Every call made for this click is recorded under one run id and one trace, so they can be looked at on their own
+            with telemetry_run() as run_id, start_trace("analyze") as trace:
+                if st.session_state.get("job_link", "").strip():
 
 
-                st.write("Extracting job details from the posting..")
+                    st.write("Extracting job details from the posting..")
 
-                st.session_state["job_description"] = await extract_job_description(st.session_state.job_link)
-                job_details = await extract_job_details(st.session_state.job_link)
+                    # One crawl (or cached page) gives both the description and the header details
+                    with telemetry_stage("extract_job"):
+                        st.session_state["job_description"], job_details = await extract_job_posting(st.session_state.job_link)
 
-                # Create a dictionary combining both variables
-                job_data = {
-                    "job_description": st.session_state["job_description"],
-                    "job_details": job_details
-                }
+                    # Create a dictionary combining both variables
+                    job_data = {
+                        "job_description": st.session_state["job_description"],
+                        "job_details": job_details
+                    }
 
-                job_data_prompt = json.dumps(job_data)
-                st.session_state.job_data = job_data_prompt
-
-            else:
-                st.session_state.job_data = json.dumps(st.session_state.job_entry)
-                #job_description = await run_llama_prompt(st.session_state.job_data, IDENTIFY_JOB_DESCRIPTION_PROMPT, IDENTIFY_JOB_DESCRIPTION_MODEL)
-                st.session_state["job_description"] = await run_openai_chat_completion(st.session_state.openai_client, st.session_state.job_data, IDENTIFY_JOB_DESCRIPTION_PROMPT, IDENTIFY_JOB_DESCRIPTION_MODEL)
+                    job_data_prompt = json.dumps(job_data)
+                    st.session_state.job_data = job_data_prompt
 
+                else:
+                    st.session_state.job_data = json.dumps(st.session_state.job_entry)
+                    #job_description = await run_llama_prompt(st.session_state.job_data, IDENTIFY_JOB_DESCRIPTION_PROMPT, IDENTIFY_JOB_DESCRIPTION_MODEL)
+                    with telemetry_stage("extract_job"):
+                        st.session_state["job_description"] = await run_openai_chat_completion(st.session_state.openai_client, st.session_state.job_data, IDENTIFY_JOB_DESCRIPTION_PROMPT, IDENTIFY_JOB_DESCRIPTION_MODEL)
 
-            with st.expander("View Job Description"):
-                st.write(st.session_state["job_description"])
-
-            # Prompting llm using groq api for llama to identify details from a job description
-            #job_data_prompt = json.dumps(job_data)
-            st.session_state["llama_response"] = await run_openai_chat_completion(st.session_state.openai_client, st.session_state.job_data, IDENTIFY_DETAILS_FROM_JOB_PROMPT, IDENTIFY_DETAILS_FROM_JOB_MODEL)
-            #llama_response = await run_llama_prompt(st.session_state.job_data, IDENTIFY_DETAILS_FROM_JOB_PROMPT, IDENTIFY_DETAILS_FROM_JOB_MODEL)
-            #llama_response_str = json.dumps(st.session_state["llama_response"])
-            
 
-            ## Prompting llm using groq api for job description summarization
-            #summary_response = await summarize_job_description(SUMMARY_PROMPT, llama_response, SUMMARIZE_JOB_DESCRIPTION_MODEL)
-            st.session_state["summary_response"] = await run_openai_chat_completion(st.session_state.openai_client, st.session_state["llama_response"], SUMMARY_PROMPT, SUMMARIZE_JOB_DESCRIPTION_MODEL)
-
-            with st.expander("View Summary"):
-                st.write(st.session_state["summary_response"])
-
-        
-            await generate_resume_summary()
-
-            if select_all_state:
-
-                await generate_suggestions_cover_letter()
-
-                await generate_reach_out_messages()
-            
-            elif st.session_state["reach_out"]:
+                with st.expander("View Job Description"):
+                    st.write(st.session_state["job_description"])
 
-                await generate_reach_out_messages()
+                # Prompting llm using groq api for llama to identify details from a job description
+                #job_data_prompt = json.dumps(job_data)
+                # Fields the local parser fills with confidence are not asked from the model
+                with telemetry_stage("identify_details"):
+                    st.session_state["llama_response"], _, _ = await identify_job_details(st.session_state.openai_client, st.session_state.job_data)
+                #st.session_state["llama_response"] = await run_openai_chat_completion(st.session_state.openai_client, st.session_state.job_data, IDENTIFY_DETAILS_FROM_JOB_PROMPT, IDENTIFY_DETAILS_FROM_JOB_MODEL)
+                #llama_response = await run_llama_prompt(st.session_state.job_data, IDENTIFY_DETAILS_FROM_JOB_PROMPT, IDENTIFY_DETAILS_FROM_JOB_MODEL)
+                #llama_response_str = json.dumps(st.session_state["llama_response"])
             
-            else: 
 
-                await generate_suggestions_cover_letter()
+                # Summary, resume summary, matching, suggestions, cover letter and outreach run as a dependency graph
+                include_suggestions = select_all_state or not st.session_state["reach_out"]
+                include_reach_out = select_all_state or st.session_state["reach_out"]
+                await run_analysis_pipeline(st.session_state, StreamlitAnalysisView(), include_suggestions, include_reach_out)
+
+            # Per stage time, tokens and cost of this run, from the metrics store
+            summary = summarize_metrics(run_id=run_id)
+            if not summary.empty:
+                st.expander("Run metrics").dataframe(summary)
+            if TRACE_ENABLED:
+                trace.write()
+                show_trace_waterfall(trace)
+            if PROFILE_MODE:
+                write_profiles()
 
         else:
             st.error("Please upload at least one resume and provide a job URL before submitting.")
@@ -1,16 +1,28 @@
-from credentials import SUPABASE_URL, SUPABASE_KEY
-from supabase import create_client, Client
+from supabase import Client
+from postgrest.exceptions import APIError
+from client_registry import get_supabase_client
 import asyncio
+import httpx
 from itertools import islice
 import pandas as pd
 import streamlit as st
+import json
+import random
+from rate_limiter import TokenBucket
+from telemetry import track_call
+from embedding_codec import decode_embedding_columns
+from configuration import SUPABASE_INSERT_MAX_BATCH_BYTES, SUPABASE_INSERT_MAX_CONCURRENCY, SUPABASE_INSERT_MAX_RETRIES, SUPABASE_REQUESTS_PER_SECOND, SUPABASE_RETRY_BASE_DELAY
 
 # Initialize the client
 async def create_supabase_connection():
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("Supabase connection created: ", supabase)
+    # Reuse the process-wide client instead of reconnecting on every rerun
+    supabase: Client = get_supabase_client()
     return supabase
 
+async def execute_query(query):
+    # The Supabase client is synchronous, run its requests off the event loop so other tasks keep going
+    return await asyncio.to_thread(query.execute)
+
 # Function to split the data into batches of a specific size
 def chunk_data(data, batch_size):
     """Yield successive batch_size chunks from data."""
@@ -19,40 +31,185 @@ def chunk_data(data, batch_size):
         yield [first] + list(islice(it, batch_size - 1))
 
 
+# Function to split the data into batches that stay under a row count and a JSON payload size
+def chunk_data_by_size(data, batch_size, max_batch_bytes=SUPABASE_INSERT_MAX_BATCH_BYTES):
+    """Yield batches of at most batch_size rows and about max_batch_bytes of JSON each."""
+    batch, batch_bytes = [], 0
+    for row in data:
+        row_bytes = len(json.dumps(row, default=str))
+        if batch and (len(batch) >= batch_size or batch_bytes + row_bytes > max_batch_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(row)
+        batch_bytes += row_bytes
+    if batch:
+        yield batch
+
+# One request budget for the whole process, shared by every insert
+supabase_rate_limiter = TokenBucket(SUPABASE_REQUESTS_PER_SECOND)
+
+# Postgres error classes after which the transaction was rolled back and may simply run again:
+# connection exceptions, serialization failures and deadlocks, insufficient resources, operator intervention
+ROLLED_BACK_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+# Gateway statuses after which the write may or may not have been committed
+UNCERTAIN_HTTP_STATUSES = {"408", "500", "502", "503", "504"}
+
+def is_retryable_write_error(error, idempotent):
+    """
+    Whether a failed write should be sent again.
+
+    Failures before the request reached the database, rate limiting and rolled back transactions
+    are always retried. Timeouts and gateway errors, after which the rows may have landed anyway,
+    are only retried for idempotent writes (upserts), a plain insert would store them twice.
+    Anything else, such as rows the table rejects, fails the same way every time and is not retried.
+
+    Args:
+    - error (Exception): What the write raised.
+    - idempotent (bool): Whether sending the same write twice leaves the table as sending it once.
+
+    Returns:
+    - bool: True if the write should be retried.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if isinstance(error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return idempotent
+    if isinstance(error, APIError):
+        # PostgREST reports the SQLSTATE of database errors, and the HTTP status when the body was not JSON
+        code = str(error.code or "")
+        if code == "429" or (len(code) == 5 and code.startswith(ROLLED_BACK_SQLSTATE_CLASSES)):
+            return True
+        if code in UNCERTAIN_HTTP_STATUSES:
+            return idempotent
+    return False
+
 # Function to insert data in batches asynchronously
-async def insert_data_into_table(supabase, table_name, job_data_json, batch_size=100):
+async def insert_data_into_table(supabase, table_name, job_data_json, batch_size=100, upsert_on=None, max_concurrency=SUPABASE_INSERT_MAX_CONCURRENCY, max_retries=SUPABASE_INSERT_MAX_RETRIES):
+    """
+    Insert rows in concurrent batches, rate limited and retried with exponential backoff.
+
+    Only transient failures are retried, see is_retryable_write_error. Plain inserts are not retried
+    after a timeout or gateway error, since the batch may have been stored already; pass upsert_on
+    to make those retries safe.
+
+    Args:
+    - supabase: The Supabase client.
+    - table_name (str): Table to insert into.
+    - job_data_json (list): Rows to insert, as dictionaries.
+    - batch_size (int): Maximum rows per batch, batches are also capped by payload size.
+    - upsert_on (str): Optional unique column(s); when set rows are upserted, so retries and reruns are idempotent.
+    - max_concurrency (int): Batches in flight at the same time.
+    - max_retries (int): Retries per batch before giving up.
+
+    Returns:
+    - list: Rows as returned by the database, including generated ids.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def send_batch(batch_number, batch):
+        async with semaphore, track_call("database", "supabase", None) as record:
+            for attempt in range(max_retries + 1):
+                record.retries = attempt
+                await supabase_rate_limiter.acquire()
+                try:
+                    query = supabase.table(table_name)
+                    query = query.upsert(batch, on_conflict=upsert_on) if upsert_on else query.insert(batch)
+                    response = await execute_query(query)
+                    print(f"Inserted batch {batch_number} into table: {table_name}")
+                    print(f"Batch size: {len(batch)}")
+                    return response.data or []
+                except Exception as e:
+                    if attempt == max_retries or not is_retryable_write_error(e, idempotent=bool(upsert_on)):
+                        raise
+                    # Exponential backoff with jitter so retries from parallel batches spread out
+                    delay = SUPABASE_RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random())
+                    print(f"Batch {batch_number} failed ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
     try:
-        # Split the data into batches
-        for batch in chunk_data(job_data_json, batch_size):
-            # Perform the batch insertion
-            response = supabase.table(table_name).insert(batch).execute()
-            print(f"Inserted batch into table: {table_name}")
-            print(f"Batch size: {len(batch)}")
-            # Optional: Handle or log the response
-            # print(f"Response: {response}")
-            await asyncio.sleep(0.5)  # Small delay to prevent overwhelming the API
+        batches = list(chunk_data_by_size(job_data_json, batch_size))
+        results = await asyncio.gather(*(send_batch(batch_number, batch) for batch_number, batch in enumerate(batches)))
         print("All data inserted successfully!")
+        return [row for rows in results for row in rows]  # Rows as returned by the database, including generated ids
     except Exception as e:
         print(f"Error during insertion: {e}")
         raise
 
-# Fetch information from the database  
-async def fetch_data_from_table(supabase, table_name):
+# Supabase query builder methods for the filter operators accepted by fetch_data_from_table
+FILTER_OPERATORS = {
+    "eq": "eq", "neq": "neq", "gt": "gt", "gte": "gte", "lt": "lt", "lte": "lte",
+    "like": "like", "ilike": "ilike", "in": "in_", "is": "is_",
+}
+
+def apply_filters(query, filters):
+    """
+    Apply column filters to a Supabase query.
+
+    filters maps a column to a value (equality) or to an (operator, value) tuple,
+    e.g. {"category": "Project", "resume_name": ("in", ["A", "B"])}.
+    """
+    for column, condition in (filters or {}).items():
+        operator, value = condition if isinstance(condition, tuple) else ("eq", condition)
+        query = getattr(query, FILTER_OPERATORS[operator])(column, value)
+    return query
+
+async def iter_table_chunks(supabase, table_name, columns="*", filters=None, page_size=1000, key_column="id"):
+    """
+    Stream a table as DataFrame chunks using keyset pagination on key_column.
+
+    Each page asks for the rows whose key is greater than the last key seen, so key_column must be
+    unique, non-null and sortable (a primary key such as "id"). Rows sharing a key across a page
+    boundary would be skipped, so a page whose keys are missing or not strictly increasing raises.
+
+    Args:
+    - supabase: The Supabase client.
+    - table_name (str): Table to read.
+    - columns (str or list): Columns to select (default is all columns).
+    - filters (dict): Column filters, see apply_filters.
+    - page_size (int): Rows per request.
+    - key_column (str): Unique, ordered column used to page through the table.
+
+    Yields:
+    - pd.DataFrame: Up to page_size rows at a time, embedding columns decoded to float32 arrays.
+    """
+    if not isinstance(columns, str):
+        # The key column is needed to request the next page
+        columns = ",".join(columns if key_column in columns else [key_column, *columns])
+
+    last_key = None
+    while True:
+        query = apply_filters(supabase.table(table_name).select(columns), filters)
+        if last_key is not None:
+            query = query.gt(key_column, last_key)
+        response = await execute_query(query.order(key_column).limit(page_size))
+
+        rows = response.data
+        if not rows:
+            break
+        keys = [row.get(key_column) for row in rows]
+        if any(key is None for key in keys):
+            raise ValueError(f"Cannot page through {table_name}: rows have no {key_column} (select it, or pass a key_column the table has)")
+        if any(current <= previous for previous, current in zip(keys, keys[1:])):
+            raise ValueError(f"Cannot page through {table_name}: {key_column} is not unique, pass a unique key_column")
+        yield decode_embedding_columns(pd.DataFrame(rows))
+
+        if len(rows) < page_size:
+            break
+        last_key = keys[-1]
+
+# Fetch information from the database
+async def fetch_data_from_table(supabase, table_name, columns="*", filters=None, page_size=1000, key_column="id"):
     print(f"Fetching data from table: {table_name}")
-    
-    # Execute the query
-    response = supabase.table(table_name).select('*').execute()
-    print(f"Response is: {response}")
-    
-    # Extract the data from the response
-    data = response.data
-    
+
+    # Read the table page by page (Supabase caps the rows returned by a single request)
+    chunks = [chunk async for chunk in iter_table_chunks(supabase, table_name, columns, filters, page_size, key_column)]
+
     # Check if data is not empty
-    if data:
+    if chunks:
         # Create a DataFrame from the fetched data
-        df = pd.DataFrame(data)
+        df = pd.concat(chunks, ignore_index=True)
+        print(f"Fetched {len(df)} rows from {table_name}")
         return df
     else:
         print("No data found.")
         return pd.DataFrame()  # Return an empty DataFrame if no data
-
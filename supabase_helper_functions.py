@@ -1,5 +1,6 @@
 import pandas as pd
 import streamlit as st
+from embedding_codec import encode_embedding
 
 def prepare_data_resume(df: pd.DataFrame):
     # Initialize a list to hold all the prepared data for each row
@@ -11,7 +12,7 @@ def prepare_data_resume(df: pd.DataFrame):
         data = {
             "resume_name": row_data.get("resume_name", None),   # Extract submission_id
             "resume_text": row_data.get("resume_text", None),  # Handle embedding for summary
-            "resume_embedding": row_data.get("resume_embedding", None)   # Extract the summary from the DataFrame
+            "resume_embedding": encode_embedding(row_data.get("resume_embedding", None))   # Extract the summary from the DataFrame
         }
 
         # Append the prepared data for this row to the list
@@ -50,7 +51,7 @@ def prepare_data_job_description(df: pd.DataFrame):
             "company_values": row_data.get("company_values", []),
             "benefits": row_data.get("benefits", []),
             "soft_skills": row_data.get("soft_skills", []),
-            "job_description_embeddings": row_data.get("job_description_embeddings", None),
+            "job_description_embeddings": encode_embedding(row_data.get("job_description_embeddings", None)),
             "job_description": row_data.get("job_description", None),
             "sponsorship": row_data.get("sponsorship", None)
         }
@@ -72,7 +73,7 @@ def prepare_data_rag(df: pd.DataFrame):
             "category": row_data.get("category", None),   # Extract submission_id
             "title": row_data.get("title", None),  # Handle embedding for summary
             "text": row_data.get("text", None),   # Extract the summary from the DataFrame
-            "text_embedding": row_data.get("text_embedding", None)   # Extract the summary from the DataFrame
+            "text_embedding": encode_embedding(row_data.get("text_embedding", None))   # Extract the summary from the DataFrame
         }
 
         # Append the prepared data for this row to the list
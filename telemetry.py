@@ -0,0 +1,264 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+import pandas as pd
+from helper_functions import PRICING, USAGE_PRICING
+from tracing import span
+from configuration import METRICS_ENABLED, METRICS_PATH
+
+# Pipeline stage and Analyze run the current task belongs to, asyncio tasks inherit them
+current_stage = contextvars.ContextVar("current_stage", default=None)
+current_run = contextvars.ContextVar("current_run", default=None)
+# The call being measured, so the wrappers deep inside it can report token usage
+current_call = contextvars.ContextVar("current_call", default=None)
+
+
+def model_price(model):
+    """
+    Price per token of a model, matching dated names such as gpt-4o-mini-2024-07-18 to their base entry.
+
+    Returns:
+    - dict: {"input": ..., "output": ...} in dollars per token, or None for unknown models.
+    """
+    prices = {**PRICING, **USAGE_PRICING}
+    if model in prices:
+        return prices[model]
+    prefixes = [name for name in prices if model and model.startswith(name)]
+    return prices[max(prefixes, key=len)] if prefixes else None
+
+
+class CallRecord:
+    """
+    Measurements of one call: wall time, time to first token, token usage, cache hits and retries.
+    """
+
+    def __init__(self, kind, provider, model):
+        self.kind = kind
+        self.provider = provider
+        self.model = model
+        self.stage = current_stage.get()
+        self.run_id = current_run.get()
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.ttft = None
+        self.input_tokens = None
+        self.output_tokens = None
+        self.cache_hit = False
+        self.coalesced = False
+        # Only counted where the retries are ours (Supabase writes), the SDKs retry LLM and embedding calls unseen
+        self.retries = None
+        self.error = None
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self._start
+
+    def add_usage(self, input_tokens=None, output_tokens=None):
+        # Usage is added up, batched embedding requests report it once per batch
+        if input_tokens is not None:
+            self.input_tokens = (self.input_tokens or 0) + int(input_tokens)
+        if output_tokens is not None:
+            self.output_tokens = (self.output_tokens or 0) + int(output_tokens)
+
+    def to_dict(self):
+        price = model_price(self.model)
+        cost = None
+        if price is not None and not self.cache_hit and not self.coalesced:
+            cost = (self.input_tokens or 0) * price["input"] + (self.output_tokens or 0) * price["output"]
+        return {
+            "time": self.started,
+            "run_id": self.run_id,
+            "stage": self.stage,
+            "kind": self.kind,
+            "provider": self.provider,
+            "model": self.model,
+            "wall_time_s": time.perf_counter() - self._start,
+            "ttft_s": self.ttft,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_hit": self.cache_hit,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "cost_usd": 0.0 if self.cache_hit or self.coalesced else cost,
+            "error": self.error,
+        }
+
+
+def record_usage(usage):
+    """
+    Add the token usage an SDK returned to the call being measured, if any.
+
+    Understands OpenAI / LiteLLM usage (prompt_tokens, completion_tokens), Anthropic usage and
+    LangChain usage_metadata (input_tokens, output_tokens), as objects or dictionaries.
+    """
+    record = current_call.get()
+    if record is None or usage is None:
+        return
+
+    def field(*names):
+        for name in names:
+            value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+            if value is not None:
+                return value
+        return None
+
+    record.add_usage(field("prompt_tokens", "input_tokens"), field("completion_tokens", "output_tokens"))
+
+
+class MetricsStore:
+    """
+    Append-only JSON lines file of call records.
+
+    Records are queued and written by one background thread, so the calls they describe never wait
+    on the disk. read() and flush() wait until every queued record is written.
+    """
+
+    def __init__(self, path=METRICS_PATH):
+        # Absolute, queued records still go to the same file if the working directory changes
+        self.path = os.path.abspath(path)
+        self._queue = queue.Queue()
+        self._writer = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def append(self, entry):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_queued, name="metrics-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        self._queue.put(entry)
+
+    def _write_queued(self):
+        while True:
+            entries = [self._queue.get()]
+            # Everything queued meanwhile goes out in the same write, a single writer never interleaves lines
+            while True:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a") as metrics_file:
+                    metrics_file.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            except OSError as e:
+                # Metrics are best effort, a full disk must not fail the calls they describe
+                print(f"Could not write metrics: {e}")
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+    def flush(self):
+        self._queue.join()
+
+    def read(self):
+        self.flush()
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        return pd.read_json(self.path, lines=True, convert_dates=False)
+
+
+_metrics_store = None
+_metrics_store_lock = threading.Lock()
+
+def get_metrics_store():
+    # One store per process, shared by every Streamlit session and rerun
+    global _metrics_store
+    with _metrics_store_lock:
+        if _metrics_store is None:
+            _metrics_store = MetricsStore()
+        return _metrics_store
+
+def write_record(record):
+    # Only queues the record, the file is written off the event loop
+    if METRICS_ENABLED:
+        get_metrics_store().append(record.to_dict())
+
+@asynccontextmanager
+async def track_call(kind, provider, model):
+    """
+    Measure a call and append its record to the metrics store when it finishes.
+
+    Usage:
+        async with track_call("llm", "openai", model) as record:
+            ...
+            record_usage(response.usage)
+    """
+    record = CallRecord(kind, provider, model)
+    token = current_call.set(record)
+    # Stages already have their span from telemetry_stage, calls get one of their own in the trace
+    with span(f"{kind}:{provider}", kind=kind, model=model) if kind != "stage" else nullcontext() as call_span:
+        try:
+            yield record
+        except BaseException as e:
+            record.error = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            current_call.reset(token)
+            if call_span is not None:
+                call_span.attributes.update(cache_hit=record.cache_hit, coalesced=record.coalesced, retries=record.retries,
+                                            input_tokens=record.input_tokens, output_tokens=record.output_tokens)
+            write_record(record)
+
+@contextmanager
+def telemetry_stage(name):
+    # Every call made inside the block (and in tasks started from it) is attributed to this stage, and traced under its span
+    token = current_stage.set(name)
+    try:
+        with span(name, kind="stage"):
+            yield
+    finally:
+        current_stage.reset(token)
+
+@contextmanager
+def telemetry_run(run_id=None):
+    # Groups the calls of one Analyze click, so its summary can be shown on its own
+    run_id = run_id or uuid.uuid4().hex
+    token = current_run.set(run_id)
+    try:
+        yield run_id
+    finally:
+        current_run.reset(token)
+
+def summarize_metrics(metrics=None, run_id=None):
+    """
+    Summary of the recorded calls per pipeline stage and kind of call.
+
+    Args:
+    - metrics (pd.DataFrame): Records to summarize, read from the metrics store when None.
+    - run_id (str): Only summarize the calls of this run.
+
+    Returns:
+    - pd.DataFrame: Per stage and kind: calls, cache hits, coalesced calls, errors, total and p50/p95 wall
+      time, p50 time to first token, tokens, retries (where counted) and cost.
+    """
+    metrics = get_metrics_store().read() if metrics is None else metrics
+    if metrics.empty:
+        return pd.DataFrame()
+    if run_id is not None:
+        metrics = metrics[metrics["run_id"] == run_id]
+    metrics = metrics.assign(stage=metrics["stage"].fillna("(none)"))
+
+    grouped = metrics.groupby(["stage", "kind"])
+    summary = pd.DataFrame({
+        "calls": grouped.size(),
+        "cache_hits": grouped["cache_hit"].sum(),
+        "coalesced": grouped["coalesced"].sum(),
+        "errors": grouped["error"].count(),
+        "wall_time_total_s": grouped["wall_time_s"].sum(),
+        "wall_time_p50_s": grouped["wall_time_s"].median(),
+        "wall_time_p95_s": grouped["wall_time_s"].quantile(0.95),
+        "ttft_p50_s": grouped["ttft_s"].median(),
+        "input_tokens": grouped["input_tokens"].sum(),
+        "output_tokens": grouped["output_tokens"].sum(),
+        # Empty where no call of the group counts its retries, rather than a zero nobody measured
+        "retries": grouped["retries"].sum(min_count=1),
+        "cost_usd": grouped["cost_usd"].sum(),
+    })
+    return summary.reset_index().sort_values("wall_time_total_s", ascending=False, ignore_index=True)
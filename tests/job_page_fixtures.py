@@ -0,0 +1,45 @@
+import json
+import os
+from site_adapters import DESCRIPTION_KEY, extract_with_adapters
+
+# Saved job pages, shared with the benchmark suite
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "job_pages")
+
+
+def fixture_names(fixtures_dir=FIXTURES_DIR):
+    # Every <name>.json in the fixtures folder describes the page saved as <name>.html
+    return sorted(os.path.splitext(file_name)[0] for file_name in os.listdir(fixtures_dir) if file_name.endswith(".json"))
+
+def load_fixture(fixture, fixtures_dir=FIXTURES_DIR):
+    """
+    A saved job page and what the adapters are expected to extract from it.
+
+    Returns:
+    - tuple: (expected, html). expected holds the page "url", the expected "adapter", the expected
+      "job_details" and a "description_contains" snippet.
+    """
+    with open(os.path.join(fixtures_dir, fixture + ".json")) as expected_file:
+        expected = json.load(expected_file)
+    with open(os.path.join(fixtures_dir, fixture + ".html")) as html_file:
+        html = html_file.read()
+    return expected, html
+
+def fixture_problems(fixture, fixtures_dir=FIXTURES_DIR):
+    """
+    Run the adapters over one saved page and compare with the expected output.
+
+    Returns:
+    - list: A description of every mismatch, empty when the fixture passes.
+    """
+    expected, html = load_fixture(fixture, fixtures_dir)
+    job_description, job_details, adapter_name = extract_with_adapters(expected["url"], html)
+    if adapter_name != expected["adapter"]:
+        return [f"extracted by {adapter_name}, expected {expected['adapter']}"]
+
+    problems = []
+    if expected["description_contains"] not in job_description[0][DESCRIPTION_KEY]:
+        problems.append("description does not contain the expected text")
+    for key, value in expected["job_details"].items():
+        if job_details[0].get(key) != value:
+            problems.append(f"{key!r} is {job_details[0].get(key)!r}, expected {value!r}")
+    return problems
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("crawl4ai")
+from crawler_pool import CrawlerPool
+
+
+class ScriptedCrawler:
+    """
+    Stands in for AsyncWebCrawler, answering each crawl with the next scripted success flag.
+    """
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+    async def arun(self, url, **kwargs):
+        return SimpleNamespace(url=url, success=self.outcomes.pop(0))
+
+
+def test_failed_crawl_recycles_the_browser():
+    outcomes = [True, False, True]
+    crawlers = []
+
+    def factory():
+        crawlers.append(ScriptedCrawler(outcomes))
+        return crawlers[-1]
+
+    pool = CrawlerPool(size=1, crawler_factory=factory)
+    try:
+        async def crawl_three():
+            return [await pool.arun(f"https://example.com/{page}") for page in range(3)]
+
+        results = asyncio.run(crawl_three())
+    finally:
+        pool.close()
+
+    assert [result.success for result in results] == [True, False, True]
+    # The browser that returned the failed result was closed, the third crawl got a new one
+    assert len(crawlers) == 2
+    assert crawlers[0].closed
+    assert pool.stats()["recycled"] == 1
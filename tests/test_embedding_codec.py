@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from embedding_codec import decode_embedding_column, decode_embedding_columns, encode_embedding
+
+
+@pytest.mark.parametrize("storage_format", ["json", "float32", "float16"])
+def test_column_round_trip(storage_format):
+    vectors = np.random.default_rng(0).normal(size=(5, 8)).astype(np.float32)
+
+    matrix = decode_embedding_column([encode_embedding(vector, storage_format) for vector in vectors])
+
+    assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(matrix, vectors, rtol=1e-3 if storage_format == "float16" else 1e-6)
+
+@pytest.mark.parametrize("storage_format", ["json", "float32"])
+def test_null_rows_are_masked(storage_format):
+    vectors = [[1.0, 0.0, 2.0], None, [0.5, 0.5, 0.5], float("nan")]
+    values = [encode_embedding(vector, storage_format) if isinstance(vector, list) else vector for vector in vectors]
+
+    matrix, valid = decode_embedding_column(values, with_mask=True)
+
+    assert valid.tolist() == [True, False, True, False]
+    np.testing.assert_array_equal(matrix, [[1.0, 0.0, 2.0], [0, 0, 0], [0.5, 0.5, 0.5], [0, 0, 0]])
+
+def test_null_row_keeps_the_rest_of_the_table():
+    table = pd.DataFrame({
+        "id": [1, 2],
+        "job_description_embeddings": [encode_embedding([1.0, 2.0], "float32"), None],
+    })
+
+    decoded = decode_embedding_columns(table)
+
+    np.testing.assert_array_equal(decoded["job_description_embeddings"][0], [1.0, 2.0])
+    assert decoded["job_description_embeddings"][1] is None
+
+def test_all_null_column():
+    matrix, valid = decode_embedding_column([None, None], with_mask=True)
+
+    assert matrix.shape == (2, 0)
+    assert not valid.any()
@@ -0,0 +1,19 @@
+import asyncio
+import llm_concurrency
+from llm_concurrency import call_llm
+
+
+def test_contended_calls_from_successive_loops(monkeypatch):
+    monkeypatch.setattr(llm_concurrency, "_semaphores", {})
+    monkeypatch.setitem(llm_concurrency.LLM_MAX_CONCURRENT_REQUESTS, "groq", 1)
+
+    async def request(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    async def burst():
+        return await asyncio.gather(*(call_llm("groq", None, request, value=number) for number in range(5)))
+
+    # Every Streamlit rerun runs in a fresh loop, the shared semaphore must work from each of them
+    assert asyncio.run(burst()) == list(range(5))
+    assert asyncio.run(burst()) == list(range(5))
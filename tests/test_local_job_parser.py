@@ -0,0 +1,63 @@
+import asyncio
+import json
+import pytest
+import local_job_parser
+from configuration import JOB_PARSER_CONFIDENCE_THRESHOLD
+from local_job_parser import JOB_FIELDS, identify_job_details
+from site_adapters import extract_with_adapters
+from job_page_fixtures import load_fixture
+
+
+def fixture_job_data(fixture):
+    # The JSON the Streamlit flow and bulk ingestion build from a scraped page
+    expected, html = load_fixture(fixture)
+    job_description, job_details, _ = extract_with_adapters(expected["url"], html)
+    return json.dumps({"job_description": job_description, "job_details": job_details})
+
+@pytest.fixture
+def model_prompts(monkeypatch):
+    prompts = []
+
+    async def fake_completion(client, job_data, system_prompt, model, *args, **kwargs):
+        prompts.append(system_prompt)
+        return "{}"
+
+    monkeypatch.setattr(local_job_parser, "run_openai_chat_completion", fake_completion)
+    return prompts
+
+def test_structured_posting_fills_the_core_fields_locally():
+    fields = local_job_parser.parse_job_fields(fixture_job_data("greenhouse_ml_engineer"))
+
+    assert list(fields) == JOB_FIELDS
+    assert fields["Company name"][0] == "Northwind Robotics"
+    assert fields["Required skills"][0] == ["3+ years of experience with PyTorch.", "Familiarity with ONNX or TensorRT."]
+    assert fields["Job role classifications"][0] == ["Machine Learning Engineer"]
+    assert min(fields[field][1] for field in ["Company name", "Position name", "Location", "Required skills"]) >= JOB_PARSER_CONFIDENCE_THRESHOLD
+
+def test_fields_found_nowhere_are_asked_from_the_model(model_prompts):
+    _, _, missing = asyncio.run(identify_job_details(None, fixture_job_data("careers_page_backend_engineer")))
+
+    assert len(model_prompts) == 1
+    # Descriptive fields the parser found nothing for still go to the model, the generations downstream use them
+    assert {"Benefits", "Preferred skills", "Soft skills"} <= set(missing)
+    assert "Company description" not in missing
+    assert json.dumps(missing) in model_prompts[0]
+
+def test_skipped_fields_are_never_asked(model_prompts):
+    job_data = fixture_job_data("greenhouse_ml_engineer")
+    _, _, missing = asyncio.run(identify_job_details(None, job_data))
+
+    response, _, skipped_missing = asyncio.run(identify_job_details(None, job_data, skipped_fields=missing))
+
+    assert skipped_missing == []
+    assert len(model_prompts) == 1
+    assert list(json.loads(response)) == JOB_FIELDS
+
+def test_optional_fields_keep_what_the_text_states():
+    fields = local_job_parser.parse_job_fields(fixture_job_data("careers_page_backend_engineer"))
+
+    assert fields["Company description"][0].startswith("Bluebird Health connects patients")
+    assert fields["Team description"][0].startswith("Our backend team owns")
+    assert fields["Bonus experience"][0] == "Experience in healthcare is welcome but not required."
+    value, confidence = fields["Hiring Manager"]
+    assert value is None and confidence < JOB_PARSER_CONFIDENCE_THRESHOLD
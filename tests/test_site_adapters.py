@@ -0,0 +1,75 @@
+import json
+import pytest
+from site_adapters import DESCRIPTION_KEY, GlassdoorCssAdapter, JsonLdJobPostingAdapter, ReadabilityAdapter, extract_with_adapters
+from job_page_fixtures import fixture_names, fixture_problems, load_fixture
+
+
+@pytest.mark.parametrize("fixture", fixture_names())
+def test_fixture_page_extracts_as_expected(fixture):
+    expected, _ = load_fixture(fixture)
+    if expected["adapter"] == GlassdoorCssAdapter.name:
+        # The Glassdoor schemas run through crawl4ai, the other adapters need only BeautifulSoup
+        pytest.importorskip("crawl4ai")
+
+    assert fixture_problems(fixture) == []
+
+def test_fixtures_cover_the_offline_adapters():
+    adapters = {load_fixture(fixture)[0]["adapter"] for fixture in fixture_names()}
+
+    assert {JsonLdJobPostingAdapter.name, ReadabilityAdapter.name} <= adapters
+
+def job_posting_page(posting):
+    return f'<html><head><script type="application/ld+json">{json.dumps(posting)}</script></head><body></body></html>'
+
+def test_json_ld_escaped_description_and_remote_location():
+    html = job_posting_page([{
+        "@type": ["JobPosting"],
+        "title": "  Data   Engineer ",
+        "description": "&lt;p&gt;Build pipelines.&lt;/p&gt;&lt;ul&gt;&lt;li&gt;Spark&lt;/li&gt;&lt;/ul&gt;",
+        "hiringOrganization": "Contoso",
+        "jobLocationType": "TELECOMMUTE",
+    }])
+
+    job_description, job_details, adapter_name = extract_with_adapters("https://jobs.example.com/1", html)
+
+    assert adapter_name == JsonLdJobPostingAdapter.name
+    assert job_description == [{DESCRIPTION_KEY: "Build pipelines.\nSpark"}]
+    assert job_details == [{"company name": "Contoso", "Job role": "Data Engineer", "company rating": None, "Job Location": "Remote"}]
+
+def test_json_ld_without_description_falls_through():
+    html = job_posting_page({"@type": "JobPosting", "title": "Data Engineer"})
+
+    assert JsonLdJobPostingAdapter().extract("https://jobs.example.com/1", html) is None
+
+def test_readability_ignores_short_pages():
+    html = "<html><body><h1>Data Engineer</h1><div><p>Apply now.</p></div></body></html>"
+
+    assert ReadabilityAdapter().extract("https://jobs.example.com/1", html) is None
+    assert extract_with_adapters("https://jobs.example.com/1", html) == (None, None, None)
+
+def long_page(heading, paragraphs):
+    body = "".join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+    return f"<html><body><h1>{heading}</h1><div>{body}</div></body></html>"
+
+def test_readability_skips_login_walls():
+    html = long_page("Sign in to see this job", [
+        "Join millions of professionals who use our network to find the right role and grow their career. " * 3,
+        "Members get personalised recommendations, salary insights and the experience of others on the team. " * 3,
+    ])
+
+    assert ReadabilityAdapter().extract("https://jobs.example.com/1", html) is None
+
+def test_readability_skips_pages_without_job_text():
+    html = long_page("Checking your browser", [
+        "This process is automatic. Your browser will redirect to the requested content shortly. " * 4,
+        "Please allow up to five seconds while we make sure the connection is secure. " * 4,
+    ])
+
+    assert ReadabilityAdapter().extract("https://jobs.example.com/1", html) is None
+
+def test_site_specific_adapters_only_match_their_domains():
+    adapter = GlassdoorCssAdapter()
+
+    assert adapter.matches("https://www.glassdoor.co.uk/job-listing/x.htm")
+    assert not adapter.matches("https://notglassdoor.com/job-listing/x.htm")
+    assert ReadabilityAdapter().matches("https://anything.example.com")
@@ -0,0 +1,38 @@
+from sqlite_lru_store import SqliteLruStore
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    store = SqliteLruStore(str(tmp_path / "store.db"), "entries", max_bytes=10)
+    store.put("a", "aaaa")
+    store.put("b", "bbbb")
+    store.get("a")
+
+    store.put("c", "cccc")
+
+    assert store.get_many(["a", "b", "c"]) == {"a": "aaaa", "c": "cccc"}
+    assert store.stats()["evictions"] == 1
+
+def test_max_age_skips_without_removing(tmp_path):
+    store = SqliteLruStore(str(tmp_path / "store.db"), "entries", max_bytes=100)
+    store.put("a", b"\x00\x01")
+
+    assert store.get("a", max_age_seconds=0) is None
+    assert store.get("a") == b"\x00\x01"
+    assert store.stats()["entries"] == 1
+
+def test_expired_entries_are_removed(tmp_path):
+    store = SqliteLruStore(str(tmp_path / "store.db"), "entries", max_bytes=100, ttl_seconds=-1)
+    store.put("a", "value")
+
+    assert store.get("a") is None
+    assert store.stats()["entries"] == 0
+
+def test_older_layout_is_replaced(tmp_path):
+    path = str(tmp_path / "store.db")
+    SqliteLruStore(path, "entries", max_bytes=100).put("a", "value")
+
+    store = SqliteLruStore(path, "entries", max_bytes=100, metadata_columns=("url",))
+
+    assert store.get("a") is None
+    store.put("a", "value", "https://example.com")
+    assert store.get("a") == "value"
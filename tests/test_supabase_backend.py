@@ -0,0 +1,168 @@
+import asyncio
+import httpx
+import pandas as pd
+import pytest
+from postgrest.exceptions import APIError
+import supabase_backend
+from supabase_backend import fetch_data_from_table, insert_data_into_table, iter_table_chunks
+
+
+class FakeQuery:
+    """
+    The part of the PostgREST query builder iter_table_chunks uses, answered from a list of rows.
+    """
+
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+        self.columns = None
+        self.conditions = []
+        self.order_column = None
+        self.row_limit = None
+
+    def select(self, columns):
+        self.columns = columns
+        return self
+
+    def eq(self, column, value):
+        self.conditions.append(lambda row: row[column] == value)
+        return self
+
+    def gt(self, column, value):
+        self.conditions.append(lambda row: row[column] > value)
+        return self
+
+    def order(self, column):
+        self.order_column = column
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def execute(self):
+        self.client.requests += 1
+        rows = [row for row in self.rows if all(condition(row) for condition in self.conditions)]
+        if self.order_column:
+            rows.sort(key=lambda row: row[self.order_column])
+        if self.columns != "*":
+            rows = [{column: row[column] for column in self.columns.split(",")} for row in rows]
+        return type("Response", (), {"data": rows[:self.row_limit]})()
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.requests = 0
+
+    def table(self, table_name):
+        return FakeQuery(self, self.rows)
+
+
+def rows(count):
+    return [{"id": number, "category": "Project" if number % 2 else "Skill", "text": f"Text {number}"} for number in range(1, count + 1)]
+
+def collect(supabase, **kwargs):
+    async def run():
+        return [chunk async for chunk in iter_table_chunks(supabase, "extra_info", **kwargs)]
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("count, page_size, expected_requests", [
+    (10, 3, 4),   # last page partly filled
+    (9, 3, 4),    # last page exactly full, one more request finds nothing
+    (2, 3, 1),
+])
+def test_pages_cover_every_row_once(count, page_size, expected_requests):
+    supabase = FakeSupabase(list(reversed(rows(count))))
+
+    chunks = collect(supabase, page_size=page_size)
+
+    assert [len(chunk) for chunk in chunks] == [min(page_size, count - start) for start in range(0, count, page_size)]
+    assert pd.concat(chunks)["id"].tolist() == list(range(1, count + 1))
+    assert supabase.requests == expected_requests
+
+def test_empty_table():
+    supabase = FakeSupabase([])
+
+    assert collect(supabase) == []
+    assert supabase.requests == 1
+    assert asyncio.run(fetch_data_from_table(supabase, "extra_info")).empty
+
+def test_filters_and_projection_keep_the_key_column():
+    chunks = collect(FakeSupabase(rows(10)), columns=["text"], filters={"category": "Project"}, page_size=2)
+
+    table = pd.concat(chunks)
+    assert table.columns.tolist() == ["id", "text"]
+    assert table["id"].tolist() == [1, 3, 5, 7, 9]
+
+def test_non_unique_key_column_raises():
+    duplicated = [{"id": number, "category": "Project"} for number in (1, 2, 3)]
+
+    with pytest.raises(ValueError, match="not unique"):
+        collect(FakeSupabase(duplicated), key_column="category")
+
+
+class FailingWrites:
+    """
+    A client whose writes raise the given errors in turn, then succeed.
+    """
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.writes = []
+
+    def table(self, table_name):
+        return self
+
+    def insert(self, rows):
+        self.writes.append(("insert", rows))
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.writes.append(("upsert", rows))
+        return self
+
+    def execute(self):
+        if self.errors:
+            raise self.errors.pop(0)
+        return type("Response", (), {"data": self.writes[-1][1]})()
+
+
+def insert(supabase, **kwargs):
+    return asyncio.run(insert_data_into_table(supabase, "job_info", [{"job_link": "https://example.com/1"}], **kwargs))
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(supabase_backend, "SUPABASE_RETRY_BASE_DELAY", 0)
+
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("refused"),
+    APIError({"message": "deadlock detected", "code": "40P01"}),
+    APIError({"message": "Too Many Requests", "code": "429"}),
+])
+def test_transient_errors_are_retried(error):
+    supabase = FailingWrites([error])
+
+    assert insert(supabase) == [{"job_link": "https://example.com/1"}]
+    assert len(supabase.writes) == 2
+
+def test_rejected_rows_are_not_retried():
+    supabase = FailingWrites([APIError({"message": "null value in column", "code": "23502"})])
+
+    with pytest.raises(APIError):
+        insert(supabase)
+    assert len(supabase.writes) == 1
+
+@pytest.mark.parametrize("error", [
+    httpx.ReadTimeout("timed out"),
+    APIError({"message": "Bad Gateway", "code": "502"}),
+])
+def test_writes_that_may_have_landed_are_only_retried_as_upserts(error):
+    inserts = FailingWrites([error])
+    with pytest.raises(type(error)):
+        insert(inserts)
+    assert len(inserts.writes) == 1
+
+    upserts = FailingWrites([error])
+    assert insert(upserts, upsert_on="job_link") == [{"job_link": "https://example.com/1"}]
+    assert [kind for kind, _ in upserts.writes] == ["upsert", "upsert"]
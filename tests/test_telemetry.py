@@ -0,0 +1,41 @@
+import json
+import pandas as pd
+from telemetry import MetricsStore, summarize_metrics
+
+
+def test_queued_records_are_all_written(tmp_path, monkeypatch):
+    store = MetricsStore(str(tmp_path / "metrics.jsonl"))
+    for number in range(200):
+        store.append({"number": number})
+    # Records already queued keep their file when the working directory changes
+    monkeypatch.chdir(tmp_path.parent)
+
+    store.flush()
+
+    with open(tmp_path / "metrics.jsonl") as metrics_file:
+        assert [json.loads(line)["number"] for line in metrics_file] == list(range(200))
+
+def test_unwritable_file_does_not_raise(tmp_path):
+    # A directory where the file should be, so every write fails
+    (tmp_path / "metrics.jsonl").mkdir()
+    store = MetricsStore(str(tmp_path / "metrics.jsonl"))
+
+    store.append({"number": 1})
+    store.flush()
+    store.append({"number": 2})
+    store.flush()
+
+def test_retries_are_summed_only_where_counted():
+    record = {"run_id": "run", "cache_hit": False, "coalesced": False, "error": None, "wall_time_s": 1.0,
+              "ttft_s": None, "input_tokens": None, "output_tokens": None, "cost_usd": None}
+    metrics = pd.DataFrame([
+        dict(record, stage="summary", kind="llm", retries=None),
+        dict(record, stage="save_job", kind="db_write", retries=0),
+        dict(record, stage="save_job", kind="db_write", retries=2),
+    ])
+
+    retries = summarize_metrics(metrics).set_index("stage")["retries"]
+
+    assert retries["save_job"] == 2
+    # The SDK retried the LLM call unseen, so its count is unknown rather than zero
+    assert pd.isna(retries["summary"])
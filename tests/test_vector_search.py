@@ -0,0 +1,53 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from embedding_matcher import EmbeddingMatcher
+from vector_search import LocalVectorSearch, search_similar_rows
+
+
+def extra_info_table(count=50, dimensions=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dimensions)).astype(np.float32)
+    return pd.DataFrame({
+        "id": np.arange(100, 100 + count),
+        "category": ["Project"] * count,
+        "title": [f"Title {number}" for number in range(count)],
+        "text": [f"Text {number}" for number in range(count)],
+        "text_embedding": list(vectors),
+    })
+
+def test_local_search_ranks_like_embedding_matcher():
+    table = extra_info_table()
+    query = np.random.default_rng(1).normal(size=16).astype(np.float32)
+
+    results = asyncio.run(search_similar_rows(LocalVectorSearch({"extra_info": table}), "extra_info", query, match_count=10))
+
+    scores = EmbeddingMatcher.from_frame(table, "text_embedding").scores(query)
+    expected = table["id"].to_numpy()[np.argsort(-scores)[:10]]
+    assert results["id"].tolist() == expected.tolist()
+    np.testing.assert_allclose(results["similarity"], np.sort(scores)[::-1][:10], rtol=1e-5)
+    np.testing.assert_allclose(results["percentage_match"], results["similarity"] * 100)
+
+def test_local_search_applies_threshold():
+    table = extra_info_table()
+    query = table["text_embedding"].iloc[3]
+
+    results = asyncio.run(search_similar_rows(LocalVectorSearch({"extra_info": table}), "extra_info", query, match_count=50, match_threshold=0.99))
+
+    assert results["id"].tolist() == [103]
+    assert "text_embedding" not in results.columns
+
+def test_local_search_keeps_only_the_selected_resumes():
+    vectors = np.random.default_rng(2).normal(size=(6, 16)).astype(np.float32)
+    resumes = pd.DataFrame({
+        "id": np.arange(6),
+        "resume_name": [f"resume_{number}" for number in range(6)],
+        "resume_text": [f"Resume {number}" for number in range(6)],
+        "resume_embedding": list(vectors),
+    })
+    selected = ["resume_1", "resume_4", "resume_5"]
+
+    results = asyncio.run(search_similar_rows(LocalVectorSearch({"resume_data": resumes}), "resume_data", vectors[0],
+                                              match_count=10, match_threshold=-1.0, filters={"resume_names": selected}))
+
+    scores = EmbeddingMatcher.from_frame(resumes, "resume_embedding").scores(vectors[0])
+    assert results["resume_name"].tolist() == sorted(selected, key=lambda name: -scores[int(name[-1])])
@@ -0,0 +1,260 @@
+import asyncio
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from configuration import TRACE_DIR, TRACE_MAX_SPANS
+
+# Trace being recorded and the innermost open span, asyncio tasks and to_thread calls inherit both
+current_trace = contextvars.ContextVar("current_trace", default=None)
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed step of a trace, nested under the span that was open when it started.
+    """
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        # Spans opened by one task or thread nest properly, so each gets its own row in the trace viewer
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        self.lane = ("task", id(task)) if task is not None else ("thread", threading.get_ident())
+
+
+class Trace:
+    """
+    The spans recorded for one run of a pipeline.
+    """
+
+    def __init__(self, name, max_spans=TRACE_MAX_SPANS):
+        self.name = name
+        self.trace_id = secrets.token_hex(16)
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        # Spans finish on worker threads too, and a bulk run is capped so the trace stays loadable
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def to_chrome_trace(self):
+        """
+        The trace in Chrome trace event format, for chrome://tracing, Perfetto or speedscope.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        origin = spans[0].start_ns if spans else 0
+        lanes = {}
+        events = []
+        for span in spans:
+            events.append({
+                "name": span.name,
+                "cat": span.attributes.get("kind", "span"),
+                "ph": "X",
+                "ts": (span.start_ns - origin) / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": 1,
+                "tid": lanes.setdefault(span.lane, len(lanes) + 1),
+                "args": dict(span.attributes, span_id=span.span_id, parent_id=span.parent_id, error=span.error),
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace": self.name, "trace_id": self.trace_id}}
+
+    def to_otlp(self, service_name="job-application-assistant"):
+        """
+        The trace as OTLP/JSON (an ExportTraceServiceRequest), for Jaeger, Tempo or any OpenTelemetry collector.
+        """
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        with self._lock:
+            spans = list(self.spans)
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [attribute(key, value) for key, value in span.attributes.items() if value is not None],
+                # STATUS_CODE_ERROR is 2, STATUS_CODE_UNSET is 0
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": otlp_spans}],
+        }]}
+
+    def to_frame(self):
+        """
+        One row per span with its start and end in seconds from the start of the trace, for the waterfall chart.
+        """
+        import pandas as pd
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        if not spans:
+            return pd.DataFrame(columns=["span", "parent", "start_s", "end_s", "duration_s"])
+        origin = spans[0].start_ns
+        names = {span.span_id: span.name for span in spans}
+        return pd.DataFrame({
+            "span": [span.name for span in spans],
+            "parent": [names.get(span.parent_id) for span in spans],
+            "start_s": [(span.start_ns - origin) / 1e9 for span in spans],
+            "end_s": [(span.end_ns - origin) / 1e9 for span in spans],
+            "duration_s": [(span.end_ns - span.start_ns) / 1e9 for span in spans],
+        })
+
+    def write(self, directory=TRACE_DIR):
+        """
+        Write the trace as <name>-<id>.trace.json (Chrome trace) and <name>-<id>.otlp.json (OTLP).
+
+        Returns:
+        - tuple: (chrome trace path, OTLP path).
+        """
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{self.name}-{self.trace_id[:8]}")
+        with open(stem + ".trace.json", "w") as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+        with open(stem + ".otlp.json", "w") as otlp_file:
+            json.dump(self.to_otlp(), otlp_file)
+        if self.dropped:
+            print(f"Trace {self.name} was capped at {self.max_spans} spans, {self.dropped} were dropped")
+        print(f"Trace written to {stem}.trace.json and {stem}.otlp.json")
+        return stem + ".trace.json", stem + ".otlp.json"
+
+
+@contextmanager
+def start_trace(name):
+    """
+    Record every span opened inside the block (and in the tasks and threads started from it) into a new trace.
+
+    Usage:
+        with start_trace("analyze") as trace:
+            ...
+        trace.write()
+    """
+    trace = Trace(name)
+    trace_token = current_trace.set(trace)
+    span_token = current_span.set(None)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        current_span.reset(span_token)
+        current_trace.reset(trace_token)
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time the block as a child of the current span. Does nothing when no trace is being recorded.
+
+    Yields:
+    - Span: The open span, whose attributes can still be added to, or None outside a trace.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = current_span.get()
+    opened = Span(name, trace.trace_id, parent.span_id if parent else None, attributes)
+    token = current_span.set(opened)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        opened.end_ns = time.time_ns()
+        current_span.reset(token)
+        trace.add(opened)
+
+
+# CPU profiles of the profiled() blocks, collected only once enable_profiling() has been called (--profile)
+_profiling = False
+_profiles = {}
+_profile_lock = threading.Lock()
+
+def enable_profiling(enabled=True):
+    global _profiling
+    _profiling = enabled
+
+@contextmanager
+def profiled(name, **attributes):
+    """
+    Span around a CPU bound block (DataFrame preparation, similarity, tokenization) that is also
+    run under cProfile in --profile mode. The block must not await: only one block is profiled at a time.
+    """
+    with span(name, kind="cpu", **attributes):
+        # Only one profiler can be active per process, blocks that overlap another one simply run unprofiled
+        if not _profiling or not _profile_lock.acquire(blocking=False):
+            yield
+            return
+        try:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler (e.g. python -m cProfile) is already running
+                profile = None
+            try:
+                yield
+            finally:
+                if profile is not None:
+                    profile.disable()
+                    if name in _profiles:
+                        _profiles[name].add(profile)
+                    else:
+                        _profiles[name] = pstats.Stats(profile)
+        finally:
+            _profile_lock.release()
+
+def write_profiles(directory=TRACE_DIR, top=15):
+    """
+    Write the collected profiles as <name>.prof files (for snakeviz or pstats) and print their top functions.
+
+    Returns:
+    - list: Paths of the written files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    with _profile_lock:
+        for name, stats in _profiles.items():
+            path = os.path.join(directory, f"{name}.prof")
+            stats.dump_stats(path)
+            paths.append(path)
+            report = io.StringIO()
+            pstats.Stats(path, stream=report).sort_stats("cumulative").print_stats(top)
+            print(f"--- Profile of {name} ---\n{report.getvalue()}")
+    return paths
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from embedding_matcher import EmbeddingMatcher
+from supabase_backend import execute_query
+from configuration import VECTOR_SEARCH_MATCH_COUNT
+
+# RPC function, embedding column and returned columns for each searchable table (see sql/vector_search.sql)
+VECTOR_SEARCH_TABLES = {
+    "extra_info": {
+        "rpc": "match_extra_info",
+        "embedding_column": "text_embedding",
+        "columns": ["id", "category", "title", "text"],
+    },
+    "resume_data": {
+        "rpc": "match_resume_data",
+        "embedding_column": "resume_embedding",
+        "columns": ["id", "resume_name", "resume_text"],
+        # Optional RPC argument -> column it restricts
+        "filters": {"resume_names": "resume_name"},
+    },
+}
+
+async def search_similar_rows(supabase, table_name, query_embedding, match_count=VECTOR_SEARCH_MATCH_COUNT, match_threshold=0.0, filters=None):
+    """
+    Run a similarity search inside Postgres and fetch only the best matching rows.
+
+    Args:
+    - supabase: Supabase client, or a LocalVectorSearch stand-in.
+    - table_name (str): One of the tables in VECTOR_SEARCH_TABLES.
+    - query_embedding: The job description embedding.
+    - match_count (int): Maximum number of rows to return.
+    - match_threshold (float): Minimum cosine similarity (0 to 1).
+    - filters (dict): Optional, one of the table's "filters" -> the values to keep, e.g. {"resume_names": [...]}.
+
+    Returns:
+    - pd.DataFrame: The matching rows (without embeddings), with 'similarity' and 'percentage_match', best first.
+    """
+    table = VECTOR_SEARCH_TABLES[table_name]
+    print(f"Searching {table_name} through {table['rpc']} (top {match_count})")
+
+    params = {
+        "query_embedding": np.asarray(query_embedding, dtype=np.float32).tolist(),
+        "match_threshold": float(match_threshold),
+        "match_count": int(match_count),
+        **(filters or {}),
+    }
+    response = await execute_query(supabase.rpc(table["rpc"], params))
+
+    results = pd.DataFrame(response.data or [], columns=table["columns"] + ["similarity"])
+    results['percentage_match'] = results['similarity'] * 100
+    return results.sort_values(by='similarity', ascending=False).reset_index(drop=True)
+
+
+class LocalVectorSearch:
+    """
+    In-process stand-in for the pgvector RPC functions, for offline runs and tests.
+
+    Mirrors the `supabase.rpc(name, params).execute()` call shape, answering from DataFrames
+    held in memory with the same EmbeddingMatcher used for client-side matching.
+    """
+
+    def __init__(self, tables):
+        # tables: table name -> DataFrame with the table's columns and embeddings
+        self.tables = {}
+        for table_name, dataframe in tables.items():
+            table = VECTOR_SEARCH_TABLES[table_name]
+            rows = dataframe.reset_index(drop=True)
+            self.tables[table["rpc"]] = (table, rows, EmbeddingMatcher.from_frame(rows, table["embedding_column"]))
+
+    def rpc(self, function_name, params):
+        table, rows, matcher = self.tables[function_name]
+        scores = matcher.scores(np.asarray(params["query_embedding"], dtype=np.float32))
+        keep = scores >= params["match_threshold"]
+        for argument, column in table.get("filters", {}).items():
+            if params.get(argument) is not None:
+                keep &= rows[column].isin(params[argument]).to_numpy()
+        positions = np.flatnonzero(keep)
+        positions = positions[np.argsort(-scores[positions], kind="stable")][:params["match_count"]]
+
+        columns = [column for column in table["columns"] if column in rows.columns]
+        matches = rows.iloc[positions][columns].copy()
+        matches['similarity'] = scores[positions].astype(float)
+        data = matches.to_dict(orient="records")
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=data))